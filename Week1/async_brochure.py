@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, RateLimitError
+
+from completion_cache import CompletionCache, completion_key, get_completion_cache
+from condense import condense_pages, count_tokens
+from crawler import Crawler
+from day5 import BrochureGenerator, Website
+from http_client import DEFAULT_HEADERS, DEFAULT_MAX_BYTES, Deadline, FetchAborted, fetch_async
+from metrics import get_metrics, record_token_usage
+from response_cache import CachedResponse, ResponseCache, conditional_headers, get_response_cache, store_response
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int, model: str = "gpt-4o-mini") -> int:
+    """Upper bound on the tokens a request will be billed for."""
+    prompt_tokens = sum(count_tokens(message["content"], model) for message in messages)
+    return prompt_tokens + max_tokens
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens and refills at `rate` tokens per second."""
+
+    def __init__(self, capacity: float, rate: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = rate
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def give(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimitScheduler:
+    """Admits API calls under requests-per-minute and tokens-per-minute limits.
+
+    Callers wait in FIFO order until both buckets can cover the request.
+    A 429 from the API is retried with exponential backoff (or the server's
+    Retry-After, whichever is longer) up to `max_retries` times, under the
+    same reservation.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 200_000,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60, clock)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60, clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.throttled = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        # A request larger than the whole bucket would otherwise wait forever
+        tokens = min(tokens, self.tokens.capacity)
+        async with self._lock:
+            while True:
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                await self.sleep(delay)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def settle(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage of a call is known."""
+        # `acquire` only reserved up to the bucket's capacity
+        reserved = min(estimated, self.tokens.capacity)
+        if actual < reserved:
+            self.tokens.give(reserved - actual)
+        elif actual > reserved:
+            self.tokens.take(actual - reserved)
+
+    def _retry_delay(self, error: RateLimitError, attempt: int) -> float:
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        backoff *= 0.5 + random.random() / 2
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                return max(backoff, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return backoff
+
+    async def call(self, make_request: Callable[[], Awaitable[T]], estimated_tokens: int) -> T:
+        # One reservation per logical request: a 429 is not billed, so the
+        # retries reuse it instead of draining the buckets again
+        await self.acquire(estimated_tokens)
+        attempt = 0
+        while True:
+            try:
+                return await make_request()
+            except RateLimitError as e:
+                attempt += 1
+                self.throttled += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"⏳ Rate limited, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await self.sleep(delay)
+
+
+class AsyncBrochureGenerator:
+    """Asyncio brochure generator on `AsyncOpenAI` and an async HTTP client.
+
+    One instance can keep hundreds of brochures in flight on a single event
+    loop; the `RateLimitScheduler` keeps them within the account's limits.
+    Pass `base_url` (or your own `client`/`http_client`) to point it at a
+    local mock server.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        crawl_depth: int = 1,
+        max_pages: int = 8,
+        client: Optional[AsyncOpenAI] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        cache: Optional[CompletionCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        use_response_cache: bool = True,
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        token_budget: Optional[int] = 6000,
+        crawl_timeout: Optional[float] = 30,
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if client is None and not self.api_key:
+            raise ValueError("🔑 No OpenAI API key provided")
+
+        # Retries are the scheduler's job, so the SDK must not retry on its own
+        self.client = client or AsyncOpenAI(api_key=self.api_key, base_url=base_url, max_retries=0)
+        self.http = http_client or httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=10,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.cache = cache or get_completion_cache()
+        self.response_cache = (response_cache or get_response_cache()) if use_response_cache else None
+        self.model = 'gpt-4o-mini'
+        self.max_tokens = 1000
+        self.crawl_depth = crawl_depth
+        self.max_pages = max_pages
+        self.token_budget = token_budget
+        # Same page guards as the sync path: per-page size cap and a whole-crawl budget
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.crawl_timeout = crawl_timeout
+
+    async def __aenter__(self) -> "AsyncBrochureGenerator":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.http.aclose()
+        await self.client.close()
+
+    async def fetch_website(self, url: str, deadline: Optional[Deadline] = None) -> Website:
+        """Async fetch path for `Website`, sharing its response cache and fetch guards."""
+        if not url.startswith(('http://', 'https://')):
+            url = f'https://{url}'
+        cache = self.response_cache
+
+        # SQLite lookups and HTML parsing block, so all of them run in worker threads
+        entry = await asyncio.to_thread(cache.get, url) if cache else None
+        if entry and cache.is_fresh(entry):
+            cache.record_hit()
+            return await asyncio.to_thread(self._cached_page, url, entry)
+
+        metrics = get_metrics()
+        try:
+            with metrics.span("fetch", url=url) as span:
+                # Streamed, size-capped, HTML-only and bounded by the crawl deadline
+                response = await fetch_async(
+                    self.http,
+                    url,
+                    headers=conditional_headers(entry),
+                    deadline=deadline,
+                    max_bytes=self.max_bytes,
+                )
+                span.set(status=response.status_code, bytes=len(response.content), truncated=response.truncated)
+                if not (entry and response.status_code == 304):
+                    response.raise_for_status()
+        except (httpx.HTTPError, FetchAborted) as e:
+            return Website.from_error(url, e)
+        metrics.inc("bytes_total", len(response.content))
+        if entry and response.status_code == 304:
+            await asyncio.to_thread(
+                cache.touch, url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+            )
+            cache.record_hit(revalidated=True)
+            return await asyncio.to_thread(self._cached_page, url, entry)
+
+        content = response.content
+        final_url = str(response.url)
+        page = await asyncio.to_thread(
+            Website.from_content, url, content,
+            content_type=response.headers.get('Content-Type'), final_url=final_url,
+        )
+        if cache:
+            cache.record_miss()
+            await asyncio.to_thread(
+                store_response, cache, url, content, page.encoding, response.headers,
+                final_url=final_url, truncated=response.truncated,
+            )
+        return page
+
+    @staticmethod
+    def _cached_page(url: str, entry: CachedResponse) -> Website:
+        page = Website.from_content(url, entry.body, entry.encoding, final_url=entry.final_url)
+        page.from_cache = True
+        page.encoding_strategy = "cache"
+        return page
+
+    async def collect_contents(self, url: str) -> str:
+        crawler = Crawler(max_depth=self.crawl_depth, max_pages=self.max_pages)
+        pages = await crawler.crawl_async(url, self.fetch_website, deadline=Deadline(self.crawl_timeout))
+        if self.token_budget is None:
+            return BrochureGenerator.join_pages(pages)
+        return condense_pages(pages, token_budget=self.token_budget, model=self.model)
+
+    async def complete(self, messages: List[Dict[str, str]], use_cache: bool = True) -> str:
+        key = completion_key(self.model, messages, self.max_tokens)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info("♻️ Brochure served from completion cache")
+                return cached
+
+        estimated = estimate_tokens(messages, self.max_tokens, self.model)
+        # The span includes time spent waiting on the rate limiter
+        with get_metrics().span("llm", model=self.model, stream=False) as span:
+            response = await self.scheduler.call(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=self.max_tokens
+                ),
+                estimated,
+            )
+            record_token_usage(getattr(response, "usage", None), span)
+        if getattr(response, "usage", None) is not None:
+            self.scheduler.settle(estimated, response.usage.total_tokens)
+        content = response.choices[0].message.content
+
+        if use_cache and content:
+            self.cache.put(key, content)
+        return content
+
+    async def create_brochure(self, company_name: str, url: str, use_cache: bool = True) -> str:
+        try:
+            contents = await self.collect_contents(url)
+            messages = BrochureGenerator.build_messages(company_name, url, contents)
+            return await self.complete(messages, use_cache=use_cache)
+
+        except Exception as e:
+            logger.error(f"🚨 Brochure generation error: {e}")
+            return f"## 🤖 Brochure Generation Error\n\n{e}"
+
+    async def create_brochures(
+        self,
+        jobs: Iterable[Tuple[str, str]],
+        max_in_flight: int = 200,
+        use_cache: bool = True,
+    ) -> List[str]:
+        """Generate a brochure per (company_name, url), at most `max_in_flight` at once."""
+        slots = asyncio.Semaphore(max_in_flight)
+
+        async def run(company_name: str, url: str) -> str:
+            async with slots:
+                return await self.create_brochure(company_name, url, use_cache=use_cache)
+
+        return await asyncio.gather(*(run(company_name, url) for company_name, url in jobs))
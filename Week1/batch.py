@@ -0,0 +1,206 @@
+"""Batch brochure generation over a JSONL job file.
+
+Each input line is a job like ``{"id": "hf", "company_name": "HuggingFace", "url": "huggingface.co"}``.
+Results are appended to the output JSONL as soon as each job finishes, so an
+interrupted run can be restarted and will skip jobs that already succeeded.
+
+    python batch.py jobs.jsonl results.jsonl --scrape-workers 8 --llm-workers 4
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, Optional, Set
+
+from day5 import BrochureGenerator, configure_logging
+from metrics import configure_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def job_id(job: Dict) -> str:
+    """The job's own id, or a stable hash of company name and URL."""
+    if job.get("id"):
+        return str(job["id"])
+    raw = f"{job['company_name']}|{job['url']}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def read_jobs(path: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+                if not (job.get("company_name") and job.get("url")):
+                    raise ValueError("company_name and url are required")
+            except ValueError as e:
+                logger.error(f"⚠️ Skipping job on line {line_no}: {e}")
+                continue
+            job["id"] = job_id(job)
+            yield job
+
+
+def completed_job_ids(path: str) -> Set[str]:
+    """IDs whose latest result in `path` succeeded; failed jobs get retried."""
+    status: Dict[str, str] = {}
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash mid-write can leave a torn last line
+                continue
+            status[record.get("id")] = record.get("status")
+    return {jid for jid, state in status.items() if state == "ok"}
+
+
+class BatchRunner:
+    """Pipelines the scrape and LLM stages on separate bounded pools.
+
+    Scraping is I/O against many sites, generation is I/O against one API
+    with its own rate limits, so each stage gets its own worker count. At
+    most `2 * workers` jobs wait in front of each stage, which keeps memory
+    flat no matter how large the job file is.
+    """
+
+    def __init__(
+        self,
+        generator: BrochureGenerator,
+        scrape_workers: int = 8,
+        llm_workers: int = 4,
+        use_cache: bool = True,
+    ):
+        self.generator = generator
+        self.scrape_workers = max(1, scrape_workers)
+        self.llm_workers = max(1, llm_workers)
+        self.use_cache = use_cache
+
+    def _scrape(self, job: Dict) -> str:
+        # A brochure of "Unable to scrape website" is a failure, not a result to keep
+        return self.generator.collect_contents(job["url"], require_landing=True)
+
+    def _generate(self, job: Dict, contents: str) -> str:
+        messages = self.generator.build_messages(job["company_name"], job["url"], contents)
+        return self.generator.complete(messages, use_cache=self.use_cache)
+
+    def run(self, jobs_path: str, output_path: str) -> Dict[str, int]:
+        done_ids = completed_job_ids(output_path)
+        counts = {"ok": 0, "error": 0, "skipped": 0}
+        jobs = read_jobs(jobs_path)
+        started: Dict[str, float] = {}
+        queued: Set[str] = set()
+
+        scrapes: Dict[Future, Dict] = {}
+        generations: Dict[Future, Dict] = {}
+
+        def next_job() -> Optional[Dict]:
+            for job in jobs:
+                if job["id"] in done_ids:
+                    counts["skipped"] += 1
+                    continue
+                if job["id"] in queued:
+                    # Results and resume are keyed by id, so only the first job with an id runs
+                    logger.warning(f"⚠️ Skipping duplicate job id {job['id']}")
+                    counts["skipped"] += 1
+                    continue
+                queued.add(job["id"])
+                return job
+            return None
+
+        with open(output_path, "a", encoding="utf-8") as out, \
+                ThreadPoolExecutor(self.scrape_workers, thread_name_prefix="scrape") as scrape_pool, \
+                ThreadPoolExecutor(self.llm_workers, thread_name_prefix="llm") as llm_pool:
+
+            def write(job: Dict, status: str, brochure: Optional[str] = None, error: Optional[str] = None):
+                record = {
+                    "id": job["id"],
+                    "company_name": job["company_name"],
+                    "url": job["url"],
+                    "status": status,
+                    "brochure": brochure,
+                    "error": error,
+                    "elapsed": round(time.perf_counter() - started.pop(job["id"]), 3),
+                }
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                counts[status] += 1
+
+            exhausted = False
+            while True:
+                # Only feed the scrape stage while the LLM stage is keeping up
+                while (not exhausted
+                       and len(scrapes) < 2 * self.scrape_workers
+                       and len(generations) < 2 * self.llm_workers):
+                    job = next_job()
+                    if job is None:
+                        exhausted = True
+                        break
+                    started[job["id"]] = time.perf_counter()
+                    scrapes[scrape_pool.submit(self._scrape, job)] = job
+
+                if not scrapes and not generations:
+                    break
+
+                done, _ = wait(list(scrapes) + list(generations), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in scrapes:
+                        job = scrapes.pop(future)
+                        try:
+                            contents = future.result()
+                        except Exception as e:
+                            logger.error(f"🕸️ Scrape failed for job {job['id']}: {e}")
+                            write(job, "error", error=str(e))
+                            continue
+                        generations[llm_pool.submit(self._generate, job, contents)] = job
+                    else:
+                        job = generations.pop(future)
+                        try:
+                            write(job, "ok", brochure=future.result())
+                        except Exception as e:
+                            logger.error(f"🚨 Generation failed for job {job['id']}: {e}")
+                            write(job, "error", error=str(e))
+
+        logger.info(f"📦 Batch finished: {counts['ok']} ok, {counts['error']} failed, {counts['skipped']} already done")
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate brochures for every job in a JSONL file.")
+    parser.add_argument("jobs", help="input JSONL with company_name and url per line")
+    parser.add_argument("output", help="output JSONL; existing successful job ids are skipped")
+    parser.add_argument("--scrape-workers", type=int, default=8)
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--crawl-depth", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=8)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the completion cache")
+    parser.add_argument("--trace", help="append one JSON line per timed pipeline stage to this file")
+    parser.add_argument("--metrics", help="write Prometheus text-format metrics here when the run ends")
+    args = parser.parse_args()
+
+    configure_logging()
+    metrics = configure_metrics(args.trace)
+    generator = BrochureGenerator(crawl_depth=args.crawl_depth, max_pages=args.max_pages)
+    runner = BatchRunner(
+        generator,
+        scrape_workers=args.scrape_workers,
+        llm_workers=args.llm_workers,
+        use_cache=not args.no_cache,
+    )
+    try:
+        runner.run(args.jobs, args.output)
+    finally:
+        if args.metrics:
+            metrics.write_prometheus(args.metrics)
+        metrics.close()
+
+
+if __name__ == "__main__":
+    main()
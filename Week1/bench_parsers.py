@@ -0,0 +1,66 @@
+"""Compare HTML parser backends on the saved fixture pages.
+
+    python bench_parsers.py --repeat 50 --scale 20
+
+Every fixture is parsed `repeat` times per backend. `--scale` also builds a
+synthetic large page by repeating each fixture's body, to mimic the
+multi-megabyte pages big corporate sites serve.
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+
+from parsers import PARSERS, parse_html
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixtures(scale: int):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "**", "*.html"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        name = os.path.relpath(path, FIXTURES_DIR)
+        pages[name] = html
+        if scale > 1 and "<body" in html:
+            head, _, rest = html.partition("<body")
+            body, _, tail = rest.partition("</body>")
+            pages[f"{name} x{scale}"] = head + "<body" + body * scale + "</body>" + tail
+    return pages
+
+
+def bench(html: str, backend: str, repeat: int) -> float:
+    """Median seconds per parse."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_html(html, backend)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=20)
+    args = parser.parse_args()
+
+    backends = sorted(PARSERS)
+    print(f"{'fixture':<45} {'KB':>8} " + " ".join(f"{b + ' ms':>14}" for b in backends) + f" {'speedup':>8}")
+    for name, html in load_fixtures(args.scale).items():
+        results = {backend: bench(html, backend, args.repeat) for backend in backends}
+        reference = parse_html(html, "html.parser")
+        fast = parse_html(html, "lxml")
+        same = "" if (reference.text, reference.hrefs) == (fast.text, fast.hrefs) else "  (outputs differ)"
+        speedup = results["html.parser"] / results["lxml"]
+        print(
+            f"{name:<45} {len(html.encode('utf-8')) / 1024:>8.1f} "
+            + " ".join(f"{results[b] * 1000:>14.2f}" for b in backends)
+            + f" {speedup:>7.1f}x{same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""Offline benchmarks for the scrape and generate paths.
+
+    python bench_suite.py --concurrency 1 4 16 --requests 64 --output bench.json
+    python bench_suite.py --compare bench-old.json bench.json
+
+Everything runs against local stand-ins: a fixture server that serves the
+recorded books.toscrape.com catalogue (and the corporate page for any other
+path, optionally blown up with ``?scale=N``), and a fake OpenAI-compatible
+endpoint with configurable latency and SSE streaming. Each scenario is run
+at every concurrency level; throughput, p50/p95/p99 latency and peak RSS
+are written to JSON so runs can be compared across commits, together with
+the cold import time (``python -X importtime``) of the main modules.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CATALOGUE_DIR = os.path.join(FIXTURES_DIR, "books.toscrape.com")
+CORPORATE_PAGE = os.path.join(FIXTURES_DIR, "corporate.html")
+SCENARIOS = ("website", "catalogue", "brochure", "brochure_stream")
+# Cold-start cost of the modules entry points and workers import
+IMPORT_MODULES = ("day5", "crawler", "catalogue", "batch", "async_brochure")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Catalogue fixtures by path; any other path gets the corporate page."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = os.path.normpath(os.path.join(CATALOGUE_DIR, parts.path.lstrip("/")))
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if not (path.startswith(CATALOGUE_DIR) and os.path.isfile(path)):
+            path = CORPORATE_PAGE
+        with open(path, "rb") as f:
+            body = f.read()
+
+        scale = int(parse_qs(parts.query).get("scale", ["1"])[0])
+        if scale > 1 and b"<body" in body:
+            head, _, rest = body.partition(b"<body")
+            inner, _, tail = rest.partition(b"</body>")
+            body = head + b"<body" + inner * scale + b"</body>" + tail
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions: sleeps `latency`, then answers (optionally as SSE)."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.05
+    token_delay = 0.002
+    completion_tokens = 60
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": prompt_tokens + self.completion_tokens,
+        }
+        words = [f"word{i} " for i in range(self.completion_tokens)]
+        time.sleep(self.latency)
+
+        if not request.get("stream"):
+            body = json.dumps({
+                "id": "bench", "object": "chat.completion", "created": 0, "model": request.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(words)}}],
+                "usage": usage,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": request.get("model")}
+        for word in words:
+            chunk = {**base, "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.token_delay)
+        self.wfile.write(f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class LocalServer:
+    """Runs an HTTP handler on a free loopback port in a daemon thread."""
+
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "LocalServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class RssSampler:
+    """Tracks peak resident memory while a scenario runs (psutil, else ru_maxrss)."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def _rss(self) -> int:
+        if self._process is not None:
+            return self._process.memory_info().rss
+        import resource
+        # Lifetime peak; KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = self._rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def run_load(task: Callable[[int], Optional[float]], requests: int, concurrency: int) -> Dict:
+    """Call `task(i)` `requests` times on `concurrency` threads and summarise latencies.
+
+    A task may return a time-to-first-token, which is summarised separately.
+    """
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(i: int):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ttft = task(i)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if ttft is not None:
+                first_tokens.append(ttft)
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(timed, range(requests)))
+        wall = time.perf_counter() - start
+
+    result = {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": _summary(latencies),
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+    }
+    if first_tokens:
+        result["ttft_ms"] = _summary(first_tokens)
+    return result
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    return {
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "mean": round(statistics.fmean(values) * 1000, 2),
+    }
+
+
+def make_tasks(site: str, llm: str, scale: int) -> Dict[str, Callable[[int], Optional[float]]]:
+    """One callable per scenario, each doing a single unit of work."""
+    from openai import OpenAI
+
+    from catalogue import CatalogueScraper
+    from completion_cache import CompletionCache
+    from day5 import BrochureGenerator, Website
+
+    pages = [
+        f"{site}/",
+        f"{site}/about?scale={scale}",
+        f"{site}/catalogue/page-1.html",
+        f"{site}/catalogue/a-light-in-the-attic_1000/index.html",
+    ]
+
+    client = OpenAI(api_key="bench", base_url=f"{llm}/v1", max_retries=0)
+    # The real crawl path (deadline, spans) minus the response cache, so every run really scrapes
+    generator = BrochureGenerator(client=client, cache=CompletionCache(enabled=False), max_pages=4, page_cache=False)
+
+    def website(i: int):
+        page = Website(pages[i % len(pages)], use_cache=False)
+        if page.error:
+            raise RuntimeError(page.error)
+
+    def catalogue(i: int):
+        books = list(CatalogueScraper(f"{site}/catalogue/page-1.html", max_workers=4).iter_books(details=True))
+        if not books:
+            raise RuntimeError("no books scraped")
+
+    def brochure(i: int):
+        text = generator.create_brochure(f"Company {i}", f"{site}/", use_cache=False)
+        if text.startswith("## 🤖 Brochure Generation Error"):
+            raise RuntimeError(text)
+
+    def brochure_stream(i: int) -> float:
+        start = time.perf_counter()
+        ttft = None
+        chunks = []
+        for chunk in generator.stream_brochure(f"Company {i}", f"{site}/", use_cache=False):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            chunks.append(chunk)
+        # Failures (even mid-stream) arrive as a final error chunk
+        if not chunks or chunks[-1].startswith("## 🤖 Brochure Generation Error"):
+            raise RuntimeError(chunks[-1] if chunks else "empty stream")
+        return ttft
+
+    return {
+        "website": website,
+        "catalogue": catalogue,
+        "brochure": brochure,
+        "brochure_stream": brochure_stream,
+    }
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict:
+    """Median cumulative import time of `module` in a fresh interpreter, via ``-X importtime``.
+
+    Also lists the module's heaviest direct imports from the last run.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    totals = []
+    children: Dict[str, int] = {}
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, cwd=here,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+        children = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|", 2)
+            if not cumulative.strip().isdigit():
+                continue  # header row
+            depth = (len(name) - len(name.lstrip())) // 2
+            if depth == 0 and name.strip() == module:
+                totals.append(int(cumulative))
+            elif depth == 1:
+                # Direct imports are listed (deepest first) just before their parent
+                children[name.strip()] = int(cumulative)
+            elif depth == 0:
+                children = {}
+    heaviest = sorted(children.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        "module": module,
+        "cumulative_ms": round(statistics.median(totals) / 1000, 1),
+        "heaviest": [{"module": name, "ms": round(us / 1000, 1)} for name, us in heaviest],
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: str, new_path: str):
+    """Print import-time, throughput and p95 changes between two result files."""
+    with open(old_path, encoding="utf-8") as f:
+        old_report = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new_report = json.load(f)
+    old = {(r["scenario"], r["concurrency"]): r for r in old_report["results"]}
+    new = new_report["results"]
+
+    if old_report.get("imports") and new_report.get("imports"):
+        before = {item["module"]: item["cumulative_ms"] for item in old_report["imports"]}
+        print(f"{'import':<18} {'ms old':>9} {'ms new':>9}")
+        for item in new_report["imports"]:
+            if item["module"] in before:
+                print(f"{item['module']:<18} {before[item['module']]:>9.1f} {item['cumulative_ms']:>9.1f}")
+        print()
+
+    print(f"{'scenario':<18} {'conc':>5} {'rps old':>9} {'rps new':>9} {'p95 old':>9} {'p95 new':>9} {'Δp95':>8}")
+    for result in new:
+        before = old.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        p95_old, p95_new = before["latency_ms"].get("p95", 0), result["latency_ms"].get("p95", 0)
+        change = f"{(p95_new - p95_old) / p95_old * 100:+.0f}%" if p95_old else "n/a"
+        print(
+            f"{result['scenario']:<18} {result['concurrency']:>5} {before['throughput_rps']:>9.1f} "
+            f"{result['throughput_rps']:>9.1f} {p95_old:>9.1f} {p95_new:>9.1f} {change:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="units of work per concurrency level")
+    parser.add_argument("--scale", type=int, default=20, help="body repeat factor for the large corporate page")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake API delay before answering (s)")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="fake API delay between streamed tokens (s)")
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--imports", nargs="*", default=list(IMPORT_MODULES),
+                        help="modules to time with -X importtime (pass no names to skip)")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Before anything is imported here, so the measurements start cold
+    imports = []
+    for module in args.imports:
+        timing = measure_import(module)
+        imports.append(timing)
+        heaviest = ", ".join(f"{item['module']} {item['ms']:.0f} ms" for item in timing["heaviest"][:3])
+        print(f"import {module:<16} {timing['cumulative_ms']:>8.1f} ms  ({heaviest})")
+
+    # Keep the on-disk caches of this run away from the real ones
+    os.environ["BROCHURE_CACHE_DIR"] = tempfile.mkdtemp(prefix="brochure-bench-")
+    from http_client import configure_client
+    configure_client(pool_maxsize=max(args.concurrency) * 4)
+
+    FakeOpenAIHandler.latency = args.llm_latency
+    FakeOpenAIHandler.token_delay = args.token_delay
+    FakeOpenAIHandler.completion_tokens = args.completion_tokens
+
+    results = []
+    with LocalServer(FixtureHandler) as site, LocalServer(FakeOpenAIHandler) as llm:
+        tasks = make_tasks(site.url, llm.url, args.scale)
+        for scenario in args.scenarios:
+            # One untimed call so imports and first connections are not measured
+            tasks[scenario](0)
+            for concurrency in args.concurrency:
+                result = {"scenario": scenario, **run_load(tasks[scenario], args.requests, concurrency)}
+                results.append(result)
+                latency = result["latency_ms"]
+                print(
+                    f"{scenario:<16} c={concurrency:<3} {result['throughput_rps']:>8.1f} req/s  "
+                    f"p50 {latency.get('p50', 0):>8.1f} ms  p95 {latency.get('p95', 0):>8.1f} ms  "
+                    f"p99 {latency.get('p99', 0):>8.1f} ms  rss {result['peak_rss_mb']:>7.1f} MB  "
+                    f"errors {result['errors']}"
+                )
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "imports": imports,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import logging
+import re
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from encoding_detect import resolve_encoding
+from http_client import HttpClient, get_client
+
+logger = logging.getLogger(__name__)
+
+START_URL = "https://books.toscrape.com/catalogue/page-1.html"
+
+RATINGS = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+_PAGE_OF = re.compile(r"Page\s+(\d+)\s+of\s+(\d+)", re.IGNORECASE)
+_PAGE_NUMBER = re.compile(r"^(.*?)(\d+)(\.html?)$")
+_AVAILABLE = re.compile(r"\((\d+)\s+available\)")
+_PRICE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+CURRENCIES = {"£": "GBP", "$": "USD", "€": "EUR"}
+
+# Columns of a book record: the listing fields, plus the detail ones with details=True
+LISTING_FIELDS = ["url", "title", "price", "currency", "availability", "rating"]
+DETAIL_FIELDS = ["upc", "product_type", "stock", "category", "reviews"]
+
+
+class CatalogueError(Exception):
+    """Raised when listing pages could not be fetched, so the scrape is incomplete."""
+
+
+def parse_price(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """Split a price like "£51.77" into (51.77, "GBP").
+
+    Also copes with the mojibake ("Â£51.77") left in older snapshots by
+    decoding UTF-8 pages as Latin-1.
+    """
+    match = _PRICE.search(text or "")
+    amount = float(match.group(0).replace(",", "")) if match else None
+    currency = next((code for symbol, code in CURRENCIES.items() if symbol in (text or "")), None)
+    return amount, currency
+
+
+def _rating(tag) -> Optional[int]:
+    """Star rating from the CSS classes of a `p.star-rating` tag."""
+    if tag is None:
+        return None
+    for css_class in tag.get("class", []):
+        if css_class in RATINGS:
+            return RATINGS[css_class]
+    return None
+
+
+def parse_listing(html: str, page_url: str) -> Tuple[List[Dict], Optional[str], Optional[int]]:
+    """Books on one catalogue page, plus the next page URL and the total page count."""
+    soup = BeautifulSoup(html, "lxml")
+    books = []
+    for product in soup.find_all("article", class_="product_pod"):
+        link = product.h3.a
+        price, currency = parse_price(product.find("p", class_="price_color").get_text(strip=True))
+        books.append({
+            "url": urljoin(page_url, link["href"]),
+            "title": link["title"],
+            "price": price,
+            "currency": currency,
+            "availability": product.find("p", class_="availability").get_text(strip=True),
+            "rating": _rating(product.find("p", class_="star-rating")),
+        })
+
+    next_link = soup.select_one("li.next a[href]")
+    next_url = urljoin(page_url, next_link["href"]) if next_link else None
+
+    total_pages = None
+    current = soup.select_one("li.current")
+    if current:
+        match = _PAGE_OF.search(current.get_text())
+        if match:
+            total_pages = int(match.group(2))
+    return books, next_url, total_pages
+
+
+def parse_detail(html: str) -> Dict:
+    """Stock, rating, UPC and friends from a book's detail page."""
+    soup = BeautifulSoup(html, "lxml")
+    info = {
+        row.th.get_text(strip=True): row.td.get_text(strip=True)
+        for row in soup.select("table.table tr")
+        if row.th and row.td
+    }
+    availability = info.get("Availability", "")
+    match = _AVAILABLE.search(availability)
+    breadcrumb = soup.select("ul.breadcrumb li a")
+    return {
+        "upc": info.get("UPC"),
+        "product_type": info.get("Product Type"),
+        "stock": int(match.group(1)) if match else 0,
+        "rating": _rating(soup.select_one(".product_main p.star-rating")),
+        "category": breadcrumb[-1].get_text(strip=True) if len(breadcrumb) >= 3 else None,
+        "reviews": int(info.get("Number of reviews") or 0),
+    }
+
+
+def _page_urls(next_url: Optional[str], total_pages: Optional[int]) -> Optional[List[str]]:
+    """All remaining page URLs when the pager tells us the count and the URLs are numbered."""
+    if not (next_url and total_pages):
+        return None
+    match = _PAGE_NUMBER.match(next_url)
+    if not match:
+        return None
+    prefix, next_number, suffix = match.groups()
+    return [f"{prefix}{n}{suffix}" for n in range(int(next_number), total_pages + 1)]
+
+
+class CatalogueScraper:
+    """Scrapes every page of a books.toscrape-style catalogue concurrently.
+
+    The first page tells us how many pages there are ("Page 1 of 50"), so the
+    rest are fetched in parallel on `max_workers` threads. If the count is
+    missing, the scraper walks the "next" links instead. With
+    `details=True`, each book's detail page is fetched too, for UPC, stock
+    and category. Records are yielded as soon as they are parsed, in no
+    particular order.
+
+    A failed detail page only costs that book its extras, but a failed
+    listing page loses every book on it: with `strict` (the default) the
+    iterator raises `CatalogueError` once everything else has been yielded,
+    so callers can refuse to publish a partial catalogue.
+    """
+
+    def __init__(
+        self,
+        start_url: str = START_URL,
+        client: Optional[HttpClient] = None,
+        max_workers: int = 8,
+        strict: bool = True,
+    ):
+        self.start_url = start_url
+        self.client = client or get_client()
+        self.max_workers = max(1, max_workers)
+        self.strict = strict
+        # URLs whose fetch failed during the last iter_books() run
+        self.failures: List[str] = []
+        # The listing pages among them
+        self.failed_pages: List[str] = []
+
+    def fetch(self, url: str) -> str:
+        response = self.client.get(url)
+        response.raise_for_status()
+        encoding, _ = resolve_encoding(response.content, response.headers.get("Content-Type"))
+        return response.content.decode(encoding, errors="replace")
+
+    def _listing(self, url: str) -> Tuple[List[Dict], Optional[str], Optional[int]]:
+        return parse_listing(self.fetch(url), url)
+
+    def _detail(self, book: Dict) -> Dict:
+        try:
+            return {**book, **parse_detail(self.fetch(book["url"]))}
+        except Exception as e:
+            # The listing data is still worth keeping without the extras
+            logger.error(f"📚 Detail page {book['url']} failed: {e}")
+            self.failures.append(book["url"])
+            return book
+
+    def iter_books(self, details: bool = False) -> Iterator[Dict]:
+        """Yield one dict per book across the whole catalogue."""
+        pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="catalogue")
+        self.failures = []
+        self.failed_pages = []
+        # future -> (kind, url), kind being "page" or "detail"
+        pending: Dict[Future, Tuple[str, str]] = {
+            pool.submit(self._listing, self.start_url): ("page", self.start_url)
+        }
+        first_page = True
+        fanned_out = False
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, url = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"📚 Catalogue {kind} {url} failed: {e}")
+                        self.failures.append(url)
+                        if kind == "page":
+                            self.failed_pages.append(url)
+                        continue
+
+                    if kind == "detail":
+                        yield result
+                        continue
+
+                    books, next_url, total_pages = result
+                    if first_page:
+                        first_page = False
+                        urls = _page_urls(next_url, total_pages)
+                        if urls is not None:
+                            fanned_out = True
+                            for page_url in urls:
+                                pending[pool.submit(self._listing, page_url)] = ("page", page_url)
+                    if next_url and not fanned_out:
+                        # No page count to fan out on, so follow the chain
+                        pending[pool.submit(self._listing, next_url)] = ("page", next_url)
+
+                    for book in books:
+                        if details:
+                            pending[pool.submit(self._detail, book)] = ("detail", book["url"])
+                        else:
+                            yield book
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if self.strict and self.failed_pages:
+            raise CatalogueError(
+                f"{len(self.failed_pages)} catalogue page(s) failed, starting with {self.failed_pages[0]}"
+            )
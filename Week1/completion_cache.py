@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from metrics import get_metrics
+from response_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def completion_key(model: str, messages: List[Dict[str, str]], max_tokens: Optional[int]) -> str:
+    """Stable hash of everything that determines a completion."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "max_tokens": max_tokens},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Two-tier (in-memory LRU + SQLite) cache for chat completion text.
+
+    Lookups check memory first, then disk; disk hits are promoted back into
+    memory. Entries older than `ttl` seconds are treated as misses. Set
+    `enabled=False` to bypass the cache entirely.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 24 * 3600,
+        max_memory_entries: int = 256,
+        enabled: bool = True,
+    ):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "completions.sqlite")
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.enabled = enabled
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def _expired(self, created_at: float) -> bool:
+        return time.time() - created_at >= self.ttl
+
+    def _remember(self, key: str, content: str, created_at: float):
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        content, result = self._lookup(key)
+        get_metrics().inc("cache_requests_total", cache="completion", result=result)
+        return content
+
+    def _lookup(self, key: str) -> Tuple[Optional[str], str]:
+        """The cached completion (or None) and which tier answered."""
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and not self._expired(cached[1]):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return cached[0], "memory"
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT content, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row and not self._expired(row[1]):
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[0], "disk"
+
+            self.misses += 1
+            return None, "miss"
+
+    def put(self, key: str, content: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, content, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?)", (key, content, now)
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from disk and return how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM completions WHERE created_at <= ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[CompletionCache] = None
+_default_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """Return the process-wide completion cache, creating it on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = CompletionCache()
+        return _default_cache
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from functools import lru_cache
+from typing import Callable, List, Sequence, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Pages whose URL or title mention these tend to carry what a brochure needs
+PRIORITY_KEYWORDS = re.compile(
+    r"about|career|job|product|service|solution|team|mission|company|culture|customer",
+    re.IGNORECASE,
+)
+# Where tiktoken downloads an encoding's BPE ranks from on first use
+TIKTOKEN_BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/{}.tiktoken"
+
+
+def tiktoken_is_cached(encoding_name: str) -> bool:
+    """True if tiktoken can load `encoding_name` from its local cache, without a download.
+
+    Mirrors tiktoken's cache lookup: $TIKTOKEN_CACHE_DIR, then
+    $DATA_GYM_CACHE_DIR, then a data-gym-cache folder in the temp dir;
+    an empty setting disables the cache.
+    """
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return False
+    key = hashlib.sha1(TIKTOKEN_BLOB_URL.format(encoding_name).encode()).hexdigest()
+    return os.path.exists(os.path.join(cache_dir, key))
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model: str = "gpt-4o-mini") -> Callable[[str], int]:
+    """Best available token counter for `model`.
+
+    Prefers tiktoken, then the GPT-2 tokenizer from transformers, and falls
+    back to the usual ~4 characters per token estimate. Only files already
+    on disk are used, so this never blocks on a download.
+    """
+    try:
+        import tiktoken
+        from tiktoken.model import encoding_name_for_model
+        try:
+            name = encoding_name_for_model(model)
+        except KeyError:
+            name = "o200k_base"
+        if tiktoken_is_cached(name):
+            encoding = tiktoken.get_encoding(name)
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        logger.info(f"🧮 tiktoken's {name} encoding is not cached locally; not downloading it")
+    except Exception:
+        pass
+
+    try:
+        from transformers import AutoTokenizer
+        # Only a tokenizer already on disk: never download inside a pipeline run
+        tokenizer = AutoTokenizer.from_pretrained("gpt2", local_files_only=True)
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    except Exception:
+        pass
+
+    logger.info("🧮 No tokenizer available, estimating tokens from characters")
+    return lambda text: (len(text) + 3) // 4
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    return get_token_counter(model)(text)
+
+
+def _page_rank(index: int, page) -> Tuple[int, int]:
+    """Sort key: landing page first, then keyword-rich pages, then discovery order."""
+    if index == 0:
+        return (0, index)
+    haystack = f"{urlparse(page.url).path} {page.title or ''}"
+    return (1 if PRIORITY_KEYWORDS.search(haystack) else 2, index)
+
+
+def dedupe_lines(pages: Sequence) -> List[List[str]]:
+    """Split each page into lines, dropping lines already seen on an earlier page.
+
+    Navigation menus, footers and cookie banners repeat on every page of a
+    site; this keeps only their first occurrence.
+    """
+    seen = set()
+    result = []
+    for page in pages:
+        kept = []
+        for line in page.text.split("\n"):
+            line = line.strip()
+            if not line or line in seen:
+                continue
+            seen.add(line)
+            kept.append(line)
+        result.append(kept)
+    return result
+
+
+def _truncate(line: str, allowed: int, count: Callable[[str], int]) -> str:
+    """Longest prefix (by a shrinking character estimate) of `line` costing at most `allowed` tokens."""
+    cost = count(line) + 1
+    chars = len(line) * allowed // max(cost, 1)
+    while chars > 0 and count(line[:chars]) + 1 > allowed:
+        chars = chars * 9 // 10
+    return line[:chars]
+
+
+def _allocate(sizes: List[int], budget: int) -> List[int]:
+    """Split `budget` across sections: small ones get all they need, big ones share the rest."""
+    allocation = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    for position, i in enumerate(order):
+        share = remaining // (len(order) - position)
+        allocation[i] = min(sizes[i], share)
+        remaining -= allocation[i]
+    return allocation
+
+
+def condense_pages(
+    pages: Sequence,
+    token_budget: int = 6000,
+    model: str = "gpt-4o-mini",
+    min_section_tokens: int = 50,
+) -> str:
+    """Join crawled pages into prompt text that fits in `token_budget` tokens.
+
+    Boilerplate lines shared across pages are removed, sections are ranked
+    (landing page, then about/careers/product-style pages) and each one is
+    filled line by line, skipping lines that no longer fit, so the total
+    stays within budget. Sections that would get fewer than
+    `min_section_tokens` are dropped, lowest rank first.
+    """
+    count = get_token_counter(model)
+    # Like BrochureGenerator.join_pages: keep the landing page even if it failed
+    pages = [page for index, page in enumerate(pages) if index == 0 or page.error is None]
+    if not pages:
+        return ""
+
+    ranked = sorted(range(len(pages)), key=lambda i: _page_rank(i, pages[i]))
+    pages = [pages[i] for i in ranked]
+    page_lines = dedupe_lines(pages)
+
+    headers = [
+        f"🔗 Page: {page.url}\n🌐 Webpage Title: {page.title}\n\n📄 Webpage Contents:\n"
+        for page in pages
+    ]
+    line_tokens = [[count(line) + 1 for line in lines] for lines in page_lines]
+    header_tokens = [count(header) for header in headers]
+
+    # Drop the lowest-ranked sections until each remaining one gets a useful share
+    keep = len(pages)
+    while keep > 1 and (token_budget - sum(header_tokens[:keep])) // keep < min_section_tokens:
+        keep -= 1
+    body_budget = max(0, token_budget - sum(header_tokens[:keep]))
+    allocation = _allocate([sum(tokens) for tokens in line_tokens[:keep]], body_budget)
+
+    sections = []
+    for header, lines, tokens, allowed in zip(headers, page_lines, line_tokens, allocation):
+        used = 0
+        kept: List[str] = []
+        for line, cost in zip(lines, tokens):
+            if used + cost > allowed:
+                if not kept:
+                    # An overlong first line would otherwise leave the section empty
+                    line = _truncate(line, allowed - used, count)
+                    if line:
+                        kept.append(line)
+                        used += count(line) + 1
+                # Shorter lines further down may still fit
+                continue
+            kept.append(line)
+            used += cost
+        sections.append(header + "\n".join(kept) + "\n\n")
+
+    if keep < len(pages):
+        logger.info(f"✂️ Dropped {len(pages) - keep} low-ranked page(s) to fit {token_budget} tokens")
+    return "".join(sections)
@@ -0,0 +1,197 @@
+import contextvars
+import logging
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from day5 import Website
+from http_client import Deadline
+from links import FOLLOWED_SCHEMES, UrlIndex, host
+
+logger = logging.getLogger(__name__)
+
+# Links pointing at these are downloads, not pages worth summarising
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.zip', '.gz', '.tar', '.exe', '.dmg',
+    '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico',
+    '.mp3', '.mp4', '.mov', '.avi', '.css', '.js', '.xml', '.json',
+)
+
+
+class Crawler:
+    """Concurrent breadth-first crawler that follows `Website.links`.
+
+    Pages are fetched on a bounded thread pool, each host gets at most
+    `per_host_limit` requests in flight, and no more than `max_pages`
+    URLs are ever scheduled. A URL whose host is busy waits in its host's
+    queue rather than on a pool worker, so other hosts keep the workers.
+    Pages come back in discovery order.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 1,
+        max_pages: int = 20,
+        max_workers: int = 8,
+        per_host_limit: int = 4,
+        same_host_only: bool = True,
+        page_factory: Callable[[str], Website] = Website,
+    ):
+        if max_pages < 1:
+            raise ValueError("max_pages must be at least 1")
+        self.max_depth = max(0, max_depth)
+        self.max_pages = max_pages
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.same_host_only = same_host_only
+        self.page_factory = page_factory
+
+    def _fetch(self, url: str, deadline: Optional[Deadline] = None) -> Optional[Website]:
+        if deadline is not None and deadline.done:
+            # Queued behind other fetches for too long; not worth starting
+            return None
+        try:
+            if deadline is None:
+                return self.page_factory(url)
+            return self.page_factory(url, deadline=deadline)
+        except Exception as e:
+            logger.error(f"🕷️ Crawl of {url} failed: {e}")
+            return None
+
+    def _should_follow(self, link: str, root_host: str) -> bool:
+        # `Website.links` are already canonical: lowercase scheme and host
+        parsed = urlsplit(link)
+        if parsed.scheme not in FOLLOWED_SCHEMES:
+            return False
+        if self.same_host_only and host(link) != root_host:
+            return False
+        return not parsed.path.lower().endswith(SKIPPED_EXTENSIONS)
+
+    def _frontier(self, page: Website, root_host: str, seen: UrlIndex, budget: int) -> List[str]:
+        """Unseen, followable links from `page`, at most `budget` of them."""
+        links: List[str] = []
+        for link in page.links:
+            if len(links) >= budget:
+                break
+            if self._should_follow(link, root_host) and seen.add(link):
+                links.append(link)
+        return links
+
+    def crawl(self, start_url: str, deadline: Optional[Deadline] = None) -> List[Website]:
+        """Crawl from `start_url` and return the fetched pages in discovery order.
+
+        With a `deadline`, every fetch shares its budget, nothing new is
+        scheduled once it has passed (or been cancelled), and the crawl
+        returns whatever finished in time.
+        """
+        if not start_url.startswith(('http://', 'https://')):
+            start_url = f'https://{start_url}'
+        root_host = host(start_url)
+
+        seen = UrlIndex([start_url])
+        results: List[Tuple[int, Website]] = []
+        # Per-host slots are only ever touched on this thread
+        in_flight: Dict[str, int] = defaultdict(int)
+        waiting: Dict[str, Deque[Tuple[str, int, int]]] = defaultdict(deque)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # future -> (discovery order, depth, host)
+            pending: Dict[Future, Tuple[int, int, str]] = {}
+
+            def schedule(url: str, order: int, depth: int):
+                url_host = host(url)
+                if in_flight[url_host] >= self.per_host_limit:
+                    waiting[url_host].append((url, order, depth))
+                    return
+                in_flight[url_host] += 1
+                future = pool.submit(contextvars.copy_context().run, self._fetch, url, deadline)
+                pending[future] = (order, depth, url_host)
+
+            schedule(start_url, 0, 0)
+            scheduled = 1
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    order, depth, url_host = pending.pop(future)
+                    in_flight[url_host] -= 1
+                    if waiting[url_host]:
+                        if deadline is not None and deadline.done:
+                            waiting[url_host].clear()
+                        else:
+                            schedule(*waiting[url_host].popleft())
+
+                    page = future.result()
+                    if page is None:
+                        continue
+                    results.append((order, page))
+
+                    if depth >= self.max_depth or (deadline is not None and deadline.done):
+                        continue
+                    for link in self._frontier(page, root_host, seen, self.max_pages - scheduled):
+                        schedule(link, scheduled, depth + 1)
+                        scheduled += 1
+
+        results.sort(key=lambda item: item[0])
+        logger.info(f"🕷️ Crawled {len(results)} page(s) from {start_url}")
+        return [page for _, page in results]
+
+    async def crawl_async(
+        self,
+        start_url: str,
+        fetch_page: Callable[..., Awaitable[Website]],
+        deadline: Optional[Deadline] = None,
+    ) -> List[Website]:
+        """Asyncio twin of `crawl`, fetching pages with the coroutine `fetch_page`.
+
+        A `deadline` is handled as in `crawl` and passed on to `fetch_page`.
+        """
+        # Only the async path needs asyncio (~70 ms to import)
+        import asyncio
+
+        if not start_url.startswith(('http://', 'https://')):
+            start_url = f'https://{start_url}'
+        root_host = host(start_url)
+
+        workers = asyncio.Semaphore(self.max_workers)
+        host_slots: Dict[str, "asyncio.Semaphore"] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host_limit)
+        )
+
+        async def fetch(url: str) -> Optional[Website]:
+            # Host slot first: a task waiting on a busy host must not hold a worker
+            async with host_slots[host(url)], workers:
+                if deadline is not None and deadline.done:
+                    return None
+                try:
+                    if deadline is None:
+                        return await fetch_page(url)
+                    return await fetch_page(url, deadline=deadline)
+                except Exception as e:
+                    logger.error(f"🕷️ Crawl of {url} failed: {e}")
+                    return None
+
+        seen = UrlIndex([start_url])
+        results: List[Tuple[int, Website]] = []
+        pending = {asyncio.ensure_future(fetch(start_url)): (0, 0)}
+        scheduled = 1
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                order, depth = pending.pop(task)
+                page = task.result()
+                if page is None:
+                    continue
+                results.append((order, page))
+
+                if depth >= self.max_depth or (deadline is not None and deadline.done):
+                    continue
+                for link in self._frontier(page, root_host, seen, self.max_pages - scheduled):
+                    pending[asyncio.ensure_future(fetch(link))] = (scheduled, depth + 1)
+                    scheduled += 1
+
+        results.sort(key=lambda item: item[0])
+        logger.info(f"🕷️ Crawled {len(results)} page(s) from {start_url}")
+        return [page for _, page in results]
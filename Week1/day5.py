@@ -1,95 +1,203 @@
 import os
-import requests
-import json
 import logging
-from typing import List, Dict, Optional
-from urllib.parse import urlparse
+import threading
+from functools import partial
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
 
-import streamlit as st
-from bs4 import BeautifulSoup
-from openai import OpenAI
+from http_client import DEFAULT_MAX_BYTES, Deadline, HttpClient, get_client
+from response_cache import ResponseCache, conditional_headers, get_response_cache, store_response
+from completion_cache import CompletionCache, completion_key, get_completion_cache
+from condense import condense_pages, count_tokens
+from metrics import get_metrics, record_token_usage
+from parsers import parse_html, to_ascii
+from encoding_detect import resolve_encoding
+from links import extract_links
 
+if TYPE_CHECKING:
+    # openai takes ~0.6 s to import; it is only loaded once a completion is needed
+    from openai import OpenAI
 
-# Logging Configuration
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - 🔍 %(message)s'
-)
+__all__ = ["BrochureGenerator", "Website", "WebsiteScraperError", "configure_logging"]
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - 🔍 %(message)s'
 logger = logging.getLogger(__name__)
 
+
+def configure_logging(level: int = logging.INFO):
+    """Logging setup for entry points (CLI scripts, the Streamlit app); importing day5 leaves logging alone."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+
+
 class WebsiteScraperError(Exception):
     """Custom exception with a fun twist."""
     def __init__(self, message):
         super().__init__(f"🕸️ Web Scraping Hiccup: {message}")
 
-import requests
-import chardet
-from bs4 import BeautifulSoup
-import logging
 
 class Website:
     """Enhanced website scraper with robust encoding handling."""
     
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        client: Optional[HttpClient] = None,
+        cache: Optional[ResponseCache] = None,
+        use_cache: bool = True,
+        parser: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self._reset(url, parser)
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        
+        if use_cache and cache is None:
+            cache = get_response_cache()
+        
+        try:
+            content, self.encoding = self._fetch(client or get_client(), cache if use_cache else None)
+            self._parse(content, self.encoding)
+        
+        except requests.RequestException as e:
+            self._fail(e)
+    
+    @classmethod
+    def from_content(
+        cls,
+        url: str,
+        content: bytes,
+        encoding: Optional[str] = None,
+        parser: Optional[str] = None,
+        content_type: Optional[str] = None,
+        final_url: Optional[str] = None,
+    ) -> "Website":
+        """Build a Website from a body fetched elsewhere (e.g. an async client).
+
+        `final_url` is where the fetch ended up after redirects.
+        """
+        page = cls.__new__(cls)
+        page._reset(url, parser)
+        page.final_url = final_url or page.url
+        if encoding:
+            page.encoding, page.encoding_strategy = encoding, "provided"
+        else:
+            page.encoding, page.encoding_strategy = resolve_encoding(content, content_type)
+        page._parse(content, page.encoding)
+        return page
+    
+    @classmethod
+    def from_error(cls, url: str, error: Exception) -> "Website":
+        """Build the placeholder Website for a page that could not be fetched."""
+        page = cls.__new__(cls)
+        page._reset(url)
+        page._fail(error)
+        return page
+    
+    def _reset(self, url: str, parser: Optional[str] = None):
         # URL Validation with Emoji Flair
         if not url.startswith(('http://', 'https://')):
             url = f'https://{url}'
         
         self.url = url
+        # Where the fetch ended up after redirects; relative links resolve against it
+        self.final_url = url
         self.title: str = ""
         self.text: str = ""
         self.links: List[str] = []
+        self.error: Optional[str] = None
+        self.from_cache: bool = False
+        self.encoding: Optional[str] = None
+        # Which resolve_encoding strategy produced `encoding`, or "cache"
+        self.encoding_strategy: Optional[str] = None
+        # HTML parser backend name from parsers.PARSERS; None picks the fastest installed
+        self.parser = parser
+        # Shared with the caller (e.g. a crawl): cancelling it stops this fetch too
+        self.deadline: Optional[Deadline] = None
+        self.max_bytes = DEFAULT_MAX_BYTES
+    
+    def _fail(self, error: Exception):
+        logging.error(f"Failed to access {self.url}: {error}")
+        self.error = str(error)
+        self.text = f"Unable to scrape website: {error}"
+        self.links = []
+    
+    def _fetch(self, client: HttpClient, cache: Optional[ResponseCache]) -> Tuple[bytes, str]:
+        """Return the page body and its encoding, from cache when possible."""
+        entry = cache.get(self.url) if cache else None
+        if entry and cache.is_fresh(entry):
+            cache.record_hit()
+            self.final_url = entry.final_url or self.url
+            self.from_cache = True
+            self.encoding_strategy = "cache"
+            return entry.body, entry.encoding
         
-        try:
-            # Improved request with encoding detection
-            response = requests.get(
-                url, 
-                timeout=10,
-                headers={'User-Agent': 'CompanyBrochureGenerator/1.0'}
+        # Pooled keep-alive session shared by every Website; a stale
+        # entry turns this into a conditional GET
+        metrics = get_metrics()
+        with metrics.span("fetch", url=self.url) as span:
+            # Streamed, size-capped and bounded by one budget across redirects
+            response = client.fetch(
+                self.url,
+                headers=conditional_headers(entry),
+                deadline=self.deadline,
+                max_bytes=self.max_bytes,
             )
-            response.raise_for_status()
-            
-            # Detect encoding
-            encoding = chardet.detect(response.content)['encoding'] or 'utf-8'
-            
-            # Decode content with detected or fallback encoding
-            try:
-                decoded_content = response.content.decode(encoding)
-            except UnicodeDecodeError:
-                # Fallback to utf-8 with error handling
-                decoded_content = response.content.decode('utf-8', errors='ignore')
-            
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(decoded_content, "html.parser")
-            
-            # Title Extraction with Fallback
-            self.title = soup.title.string if soup.title else "Unnamed Company"
-            
-            # Text Extraction with Robust Encoding
-            if soup.body:
-                for irrelevant in soup.body(["script", "style", "img", "input", "noscript", "svg"]):
-                    irrelevant.decompose()
-                
-                # Extract text, handling potential encoding issues
-                self.text = soup.body.get_text(separator="\n", strip=True)
-                
-                # Ensure text is clean and readable
-                self.text = ''.join(char for char in self.text if ord(char) < 128 or char in '\n\r\t')
-            else:
-                self.text = "No descriptive content found"
-            
-            # Smart Link Extraction
-            links = [link.get("href") for link in soup.find_all("a") if link.get("href")]
-            self.links = [
-                link if link.startswith('http') else f"{self.url.rstrip('/')}/{link.lstrip('/')}"
-                for link in links 
-                if not any(x in link.lower() for x in ['privacy', 'terms', 'cookie', 'contact', '@'])
-            ]
+            span.set(status=response.status_code, bytes=len(response.content), truncated=response.truncated)
+            if not (entry and response.status_code == 304):
+                response.raise_for_status()
+        metrics.inc("bytes_total", len(response.content))
         
-        except requests.RequestException as e:
-            logging.error(f"Failed to access {url}: {e}")
-            self.text = f"Unable to scrape website: {e}"
-            self.links = []
+        if entry and response.status_code == 304:
+            cache.touch(self.url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            cache.record_hit(revalidated=True)
+            self.final_url = entry.final_url or self.url
+            self.from_cache = True
+            self.encoding_strategy = "cache"
+            return entry.body, entry.encoding
+        
+        self.final_url = response.url
+        encoding, self.encoding_strategy = resolve_encoding(
+            response.content, response.headers.get('Content-Type')
+        )
+        if cache:
+            cache.record_miss()
+            store_response(
+                cache, self.url, response.content, encoding, response.headers,
+                final_url=response.url, truncated=response.truncated,
+            )
+        return response.content, encoding
+    
+    def _parse(self, content: bytes, encoding: str):
+        with get_metrics().span("parse", url=self.url, bytes=len(content)):
+            self._parse_content(content, encoding)
+    
+    def _parse_content(self, content: bytes, encoding: str):
+        # Decode content with detected or fallback encoding
+        try:
+            decoded_content = content.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            # Fallback to utf-8 with error handling
+            decoded_content = content.decode('utf-8', errors='ignore')
+        
+        parsed = parse_html(decoded_content, self.parser)
+        
+        # Title Extraction with Fallback
+        self.title = parsed.title if parsed.title is not None else "Unnamed Company"
+        
+        # Text Extraction, kept to plain ASCII so it is clean and readable
+        if parsed.has_body:
+            self.text = to_ascii(parsed.text)
+        else:
+            self.text = "No descriptive content found"
+        
+        # Smart Link Extraction: resolved against the page's real location
+        # (after redirects, or its <base href>), canonical and deduped
+        base_url = urljoin(self.final_url, parsed.base_href) if parsed.base_href else self.final_url
+        self.links = extract_links(parsed.hrefs, base_url)
+
     def get_contents(self) -> str:
         """Formatted content with emojis!"""
         return f"🌐 Webpage Title: {self.title}\n\n📄 Webpage Contents:\n{self.text}\n\n"
@@ -97,17 +205,91 @@ class Website:
 class BrochureGenerator:
     """Brochure generation with enhanced error handling and styling."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        crawl_depth: int = 1,
+        max_pages: int = 8,
+        client: Optional["OpenAI"] = None,
+        cache: Optional[CompletionCache] = None,
+        token_budget: Optional[int] = 6000,
+        crawl_timeout: Optional[float] = 30,
+        page_cache: bool = True,
+    ):
         
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        if client is None and not self.api_key:
             raise ValueError("🔑 No OpenAI API key provided")
         
-        self.client = OpenAI(api_key=self.api_key)
+        # Any object with an OpenAI-style `chat.completions.create` works here
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.cache = cache or get_completion_cache()
         self.model = 'gpt-4o-mini'
+        self.max_tokens = 1000
+        self.crawl_depth = crawl_depth
+        self.max_pages = max_pages
+        # Cap on website tokens pasted into the prompt; None sends everything
+        self.token_budget = token_budget
+        # Whole-crawl budget; pages still in flight when it runs out are dropped
+        self.crawl_timeout = crawl_timeout
+        # False re-fetches every page instead of reusing the response cache
+        self.page_cache = page_cache
     
-    def create_brochure(self, company_name: str, url: str) -> str:
-        """Generate a stylish, emoji-rich brochure."""
+    @property
+    def client(self) -> "OpenAI":
+        """The API client, built on first use so scrape-only callers never import openai."""
+        with self._client_lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI(api_key=self.api_key)
+        return self._client
+    
+    def collect_contents(self, url: str, require_landing: bool = False) -> str:
+        """Crawl the landing page plus linked pages and join their contents.
+
+        With `require_landing`, a landing page that could not be fetched
+        raises `WebsiteScraperError` instead of going into the prompt as an
+        error placeholder.
+        """
+        from crawler import Crawler
+
+        with get_metrics().span("crawl", url=url) as span:
+            page_factory = Website if self.page_cache else partial(Website, use_cache=False)
+            crawler = Crawler(max_depth=self.crawl_depth, max_pages=self.max_pages, page_factory=page_factory)
+            pages = crawler.crawl(url, deadline=Deadline(self.crawl_timeout))
+            span.set(pages=len(pages), failed=sum(page.error is not None for page in pages))
+        if require_landing and (not pages or pages[0].error is not None):
+            raise WebsiteScraperError(pages[0].error if pages else f"Nothing fetched from {url}")
+        return self.prompt_contents(pages)
+    
+    def prompt_contents(self, pages: List[Website]) -> str:
+        """Website text for the prompt, condensed to `token_budget` if one is set."""
+        metrics = get_metrics()
+        with metrics.span("prompt_build", pages=len(pages)) as span:
+            if self.token_budget is None:
+                contents = self.join_pages(pages)
+            else:
+                contents = condense_pages(pages, token_budget=self.token_budget, model=self.model)
+            tokens = count_tokens(contents, self.model)
+            span.set(tokens=tokens)
+        metrics.inc("tokens_total", tokens, kind="website")
+        return contents
+    
+    @staticmethod
+    def join_pages(pages: List[Website]) -> str:
+        """Prompt text for a crawl: every page that fetched, plus the landing page."""
+        sections = [
+            f"🔗 Page: {page.url}\n{page.get_contents()}"
+            for index, page in enumerate(pages)
+            # Always keep the landing page, even if it failed, so the error reaches the prompt
+            if index == 0 or page.error is None
+        ]
+        return "".join(sections)
+    
+    @staticmethod
+    def build_messages(company_name: str, url: str, contents: str) -> List[Dict[str, str]]:
+        """Chat messages for one brochure request."""
         system_prompt = """
         🌟 Professional Brochure Writer Mode Activated! 🌟
         
@@ -123,29 +305,109 @@ class BrochureGenerator:
         highlight what makes this company special!
         """
         
-        try:
-            website = Website(url)
-            
-            user_prompt = f"""
+        user_prompt = f"""
             🏢 Company: {company_name}
             🌐 Website: {url}
             
             Detailed Website Analysis:
-            {website.get_contents()}
+            {contents}
             """
-            
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def complete(self, messages: List[Dict[str, str]], use_cache: bool = True) -> str:
+        """Run a chat completion, answering repeats from the completion cache."""
+        key = completion_key(self.model, messages, self.max_tokens)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info("♻️ Brochure served from completion cache")
+                return cached
+        
+        metrics = get_metrics()
+        with metrics.span("llm", model=self.model, stream=False) as span:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=1000
+                messages=messages,
+                max_tokens=self.max_tokens
             )
-            
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            record_token_usage(getattr(response, "usage", None), span)
+        
+        if use_cache and content:
+            self.cache.put(key, content)
+        return content
+    
+    def stream_complete(self, messages: List[Dict[str, str]], use_cache: bool = True) -> Iterator[str]:
+        """Yield completion text deltas as they arrive from the stream API."""
+        key = completion_key(self.model, messages, self.max_tokens)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info("♻️ Brochure served from completion cache")
+                yield cached
+                return
+        
+        metrics = get_metrics()
+        # Ended by hand: the generator may be suspended or closed mid-stream
+        span = metrics.span("llm", model=self.model, stream=True)
+        parts: List[str] = []
+        usage = None
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        metrics.observe("llm_ttft_seconds", span.elapsed(), model=self.model)
+                        span.set(ttft=round(span.elapsed(), 6))
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            span.end(e)
+            raise
+        finally:
+            record_token_usage(usage, span)
+            span.end()
+        
+        # Only a fully received completion is worth caching
+        if use_cache and parts:
+            self.cache.put(key, "".join(parts))
+    
+    def stream_brochure(self, company_name: str, url: str, use_cache: bool = True) -> Iterator[str]:
+        """Streaming twin of `create_brochure`: yields markdown as it is generated."""
+        try:
+            contents = self.collect_contents(url)
+            messages = self.build_messages(company_name, url, contents)
+            yield from self.stream_complete(messages, use_cache=use_cache)
         
         except Exception as e:
+            logger.error(f"🚨 Brochure generation error: {e}")
+            get_metrics().inc("errors_total", stage="brochure", type=type(e).__name__)
+            yield f"## 🤖 Brochure Generation Error\n\n{e}"
+    
+    def create_brochure(self, company_name: str, url: str, use_cache: bool = True) -> str:
+        """Generate a stylish, emoji-rich brochure."""
+        try:
+            with get_metrics().span("brochure", company=company_name, url=url):
+                contents = self.collect_contents(url)
+                messages = self.build_messages(company_name, url, contents)
+                return self.complete(messages, use_cache=use_cache)
+        
+        except Exception as e:
+            # The "brochure" span has already counted the error
             logger.error(f"🚨 Brochure generation error: {e}")
             return f"## 🤖 Brochure Generation Error\n\n{e}"
-
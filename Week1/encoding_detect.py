@@ -0,0 +1,100 @@
+import codecs
+import re
+from typing import Optional, Tuple
+
+from metrics import get_metrics
+
+# Only the start of the document is searched for <meta charset>, as browsers do
+META_SCAN_BYTES = 4096
+DETECT_CHUNK_BYTES = 4096
+DETECT_MAX_BYTES = 64 * 1024
+
+_HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+_META_CHARSET = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""",
+    re.IGNORECASE,
+)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _known(name: Optional[str]) -> Optional[str]:
+    """Python's canonical name for `name`, or None if it is not a real codec."""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    match = _HEADER_CHARSET.search(content_type or "")
+    return _known(match.group(1)) if match else None
+
+
+def charset_from_meta(content: bytes) -> Optional[str]:
+    match = _META_CHARSET.search(content[:META_SCAN_BYTES])
+    return _known(match.group(1).decode("ascii", "ignore")) if match else None
+
+
+def charset_from_bom(content: bytes) -> Optional[str]:
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+    return None
+
+
+def detect_incrementally(content: bytes, max_bytes: int = DETECT_MAX_BYTES) -> Tuple[Optional[str], float]:
+    """Feed chardet a bounded prefix chunk by chunk, stopping once it is confident.
+
+    chardet flags itself `done` as soon as one prober is certain, so most
+    non-ASCII pages stop after the first chunk or two.
+    """
+    from chardet import UniversalDetector
+
+    detector = UniversalDetector()
+    for start in range(0, min(len(content), max_bytes), DETECT_CHUNK_BYTES):
+        detector.feed(content[start:start + DETECT_CHUNK_BYTES])
+        if detector.done:
+            break
+    result = detector.close()
+    return _known(result.get("encoding")), result.get("confidence") or 0.0
+
+
+def resolve_encoding(content: bytes, content_type: Optional[str] = None) -> Tuple[str, str]:
+    """Pick the encoding for an HTML body and say how it was chosen.
+
+    Strategies, cheapest and most authoritative first: byte-order mark,
+    HTTP Content-Type charset, <meta charset> in the first 4 KB, bounded
+    incremental chardet detection, and finally UTF-8.
+    Returns ``(encoding, strategy)``.
+    """
+    with get_metrics().span("encoding", bytes=len(content)) as span:
+        encoding, strategy = _resolve(content, content_type)
+        span.set(encoding=encoding, strategy=strategy)
+    return encoding, strategy
+
+
+def _resolve(content: bytes, content_type: Optional[str]) -> Tuple[str, str]:
+    encoding = charset_from_bom(content)
+    if encoding:
+        return encoding, "bom"
+    encoding = charset_from_content_type(content_type)
+    if encoding:
+        return encoding, "http-header"
+    encoding = charset_from_meta(content)
+    if encoding:
+        return encoding, "meta"
+    encoding, _ = detect_incrementally(content)
+    if encoding == "ascii":
+        # Only the prefix was ASCII; UTF-8 reads it identically and survives what follows
+        return "utf-8", "detected"
+    if encoding:
+        return encoding, "detected"
+    return "utf-8", "default"
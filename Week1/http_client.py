@@ -0,0 +1,514 @@
+import logging
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import _set_socket_options, allowed_gai_family
+from urllib3.util.retry import Retry
+from urllib3.util.timeout import _DEFAULT_TIMEOUT
+
+from metrics import Span, get_metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {'User-Agent': 'CompanyBrochureGenerator/1.0'}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Pages bigger than this are cut off; the prompt only keeps a few KB of text anyway
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+# Types servers send when they do not know better; the body is sniffed instead
+_SNIFFED_TYPES = ('', 'application/octet-stream', 'text/plain', 'binary/octet-stream')
+_HTML_SIGNATURES = (b'<!doctype html', b'<html', b'<head', b'<body', b'<?xml', b'<!--')
+
+
+class FetchAborted(requests.RequestException):
+    """A fetch given up on by the client itself, rather than failed by the network."""
+
+
+class DeadlineExceeded(FetchAborted):
+    pass
+
+
+class FetchCancelled(FetchAborted):
+    pass
+
+
+class UnsupportedContentType(FetchAborted):
+    pass
+
+
+class Deadline:
+    """An overall time budget that can be shared, narrowed and cancelled.
+
+    Pass one down through a crawl and every fetch under it stops once the
+    budget is spent or `cancel()` is called; `child()` gives a single step
+    a tighter budget that still honours the parent's.
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        parent: Optional["Deadline"] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.clock = clock
+        self.parent = parent
+        self.expires_at = clock() + seconds if seconds is not None else None
+        self._cancelled = threading.Event()
+
+    def child(self, seconds: Optional[float]) -> "Deadline":
+        return Deadline(seconds, parent=self, clock=self.clock)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None if there is no limit."""
+        own = None if self.expires_at is None else max(0.0, self.expires_at - self.clock())
+        inherited = self.parent.remaining() if self.parent is not None else None
+        if own is None or inherited is None:
+            return own if inherited is None else inherited
+        return min(own, inherited)
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    @property
+    def done(self) -> bool:
+        """Expired or cancelled: no new work should start."""
+        return self.cancelled or self.expired
+
+    def check(self, url: str = ""):
+        """Raise if the work should stop now."""
+        if self.cancelled:
+            raise FetchCancelled(f"Fetch of {url} cancelled")
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline passed while fetching {url}")
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or '').split(';')[0].strip().lower()
+
+
+def looks_like_html(head: bytes) -> bool:
+    """Sniff the start of a body the way browsers do for untyped responses."""
+    return head[:1024].lstrip().lower().startswith(_HTML_SIGNATURES) or b'<html' in head[:1024].lower()
+
+
+def _check_declared_type(url: str, media_type: str, allowed: tuple, response=None):
+    """Refuse a body by its Content-Type, before downloading it."""
+    if media_type not in allowed and media_type not in _SNIFFED_TYPES:
+        raise UnsupportedContentType(f"{url} is {media_type}, not HTML", response=response)
+
+
+def _check_sniffed_type(url: str, media_type: str, head: bytes, response=None):
+    """Refuse a vaguely typed body whose first chunk is not HTML."""
+    if media_type in _SNIFFED_TYPES and not looks_like_html(head):
+        raise UnsupportedContentType(
+            f"{url} does not look like HTML ({media_type or 'no Content-Type'})",
+            response=response,
+        )
+
+
+def timed_create_connection(address, timeout=_DEFAULT_TIMEOUT, source_address=None, socket_options=None) -> socket.socket:
+    """urllib3's create_connection, with DNS and TCP connect recorded as separate spans."""
+    host, port = address
+    metrics = get_metrics()
+    with metrics.span("dns", host=host):
+        addresses = socket.getaddrinfo(host.strip("[]"), port, allowed_gai_family(), socket.SOCK_STREAM)
+    if not addresses:
+        raise OSError("getaddrinfo returns an empty list")
+
+    error = None
+    with metrics.span("connect", host=host) as span:
+        # Try each address in turn, like socket.create_connection
+        for family, socktype, proto, _, sockaddr in addresses:
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                _set_socket_options(sock, socket_options)
+                if timeout is not _DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                span.set(address=sockaddr[0])
+                return sock
+            except OSError as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+        raise error
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """HTTPConnection whose new sockets come from `timed_create_connection`."""
+
+    def _new_conn(self) -> socket.socket:
+        try:
+            return timed_create_connection(
+                (self._dns_host, self.port),
+                self.timeout,
+                source_address=self.source_address,
+                socket_options=self.socket_options,
+            )
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """HTTPS twin of `TimedHTTPConnection`, plus a "tls" span for the handshake.
+
+    The span opens once the TCP connection is up, so it does not repeat the
+    "dns" and "connect" time (a proxy tunnel, if any, falls inside it).
+    """
+
+    _tls_span: Optional[Span] = None
+
+    def _new_conn(self) -> socket.socket:
+        sock = TimedHTTPConnection._new_conn(self)
+        self._tls_span = get_metrics().span("tls", host=self.host)
+        return sock
+
+    def connect(self):
+        self._tls_span = None
+        try:
+            super().connect()
+        except BaseException as e:
+            if self._tls_span is not None:
+                self._tls_span.end(e)
+            raise
+        if self._tls_span is not None:
+            self._tls_span.end()
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools open connections through the timed classes above."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class LocalServerAdapter(InstrumentedAdapter):
+    """Transport that sends every request to a local stand-in server.
+
+    Mount it on a prefix (e.g. ``https://books.toscrape.com``) and requests
+    keep their path and query but hit ``target`` instead, so scrapers can
+    run against recorded fixtures without touching the network.
+    """
+
+    def __init__(self, target: str, **kwargs):
+        super().__init__(**kwargs)
+        parts = urlsplit(target)
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit((self._scheme, self._netloc, parts.path, parts.query, parts.fragment))
+        return super().send(request, **kwargs)
+
+
+class HttpClient:
+    """Shared HTTP layer: keep-alive pooling, retries with backoff, pluggable transports.
+
+    One client (and so one `requests.Session`) is meant to be reused for
+    every fetch in the process, so repeat requests to a host reuse an open
+    TCP/TLS connection instead of paying a new handshake.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 16,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 10,
+        headers: Optional[Dict[str, str]] = None,
+        host_pool_sizes: Optional[Dict[str, int]] = None,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retry_statuses = tuple(retry_statuses)
+
+        self.session = requests.Session()
+        self.session.headers.update({**DEFAULT_HEADERS, **(headers or {})})
+
+        default_adapter = self._make_adapter(pool_connections, pool_maxsize)
+        self.session.mount('http://', default_adapter)
+        self.session.mount('https://', default_adapter)
+
+        # Hosts we hit hard (e.g. during a crawl) get their own, larger pool
+        for host, size in (host_pool_sizes or {}).items():
+            self.set_host_pool_size(host, size)
+
+    def _make_retry(self) -> Retry:
+        return Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.retry_statuses,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+
+    def _make_adapter(self, pool_connections: int, pool_maxsize: int) -> HTTPAdapter:
+        return InstrumentedAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=self._make_retry(),
+        )
+
+    def set_host_pool_size(self, host: str, size: int):
+        """Give `host` a dedicated connection pool holding up to `size` connections."""
+        adapter = self._make_adapter(1, size)
+        for scheme in ('http', 'https'):
+            self.session.mount(f'{scheme}://{host}', adapter)
+
+    def mount(self, prefix: str, adapter: HTTPAdapter):
+        """Route requests whose URL starts with `prefix` through `adapter`."""
+        self.session.mount(prefix, adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def fetch(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        allowed_types: Optional[Iterable[str]] = HTML_TYPES,
+        max_redirects: int = 10,
+        chunk_size: int = 16 * 1024,
+    ) -> requests.Response:
+        """GET a page with every guard a crawler needs, returning a fully read response.
+
+        - `timeout` (default: the client's) caps the whole fetch, redirects
+          included, and is further narrowed by `deadline`.
+        - The body is streamed and cut off after `max_bytes`
+          (``response.truncated`` says so).
+        - Bodies whose Content-Type is not in `allowed_types` (sniffed when
+          the server is vague) are refused before they are downloaded.
+        - Between chunks the deadline is checked, so `deadline.cancel()`
+          stops a slow transfer promptly.
+        Guard failures raise `FetchAborted` subclasses, which are
+        `requests.RequestException`s.
+        """
+        budget = (deadline or Deadline()).child(self.timeout if timeout is None else timeout)
+        allowed = tuple(allowed_types) if allowed_types is not None else None
+        history = []
+
+        for _ in range(max_redirects + 1):
+            budget.check(url)
+            remaining = budget.remaining()
+            # Connect and each socket read get whatever budget is left
+            request_timeout = self.timeout if remaining is None else max(0.001, min(self.timeout, remaining))
+            response = self.session.get(
+                url, headers=headers, stream=True, allow_redirects=False, timeout=request_timeout
+            )
+            location = response.headers.get('Location')
+            if response.status_code in REDIRECT_STATUSES and location:
+                response.close()
+                history.append(response)
+                url = urljoin(response.url, location)
+                continue
+            break
+        else:
+            raise requests.TooManyRedirects(f"Exceeded {max_redirects} redirects", response=response)
+
+        response.history = history
+        try:
+            self._read_body(response, budget, max_bytes, allowed, chunk_size)
+        finally:
+            response.close()
+        return response
+
+    def _read_body(
+        self,
+        response: requests.Response,
+        budget: Deadline,
+        max_bytes: int,
+        allowed: Optional[tuple],
+        chunk_size: int,
+    ):
+        response.truncated = False
+        if response.status_code == 304 or response.request.method == 'HEAD':
+            response._content = b''
+            return
+
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            logger.warning(f"✂️ {response.url} is {int(length)} bytes; keeping the first {max_bytes}")
+
+        media_type = _media_type(response.headers.get('Content-Type'))
+        check_type = allowed is not None and 200 <= response.status_code < 300
+        if check_type:
+            _check_declared_type(response.url, media_type, allowed, response)
+
+        chunks = []
+        size = 0
+        while size < max_bytes:
+            budget.check(response.url)
+            # read1 returns as soon as any data arrives, so a slow drip
+            # cannot hold us much past the deadline
+            chunk = response.raw.read1(min(chunk_size, max_bytes - size), decode_content=True)
+            if not chunk:
+                break
+            if check_type and size == 0:
+                _check_sniffed_type(response.url, media_type, chunk, response)
+            chunks.append(chunk)
+            size += len(chunk)
+        else:
+            response.truncated = bool(response.raw.read1(1))
+
+        response._content = b''.join(chunks)
+        response._content_consumed = True
+
+    def close(self):
+        self.session.close()
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+async def fetch_async(
+    client: "httpx.AsyncClient",
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    deadline: Optional[Deadline] = None,
+    timeout: Optional[float] = 10,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    allowed_types: Optional[Iterable[str]] = HTML_TYPES,
+    chunk_size: int = 16 * 1024,
+) -> "httpx.Response":
+    """Asyncio twin of `HttpClient.fetch` for an httpx client, with the same guards.
+
+    `timeout` caps the whole fetch (redirects are followed by the client)
+    and is narrowed by `deadline`; the body is cut off after `max_bytes`
+    and refused if it is not HTML. The returned response is fully read.
+    """
+    import asyncio
+
+    budget = (deadline or Deadline()).child(timeout)
+    budget.check(url)
+    allowed = tuple(allowed_types) if allowed_types is not None else None
+    try:
+        return await asyncio.wait_for(
+            _read_async(client, url, headers, budget, max_bytes, allowed, chunk_size),
+            budget.remaining(),
+        )
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Deadline passed while fetching {url}")
+
+
+async def _read_async(
+    client: "httpx.AsyncClient",
+    url: str,
+    headers: Optional[Dict[str, str]],
+    budget: Deadline,
+    max_bytes: int,
+    allowed: Optional[tuple],
+    chunk_size: int,
+) -> "httpx.Response":
+    async with client.stream('GET', url, headers=headers) as response:
+        response.truncated = False
+        final_url = str(response.url)
+        if response.status_code == 304:
+            response._content = b''
+            return response
+
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            logger.warning(f"✂️ {final_url} is {int(length)} bytes; keeping the first {max_bytes}")
+
+        media_type = _media_type(response.headers.get('Content-Type'))
+        check_type = allowed is not None and 200 <= response.status_code < 300
+        if check_type:
+            _check_declared_type(final_url, media_type, allowed)
+
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes(chunk_size):
+            budget.check(final_url)
+            if size >= max_bytes:
+                response.truncated = True
+                break
+            if check_type and size == 0:
+                _check_sniffed_type(final_url, media_type, chunk)
+            kept = chunk[:max_bytes - size]
+            chunks.append(kept)
+            size += len(kept)
+            if len(kept) < len(chunk):
+                response.truncated = True
+                break
+
+        response._content = b''.join(chunks)
+    return response
+
+
+def get_client() -> HttpClient:
+    """Return the process-wide client, creating it on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def configure_client(**kwargs) -> HttpClient:
+    """Replace the process-wide client with one built from `kwargs`."""
+    return set_client(HttpClient(**kwargs))
+
+
+def set_client(client: HttpClient) -> HttpClient:
+    """Install `client` as the process-wide client, closing the previous one."""
+    global _default_client
+    with _default_lock:
+        previous, _default_client = _default_client, client
+    if previous is not None and previous is not client:
+        previous.close()
+    return client
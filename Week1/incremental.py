@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from catalogue import CatalogueScraper, START_URL, parse_detail, parse_listing, parse_price
+from encoding_detect import resolve_encoding
+from http_client import HttpClient
+from record_sink import open_sink
+
+logger = logging.getLogger(__name__)
+
+# The old page-1 script glued hrefs onto the site root and lost "catalogue/"
+_LEGACY_BOOK_URL = re.compile(r"^(https?://books\.toscrape\.com/)(?!catalogue/)([^/]+_\d+/index\.html)$")
+
+
+def record_hash(record: Dict) -> str:
+    """Stable hash of a record's content (ignoring any stored hash)."""
+    content = {key: value for key, value in record.items() if key != "content_hash"}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _upgrade_legacy(record: Dict) -> Dict:
+    """Bring a record from the old books.json format up to the current one."""
+    record = dict(record)
+    record["url"] = _LEGACY_BOOK_URL.sub(r"\1catalogue/\2", record["url"])
+    if isinstance(record.get("price"), str):
+        record["price"], record["currency"] = parse_price(record["price"])
+    return record
+
+
+def load_snapshot(path: str) -> Dict[str, Dict]:
+    """Index a previous scrape by book URL; reads JSONL or the legacy JSON list."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            records = json.load(f)
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+    return {record["url"]: record for record in map(_upgrade_legacy, records)}
+
+
+class IncrementalCatalogueScraper(CatalogueScraper):
+    """CatalogueScraper that skips pages which have not changed since the last run.
+
+    Every fetch sends the ETag/Last-Modified seen last time; a 304, or a
+    body whose hash matches the stored one, means the page is reused from
+    the previous snapshot instead of being parsed again. Validators and
+    hashes live in a small JSON state file next to the snapshot.
+    """
+
+    def __init__(
+        self,
+        previous: Dict[str, Dict],
+        state: Optional[Dict[str, Dict]] = None,
+        start_url: str = START_URL,
+        client: Optional[HttpClient] = None,
+        max_workers: int = 8,
+    ):
+        # Partial runs are fine here: unseen books are carried over, not deleted
+        super().__init__(start_url, client=client, max_workers=max_workers, strict=False)
+        self.previous = previous
+        self.state: Dict[str, Dict] = state or {}
+        self.unchanged_pages = 0
+        self._lock = threading.Lock()
+
+    def _fetch_if_changed(self, url: str, force: bool = False) -> Optional[str]:
+        """Page HTML, or None when the server or the content hash says it is unchanged."""
+        known = {} if force else self.state.get(url, {})
+        headers = {}
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+
+        response = self.client.get(url, headers=headers)
+        if known and response.status_code == 304:
+            self._count_unchanged()
+            return None
+        response.raise_for_status()
+
+        digest = hashlib.sha1(response.content).hexdigest()
+        with self._lock:
+            self.state[url] = {
+                **self.state.get(url, {}),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "hash": digest,
+            }
+        if known.get("hash") == digest:
+            self._count_unchanged()
+            return None
+
+        encoding, _ = resolve_encoding(response.content, response.headers.get("Content-Type"))
+        return response.content.decode(encoding, errors="replace")
+
+    def _count_unchanged(self):
+        with self._lock:
+            self.unchanged_pages += 1
+
+    def _listing(self, url: str) -> Tuple[List[Dict], Optional[str], Optional[int]]:
+        html = self._fetch_if_changed(url)
+        if html is None:
+            page = self.state[url]
+            books = [self.previous.get(book_url) for book_url in page.get("urls", [])]
+            if all(books):
+                return books, page.get("next_url"), page.get("total_pages")
+            # The snapshot lost some of this page's books; parse it properly
+            html = self._fetch_if_changed(url, force=True)
+
+        books, next_url, total_pages = parse_listing(html, url)
+        with self._lock:
+            self.state[url].update(
+                urls=[book["url"] for book in books],
+                next_url=next_url,
+                total_pages=total_pages,
+            )
+        # Keep detail fields from last time until the detail page says otherwise
+        return [{**self.previous.get(book["url"], {}), **book} for book in books], next_url, total_pages
+
+    def _detail(self, book: Dict) -> Dict:
+        try:
+            html = self._fetch_if_changed(book["url"])
+            if html is None and "upc" in book:
+                return book
+            if html is None:
+                html = self._fetch_if_changed(book["url"], force=True)
+            return {**book, **parse_detail(html)}
+        except Exception as e:
+            logger.error(f"📚 Detail page {book['url']} failed: {e}")
+            self.failures.append(book["url"])
+            return book
+
+
+def _load_state(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(path: str, state: Dict[str, Dict]):
+    part = f"{path}.part"
+    with open(part, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(part, path)
+
+
+def diff_records(previous: Dict[str, Dict], current: Iterator[Dict]) -> Iterator[Tuple[str, Dict]]:
+    """Yield ("insert" | "update" | "unchanged", record) for each scraped record.
+
+    `current` records get their `content_hash` filled in along the way.
+    Deletes are left to the caller, who knows which URLs were seen.
+    """
+    for record in current:
+        record["content_hash"] = record_hash(record)
+        old = previous.get(record["url"])
+        if old is None:
+            yield "insert", record
+        elif old.get("content_hash", record_hash(old)) != record["content_hash"]:
+            yield "update", record
+        else:
+            yield "unchanged", record
+
+
+def incremental_scrape(
+    snapshot_path: str,
+    delta_path: str,
+    details: bool = False,
+    previous_path: Optional[str] = None,
+    start_url: str = START_URL,
+    client: Optional[HttpClient] = None,
+    max_workers: int = 8,
+) -> Dict[str, int]:
+    """Re-scrape the catalogue, writing a new snapshot and a delta of what changed.
+
+    The delta is JSONL with one ``{"op": ..., "url": ..., "record": ...}``
+    line per insert, update or delete. If any page failed to fetch, books
+    that were not seen are carried over rather than reported as deleted.
+    `previous_path` lets the first run start from a differently named
+    snapshot, such as the legacy books.json.
+    """
+    previous = load_snapshot(previous_path or snapshot_path)
+    state_path = f"{snapshot_path}.state.json"
+    scraper = IncrementalCatalogueScraper(
+        previous,
+        _load_state(state_path),
+        start_url=start_url,
+        client=client,
+        max_workers=max_workers,
+    )
+
+    counts = {"insert": 0, "update": 0, "delete": 0, "unchanged": 0}
+    seen = set()
+    with open_sink(snapshot_path, format="jsonl") as snapshot, open_sink(delta_path, format="jsonl") as delta:
+        for op, record in diff_records(previous, scraper.iter_books(details=details)):
+            if record["url"] in seen:
+                continue
+            seen.add(record["url"])
+            snapshot.write(record)
+            counts[op] += 1
+            if op != "unchanged":
+                delta.write({"op": op, "url": record["url"], "record": record})
+
+        missing = [url for url in previous if url not in seen]
+        if scraper.failures and missing:
+            logger.warning(f"⚠️ {len(scraper.failures)} fetch(es) failed; keeping {len(missing)} unseen book(s)")
+            for url in missing:
+                snapshot.write(previous[url])
+        else:
+            for url in missing:
+                counts["delete"] += 1
+                delta.write({"op": "delete", "url": url, "record": None})
+
+    _save_state(state_path, scraper.state)
+    logger.info(
+        f"🔁 Incremental scrape: {counts['insert']} new, {counts['update']} updated, "
+        f"{counts['delete']} deleted, {counts['unchanged']} unchanged "
+        f"({scraper.unchanged_pages} page(s) skipped)"
+    )
+    return counts
@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from day5 import BrochureGenerator
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle: queued -> scraping -> generating -> done | error
+QUEUED, SCRAPING, GENERATING, DONE, ERROR = "queued", "scraping", "generating", "done", "error"
+FINISHED = (DONE, ERROR)
+
+
+@dataclass
+class BrochureJob:
+    """One queued brochure and everything the status panel shows about it."""
+    company_name: str
+    url: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = QUEUED
+    brochure: Optional[str] = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent running so far (or in total, once finished)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class ScrapeCache:
+    """Crawled prompt text per URL, reused for `ttl` seconds.
+
+    A plain locked dict rather than ``st.cache_data``, so `JobQueue` worker
+    threads can use it outside a Streamlit script run. Only successful
+    scrapes are stored: when `scrape` raises, nothing is kept and the next
+    call tries again.
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_scrape(self, url: str, scrape: Callable[[str], str]) -> str:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and self.clock() - entry[0] < self.ttl:
+                self._entries.move_to_end(url)
+                return entry[1]
+        # Outside the lock: a slow crawl must not hold up other URLs
+        contents = scrape(url)
+        with self._lock:
+            self._entries[url] = (self.clock(), contents)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return contents
+
+
+class JobQueue:
+    """Runs brochure jobs on a small thread pool, off the Streamlit script thread.
+
+    Meant to be shared by every session (hold it with `st.cache_resource`);
+    each session keeps the ids it submitted and polls `get_many()`. Only
+    the most recent `max_jobs` jobs are remembered, finished ones dropping
+    out first, so a long-running server does not grow without bound.
+    """
+
+    def __init__(self, max_workers: int = 4, max_jobs: int = 200):
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max(1, max_workers), thread_name_prefix="brochure-job")
+        self._jobs: "OrderedDict[str, BrochureJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        generator: BrochureGenerator,
+        company_name: str,
+        url: str,
+        scrape: Optional[Callable[[str], str]] = None,
+        use_cache: bool = True,
+    ) -> BrochureJob:
+        """Queue a brochure; `scrape(url)` overrides `generator.collect_contents`."""
+        job = BrochureJob(company_name=company_name, url=url)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        self._pool.submit(self._run, job, generator, scrape or generator.collect_contents, use_cache)
+        logger.info(f"📥 Queued brochure job {job.id} for {company_name}")
+        return job
+
+    def _run(self, job: BrochureJob, generator: BrochureGenerator, scrape: Callable[[str], str], use_cache: bool):
+        job.started_at = time.time()
+        try:
+            job.status = SCRAPING
+            contents = scrape(job.url)
+            job.status = GENERATING
+            messages = generator.build_messages(job.company_name, job.url, contents)
+            job.brochure = generator.complete(messages, use_cache=use_cache)
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"🚨 Brochure job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = ERROR
+        finally:
+            job.finished_at = time.time()
+
+    def _evict(self):
+        """Forget the oldest jobs beyond `max_jobs`, preferring finished ones."""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[BrochureJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_many(self, job_ids: Iterable[str]) -> List[BrochureJob]:
+        """Known jobs among `job_ids`, in the given order."""
+        with self._lock:
+            return [self._jobs[jid] for jid in job_ids if jid in self._jobs]
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(not job.finished for job in self._jobs.values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, SCRAPING, GENERATING, DONE, ERROR)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
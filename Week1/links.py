@@ -0,0 +1,128 @@
+import re
+from typing import Iterable, List, Optional, Pattern
+from urllib.parse import SplitResult, parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Links a brochure never needs: legal boilerplate, contact forms, e-mail addresses
+DENY_PATTERN = re.compile(r"privacy|terms|cookie|contact|@", re.IGNORECASE)
+FOLLOWED_SCHEMES = ("http", "https")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only identify the campaign or click, never the page
+TRACKING_PARAMS = re.compile(
+    r"^(utm_\w+|gclid|dclid|fbclid|msclkid|yclid|mc_cid|mc_eid|_ga|_gl|igshid|ref_src)$",
+    re.IGNORECASE,
+)
+
+
+def _netloc(parts: SplitResult, scheme: str) -> str:
+    """Lowercase host, plus the port only when it is not the scheme's default."""
+    hostname = (parts.hostname or "").rstrip(".")
+    if ":" in hostname:
+        # IPv6 literal: `hostname` comes without the brackets the netloc needs
+        hostname = f"[{hostname}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    return hostname if port in (None, DEFAULT_PORTS.get(scheme)) else f"{hostname}:{port}"
+
+
+def _remove_dot_segments(path: str) -> str:
+    """Resolve "." and ".." in a path (RFC 3986, section 5.2.4)."""
+    if "." not in path:
+        return path
+    output: List[str] = []
+    segments = path.split("/")
+    for segment in segments:
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    if segments[-1] in (".", ".."):
+        output.append("")
+    return "/".join(output)
+
+
+def canonicalize(url: str) -> str:
+    """One spelling per page: lowercase scheme and host, no default port,
+    no dot segments, no fragment, no tracking parameters, sorted query,
+    and "/" for an empty path.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = _netloc(parts, scheme)
+    if parts.username or parts.password:
+        netloc = f"{parts.netloc.rsplit('@', 1)[0]}@{netloc}"
+
+    query = parts.query
+    if query:
+        params = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)]
+        query = urlencode(sorted(params))
+    return urlunsplit((scheme, netloc, _remove_dot_segments(parts.path) or "/", query, ""))
+
+
+def url_key(url: str) -> str:
+    """Dedup key: the canonical URL, also ignoring a trailing slash."""
+    canonical = canonicalize(url)
+    parts = urlsplit(canonical)
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme, parts.netloc, path, parts.query, ""))
+
+
+def host(url: str) -> str:
+    """Canonical ``host[:port]`` of `url`, e.g. for per-host limits."""
+    parts = urlsplit(url)
+    return _netloc(parts, parts.scheme.lower())
+
+
+class UrlIndex:
+    """Seen-URL index keyed by `url_key`."""
+
+    def __init__(self, urls: Iterable[str] = ()):
+        self._keys = set()
+        for url in urls:
+            self.add(url)
+
+    def add(self, url: str) -> bool:
+        """Record `url`; True if it had not been seen."""
+        key = url_key(url)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def extract_links(
+    hrefs: Iterable[str],
+    base_url: str,
+    deny: Optional[Pattern] = DENY_PATTERN,
+    index: Optional[UrlIndex] = None,
+) -> List[str]:
+    """Resolve, canonicalize and dedupe raw hrefs, keeping document order.
+
+    Relative hrefs are resolved against `base_url` with `urljoin`; links
+    with non-web schemes (mailto:, javascript:, tel:) or matching `deny`
+    are dropped. Pass an `index` to also drop links seen on other pages.
+    """
+    index = index if index is not None else UrlIndex()
+    links = []
+    for href in hrefs:
+        href = href.strip()
+        if not href or href.startswith("#"):
+            continue
+        if deny is not None and deny.search(href):
+            continue
+        absolute = urljoin(base_url, href)
+        if urlsplit(absolute).scheme.lower() not in FOLLOWED_SCHEMES:
+            continue
+        canonical = canonicalize(absolute)
+        if index.add(canonical):
+            links.append(canonical)
+    return links
+
@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "brochure_"
+# Seconds; wide enough for a DNS lookup at one end and a slow completion at the other
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TRACE_ENV = "BROCHURE_TRACE_FILE"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("brochure_span", default=None)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class TraceWriter:
+    """Appends finished spans to a JSONL file, one object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, event: Dict):
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Span:
+    """One timed stage. Nested spans (in the same thread) share a trace id.
+
+    Use as a context manager, or call `end()` yourself when the stage
+    does not fit in one block (e.g. a streamed completion).
+    """
+
+    def __init__(self, registry: "MetricsRegistry", name: str, attrs: Dict):
+        self.registry = registry
+        self.name = name
+        self.attrs = dict(attrs)
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.duration is not None:
+            return
+        self.duration = self.elapsed()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.registry._finish(self, error)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited from a different context (e.g. a generator resumed elsewhere)
+            pass
+        self.end(exc)
+
+
+class MetricsRegistry:
+    """Counters and latency histograms for the pipeline, plus an optional span trace.
+
+    Stage timings go to the ``brochure_stage_seconds`` histogram labelled by
+    stage; failed spans also bump ``brochure_errors_total``. `to_prometheus()`
+    renders everything in the Prometheus text exposition format.
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.trace: Optional[TraceWriter] = TraceWriter(trace_path) if trace_path else None
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(self.buckets)
+            series[key].observe(value)
+
+    def span(self, name: str, **attrs) -> Span:
+        return Span(self, name, attrs)
+
+    def _finish(self, span: Span, error: Optional[BaseException]):
+        self.observe("stage_seconds", span.duration, stage=span.name)
+        if error is not None:
+            self.inc("errors_total", stage=span.name, type=type(error).__name__)
+        if self.trace is not None:
+            self.trace.write({
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start": span.started,
+                "duration": round(span.duration, 6),
+                "attrs": span.attrs,
+                "error": span.error,
+            })
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def cache_hit_ratios(self) -> Dict[str, float]:
+        """Hit ratio per cache, from the ``cache_requests_total`` counter."""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for key, value in self._counters.get("cache_requests_total", {}).items():
+                labels = dict(key)
+                hits_total = totals.setdefault(labels.get("cache", ""), [0, 0])
+                hits_total[1] += value
+                if labels.get("result") != "miss":
+                    hits_total[0] += value
+        return {cache: hits / total for cache, (hits, total) in totals.items() if total}
+
+    def snapshot(self) -> Dict:
+        """Plain-dict view of every series, for logging or JSON dumps."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {"labels": dict(key), "count": h.count, "sum": round(h.sum, 6)}
+                    for key, h in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms, "cache_hit_ratio": self.cache_hit_ratios()}
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, h in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{full}_bucket{_format_labels(key, {'le': f'{bound:g}'})} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(key, {'le': '+Inf'})} {h.count}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key)} {h.count}")
+
+        ratios = self.cache_hit_ratios()
+        if ratios:
+            lines.append(f"# TYPE {PREFIX}cache_hit_ratio gauge")
+            for cache, ratio in sorted(ratios.items()):
+                lines.append(f'{PREFIX}cache_hit_ratio{{cache="{cache}"}} {ratio:.4f}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write the text exposition to `path` (e.g. for node_exporter's textfile collector)."""
+        part = f"{path}.part"
+        with open(part, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(part, path)
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+
+
+def record_token_usage(usage, span: Optional[Span] = None):
+    """Count prompt/completion tokens from an OpenAI `usage` block, if the API sent one."""
+    if usage is None:
+        return
+    registry = span.registry if span is not None else get_metrics()
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None) or 0
+        registry.inc("tokens_total", tokens, kind=kind)
+        if span is not None:
+            span.set(**{f"{kind}_tokens": tokens})
+
+
+def _describe_defaults(registry: MetricsRegistry) -> MetricsRegistry:
+    registry.describe("stage_seconds", "Time spent in each pipeline stage")
+    registry.describe("errors_total", "Failures by pipeline stage and exception type")
+    registry.describe("cache_requests_total", "Cache lookups by cache and result")
+    registry.describe("bytes_total", "Bytes fetched over HTTP")
+    registry.describe("tokens_total", "LLM tokens by kind (prompt, completion, website)")
+    registry.describe("llm_ttft_seconds", "Time to the first streamed completion token")
+    return registry
+
+
+_default_metrics: Optional[MetricsRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide registry; $BROCHURE_TRACE_FILE turns on span tracing."""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = _describe_defaults(MetricsRegistry(os.getenv(TRACE_ENV)))
+        return _default_metrics
+
+
+def configure_metrics(trace_path: Optional[str] = None) -> MetricsRegistry:
+    """Replace the process-wide registry, e.g. to start writing a trace file."""
+    global _default_metrics
+    registry = _describe_defaults(MetricsRegistry(trace_path))
+    with _default_lock:
+        previous, _default_metrics = _default_metrics, registry
+    if previous is not None:
+        previous.close()
+    return registry
+
+
+def span(name: str, **attrs) -> Span:
+    """Shorthand for ``get_metrics().span(...)``."""
+    return get_metrics().span(name, **attrs)
@@ -0,0 +1,139 @@
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tags whose contents never belong in the brochure text
+SKIPPED_TAGS = frozenset({"script", "style", "img", "input", "noscript", "svg"})
+
+
+@dataclass
+class ParsedPage:
+    title: Optional[str]
+    text: str
+    hrefs: List[str] = field(default_factory=list)
+    has_body: bool = True
+    # The first <base href>, which relative hrefs resolve against
+    base_href: Optional[str] = None
+
+
+def to_ascii(text: str) -> str:
+    """Drop non-ASCII characters (newlines and tabs are ASCII, so they stay)."""
+    return text.encode("ascii", "ignore").decode("ascii")
+
+
+def parse_with_soup(html: str) -> ParsedPage:
+    """Reference backend: BeautifulSoup over the pure-Python html.parser."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.string if soup.title else None
+    hrefs = [link.get("href") for link in soup.find_all("a") if link.get("href")]
+    base = soup.find("base", href=True)
+    base_href = base["href"] if base else None
+
+    if not soup.body:
+        return ParsedPage(title, "", hrefs, has_body=False, base_href=base_href)
+    for irrelevant in soup.body(list(SKIPPED_TAGS)):
+        irrelevant.decompose()
+    text = soup.body.get_text(separator="\n", strip=True)
+    return ParsedPage(title, text, hrefs, base_href=base_href)
+
+
+class _PageTarget:
+    """lxml parser target that collects title, body text and hrefs as events stream by.
+
+    No element tree is built; text inside SKIPPED_TAGS is ignored by depth
+    counting, and adjacent character chunks are merged so each text node
+    becomes one stripped line, like `get_text(separator="\\n", strip=True)`.
+    """
+
+    def __init__(self):
+        self.title_parts: Optional[List[str]] = None
+        self.in_title = False
+        self.in_body = False
+        self.skip_depth = 0
+        self.lines: List[str] = []
+        self.hrefs: List[str] = []
+        self.base_href: Optional[str] = None
+        self._buffer: List[str] = []
+
+    def _flush(self):
+        if self._buffer:
+            line = "".join(self._buffer).strip()
+            if line:
+                self.lines.append(line)
+            self._buffer = []
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag == "a":
+            href = attrib.get("href")
+            if href:
+                self.hrefs.append(href)
+        elif tag == "base" and self.base_href is None and attrib.get("href"):
+            self.base_href = attrib.get("href")
+        elif tag == "body":
+            self.in_body = True
+        elif tag == "title" and self.title_parts is None:
+            self.title_parts = []
+            self.in_title = True
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag == "title":
+            self.in_title = False
+        elif tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if self.in_title:
+            self.title_parts.append(data)
+        elif self.in_body and not self.skip_depth:
+            self._buffer.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def close(self) -> ParsedPage:
+        self._flush()
+        title = "".join(self.title_parts).strip() if self.title_parts is not None else None
+        return ParsedPage(title, "\n".join(self.lines), self.hrefs, has_body=self.in_body, base_href=self.base_href)
+
+
+def parse_with_lxml(html: str) -> ParsedPage:
+    """Fast backend: one streaming pass of libxml2's HTML parser, no tree."""
+    from lxml import etree
+
+    parser = etree.HTMLParser(target=_PageTarget(), recover=True, no_network=True)
+    parser.feed(html)
+    return parser.close()
+
+
+PARSERS: Dict[str, Callable[[str], ParsedPage]] = {
+    "html.parser": parse_with_soup,
+    "lxml": parse_with_lxml,
+}
+
+
+@lru_cache(maxsize=None)
+def default_backend() -> str:
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+def parse_html(html: str, backend: Optional[str] = None) -> ParsedPage:
+    """Parse `html` with the named backend (lxml when installed, by default)."""
+    backend = backend or default_backend()
+    try:
+        parse = PARSERS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend {backend!r}; choose from {sorted(PARSERS)}")
+    return parse(html)
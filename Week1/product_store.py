@@ -0,0 +1,324 @@
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Column name -> storage kind. "str" columns are dictionary-encoded: an
+# int32 code per row into a vocabulary of distinct values, so repeated
+# titles, categories and currencies are stored once.
+BOOK_SCHEMA = {
+    "url": "str",
+    "title": "str",
+    "price": "float64",
+    "currency": "str",
+    "availability": "str",
+    "rating": "int8",
+    "upc": "str",
+    "product_type": "str",
+    "stock": "int32",
+    "category": "str",
+    "reviews": "int32",
+}
+
+# Missing values: NaN for floats, -1 for ints and string codes
+MISSING_INT = -1
+_OPERATORS = {
+    "eq": np.equal,
+    "ne": np.not_equal,
+    "lt": np.less,
+    "le": np.less_equal,
+    "gt": np.greater,
+    "ge": np.greater_equal,
+}
+META_FILE = "meta.json"
+
+
+def _missing(kind: str):
+    return np.nan if kind.startswith("float") else MISSING_INT
+
+
+class ProductStore:
+    """Scraped product records held column by column instead of as dicts.
+
+    Numeric fields are plain typed NumPy arrays; string fields are interned
+    into a per-column vocabulary with int32 codes. Queries work on whole
+    columns at once and return new stores that share the vocabularies.
+    `save()` writes one .npy file per column, which `load()` memory-maps so
+    a large store opens instantly and only touches the pages a query reads.
+    """
+
+    def __init__(self, schema: Dict[str, str], columns: Dict[str, np.ndarray], vocab: Dict[str, List[str]]):
+        self.schema = dict(schema)
+        self.columns = columns
+        self.vocab = vocab
+        self._lookup: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict], schema: Optional[Dict[str, str]] = None) -> "ProductStore":
+        """Build a store from dicts; fields outside the schema are dropped."""
+        schema = schema or BOOK_SCHEMA
+        records = records if isinstance(records, list) else list(records)
+        columns, vocab = {}, {}
+        for name, kind in schema.items():
+            values = [record.get(name) for record in records]
+            if kind == "str":
+                codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+                columns[name] = codes.astype(np.int32)
+                vocab[name] = [str(value) for value in uniques]
+            else:
+                missing = _missing(kind)
+                columns[name] = np.array(
+                    [missing if value is None else value for value in values],
+                    dtype=kind,
+                )
+        return cls(schema, columns, vocab)
+
+    @classmethod
+    def from_snapshot(cls, path: str, schema: Optional[Dict[str, str]] = None) -> "ProductStore":
+        """Build a store from a scraper output file (JSONL or the legacy books.json)."""
+        from incremental import load_snapshot
+        return cls.from_records(load_snapshot(path).values(), schema)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __repr__(self) -> str:
+        return f"<ProductStore {len(self)} rows, {self.nbytes / 1024:.1f} KB>"
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (vocabularies not included)."""
+        return sum(column.nbytes for column in self.columns.values())
+
+    # Column access
+    def _code(self, name: str, value: str) -> int:
+        if name not in self._lookup:
+            self._lookup[name] = {text: code for code, text in enumerate(self.vocab[name])}
+        return self._lookup[name].get(value, -2)
+
+    def column(self, name: str) -> np.ndarray:
+        """Decoded values of one column (object array of str/None for string columns)."""
+        data = self.columns[name]
+        if self.schema[name] != "str":
+            return np.asarray(data)
+        lookup = np.array(self.vocab[name] + [None], dtype=object)
+        # Code -1 (missing) indexes the trailing None
+        return lookup[data]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    def take(self, indices: np.ndarray) -> "ProductStore":
+        """A new store with the given rows, in the given order."""
+        columns = {name: np.asarray(data)[indices] for name, data in self.columns.items()}
+        return ProductStore(self.schema, columns, self.vocab)
+
+    # Queries
+    def mask(self, **conditions) -> np.ndarray:
+        """Boolean row mask for Django-style conditions.
+
+        ``price__lt=20``, ``rating__ge=4``, ``category="Poetry"``,
+        ``currency__in=["GBP", "EUR"]``, ``title__contains="night"``,
+        ``upc__isnull=True``. All conditions must hold.
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for key, value in conditions.items():
+            name, _, op = key.partition("__")
+            op = op or "eq"
+            if name not in self.columns:
+                raise KeyError(f"Unknown column {name!r}")
+            selected &= self._condition(name, op, value)
+        return selected
+
+    def _condition(self, name: str, op: str, value) -> np.ndarray:
+        data = np.asarray(self.columns[name])
+        is_string = self.schema[name] == "str"
+
+        if op == "isnull":
+            null = data == MISSING_INT if is_string or data.dtype.kind == "i" else np.isnan(data)
+            return null if value else ~null
+        if op == "in":
+            if is_string:
+                return np.isin(data, [self._code(name, item) for item in value])
+            return np.isin(data, list(value))
+        if op in ("contains", "icontains", "startswith"):
+            if not is_string:
+                raise ValueError(f"{op} only applies to string columns, not {name!r}")
+            needle = value.lower() if op == "icontains" else value
+            matching = [
+                code for code, text in enumerate(self.vocab[name])
+                if (text.startswith(needle) if op == "startswith"
+                    else needle in (text.lower() if op == "icontains" else text))
+            ]
+            # Match against the (small) vocabulary, then select rows by code
+            return np.isin(data, matching)
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r}")
+        if is_string:
+            if op not in ("eq", "ne"):
+                raise ValueError(f"{op} is not supported on string column {name!r}")
+            return _OPERATORS[op](data, self._code(name, value))
+        result = _OPERATORS[op](data, value)
+        if data.dtype.kind == "i" and op != "ne":
+            # -1 marks a missing int and must not satisfy range comparisons
+            result &= data != MISSING_INT
+        return result
+
+    def filter(self, mask: Optional[np.ndarray] = None, **conditions) -> "ProductStore":
+        """Rows matching a boolean mask and/or the conditions accepted by `mask()`."""
+        selected = self.mask(**conditions)
+        if mask is not None:
+            selected &= mask
+        return self.take(np.flatnonzero(selected))
+
+    def _sort_keys(self, name: str, descending: bool) -> List[np.ndarray]:
+        """lexsort keys for one column: its values, then (more significant) a missing flag."""
+        data = np.asarray(self.columns[name])
+        if self.schema[name] == "str":
+            # Rank each vocabulary entry alphabetically
+            order = np.argsort(np.array(self.vocab[name], dtype=object), kind="stable")
+            ranks = np.zeros(len(order) + 1, dtype=np.int64)
+            ranks[order] = np.arange(len(order))
+            missing = data == MISSING_INT
+            values = ranks[data]
+        elif data.dtype.kind == "f":
+            missing = np.isnan(data)
+            values = np.where(missing, 0.0, data)
+        else:
+            missing = data == MISSING_INT
+            values = data.astype(np.int64)
+        # Negated rather than reversed, so ties keep their order and missing values stay last
+        return [-values if descending else values, missing]
+
+    def sort(self, by: Union[str, Sequence[str]], descending: bool = False) -> "ProductStore":
+        """Rows ordered by one or more columns (the first name is the primary key).
+
+        The sort is stable and rows with a missing value come last in
+        either direction.
+        """
+        names = [by] if isinstance(by, str) else list(by)
+        # lexsort treats the last key as primary
+        keys = []
+        for name in reversed(names):
+            keys.extend(self._sort_keys(name, descending))
+        return self.take(np.lexsort(keys))
+
+    def top(self, n: int, by: str, descending: bool = True) -> "ProductStore":
+        """The n rows with the largest (or smallest) values of a numeric column."""
+        # Missing values (NaN, or MISSING_INT in int columns) rank last either way
+        data = self._numeric(by).astype(np.float64)
+        keys = np.where(np.isnan(data), -np.inf if descending else np.inf, data)
+        keys = -keys if descending else keys
+        n = min(n, len(self))
+        if n <= 0:
+            return self.take(np.array([], dtype=np.int64))
+        candidates = np.argpartition(keys, n - 1)[:n]
+        return self.take(candidates[np.argsort(keys[candidates], kind="stable")])
+
+    def aggregate(self, by: Optional[str] = None, **aggregations) -> pd.DataFrame:
+        """Group statistics, e.g. ``aggregate("category", price=["mean", "max"], stock="sum")``.
+
+        Grouping runs on the integer codes; names are only attached to the
+        (small) result. With `by=None` the whole store is one group.
+        """
+        if not aggregations:
+            aggregations = {"url": "count"}
+        frame = pd.DataFrame({
+            name: self._numeric(name) for name in aggregations
+        })
+        if by is None:
+            result = frame.agg(aggregations)
+            return result if isinstance(result, pd.DataFrame) else result.to_frame().T
+
+        codes = np.asarray(self.columns[by])
+        frame["__group"] = codes
+        result = frame.groupby("__group", sort=True).agg(aggregations)
+        if self.schema[by] == "str":
+            labels = np.array(self.vocab[by] + [None], dtype=object)
+            result.index = pd.Index(labels[result.index.to_numpy()], name=by)
+        else:
+            result.index.name = by
+        return result
+
+    def _numeric(self, name: str) -> np.ndarray:
+        """Column values with missing entries as NaN, suitable for pandas aggregation."""
+        data = np.asarray(self.columns[name])
+        if self.schema[name] == "str" or data.dtype.kind == "i":
+            return np.where(data == MISSING_INT, np.nan, data)
+        return data
+
+    def value_counts(self, name: str) -> pd.Series:
+        """How often each value of a string column occurs, most common first."""
+        data = np.asarray(self.columns[name])
+        counts = np.bincount(data[data != MISSING_INT], minlength=len(self.vocab[name]))
+        return pd.Series(counts, index=pd.Index(self.vocab[name], name=name)).sort_values(ascending=False)
+
+    # Conversion
+    def to_frame(self) -> pd.DataFrame:
+        """A pandas DataFrame; string columns become Categoricals over the same codes.
+
+        Int columns become nullable ``Int64`` with missing values as NA.
+        """
+        data = {}
+        for name, kind in self.schema.items():
+            column = np.asarray(self.columns[name])
+            if kind == "str":
+                data[name] = pd.Categorical.from_codes(column, categories=pd.Index(self.vocab[name], dtype=object))
+            elif column.dtype.kind == "i":
+                data[name] = pd.arrays.IntegerArray(column.astype(np.int64), column == MISSING_INT)
+            else:
+                data[name] = column
+        return pd.DataFrame(data)
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Rows back as dicts, with None for missing values."""
+        decoded = {name: self.column(name) for name in self.schema}
+        for row in range(len(self)):
+            record = {}
+            for name, kind in self.schema.items():
+                value = decoded[name][row]
+                if kind == "str":
+                    record[name] = value
+                elif kind.startswith("float"):
+                    record[name] = None if np.isnan(value) else float(value)
+                else:
+                    record[name] = None if value == MISSING_INT else int(value)
+            yield record
+
+    # Persistence
+    def save(self, directory: str):
+        """Write one .npy per column plus meta.json, replacing `directory` atomically."""
+        part = f"{directory.rstrip(os.sep)}.part"
+        shutil.rmtree(part, ignore_errors=True)
+        os.makedirs(part)
+        for name, data in self.columns.items():
+            np.save(os.path.join(part, f"{name}.npy"), np.asarray(data))
+        with open(os.path.join(part, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"schema": self.schema, "vocab": self.vocab, "rows": len(self)}, f, ensure_ascii=False)
+
+        if os.path.exists(directory):
+            old = f"{directory.rstrip(os.sep)}.old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(directory, old)
+            os.replace(part, directory)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(part, directory)
+        logger.info(f"🗄️ Saved {len(self)} products to {directory}")
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "ProductStore":
+        """Open a saved store; columns are memory-mapped read-only unless `mmap=False`."""
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in meta["schema"]
+        }
+        return cls(meta["schema"], columns, meta["vocab"])
@@ -0,0 +1,244 @@
+import csv
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class RecordSink:
+    """Writes records as they arrive, in batches, and publishes the file atomically.
+
+    Records go to ``<path>.part`` (readable while the crawl is running) and
+    the buffer is flushed every `batch_size` records. `close()` renames the
+    part file over `path` in one step, so readers never see a half-written
+    result; if the run (or the final flush) fails the part file is
+    discarded and any previous `path` is left untouched.
+
+    `fields` declares the columns up front for the tabular backends; without
+    it they come from the first batch, and records with other keys are
+    rejected rather than silently trimmed.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, fields: Optional[Sequence[str]] = None):
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.batch_size = max(1, batch_size)
+        self.fields = list(fields) if fields else None
+        self.count = 0
+        self._buffer: List[Dict] = []
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def __enter__(self) -> "RecordSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, record: Dict):
+        self._buffer.append(record)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self._buffer = []
+        self._flush()
+
+    def close(self):
+        """Flush what is left and atomically move the file into place."""
+        if self._closed:
+            return
+        published = False
+        try:
+            try:
+                self.flush()
+            finally:
+                self._closed = True
+                self._finish()
+            os.replace(self.part_path, self.path)
+            published = True
+        finally:
+            if not published and os.path.exists(self.part_path):
+                os.remove(self.part_path)
+        logger.info(f"💾 Wrote {self.count} records to {self.path}")
+
+    def abort(self):
+        """Drop everything written so far."""
+        if self._closed:
+            return
+        self._buffer = []
+        try:
+            self._finish()
+        finally:
+            self._closed = True
+            if os.path.exists(self.part_path):
+                os.remove(self.part_path)
+
+    def _check_fields(self, records: List[Dict], fields: Sequence[str]):
+        known = set(fields)
+        for record in records:
+            unknown = [key for key in record if key not in known]
+            if unknown:
+                raise ValueError(
+                    f"Record has fields {unknown} missing from the columns {list(fields)}; "
+                    f"declare every column with fields="
+                )
+
+    # Backend hooks
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_batch(self, records: List[Dict]):
+        raise NotImplementedError
+
+    def _flush(self):
+        pass
+
+    def _finish(self):
+        pass
+
+
+class JsonlSink(RecordSink):
+    """One JSON object per line (NDJSON)."""
+
+    def _open(self):
+        self._file = open(self.part_path, "w", encoding="utf-8")
+
+    def _write_batch(self, records: List[Dict]):
+        self._file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+    def _flush(self):
+        self._file.flush()
+
+    def _finish(self):
+        self._file.close()
+
+
+class CsvSink(RecordSink):
+    """CSV with a header row; columns come from `fields` or the first record."""
+
+    def __init__(self, path: str, batch_size: int = 500, fields: Optional[Sequence[str]] = None):
+        self._writer = None
+        super().__init__(path, batch_size, fields)
+
+    def _open(self):
+        self._file = open(self.part_path, "w", encoding="utf-8", newline="")
+
+    def _write_batch(self, records: List[Dict]):
+        if self._writer is None:
+            fieldnames = self.fields or list(records[0])
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+            self._writer.writeheader()
+        self._check_fields(records, self._writer.fieldnames)
+        self._writer.writerows(records)
+
+    def _flush(self):
+        self._file.flush()
+
+    def _finish(self):
+        self._file.close()
+
+
+class ParquetSink(RecordSink):
+    """Parquet via pandas/pyarrow; each flushed batch becomes a row group.
+
+    Column types are inferred from the data. A column with no values yet
+    is typed null; the first batch that brings real values fixes its type,
+    and the rows already written are rewritten once with the wider schema.
+    """
+
+    def _open(self):
+        self._writer = None
+        self._schema = None
+
+    def _write_batch(self, records: List[Dict]):
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        frame = pd.DataFrame.from_records(records)
+        # Later batches must match the first one's columns
+        columns = self._schema.names if self._schema is not None else (self.fields or list(frame.columns))
+        self._check_fields(records, columns)
+        frame = frame.reindex(columns=columns)
+        for name in columns:
+            if frame[name].isna().all():
+                # Missing columns come back as float NaN; keep them untyped
+                frame[name] = None
+
+        if self._schema is None:
+            self._schema = pa.Table.from_pandas(frame, preserve_index=False).schema
+            self._writer = pq.ParquetWriter(self.part_path, self._schema)
+        else:
+            schema = self._widened(frame)
+            if schema is not self._schema:
+                self._rewrite(schema)
+        table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def _widened(self, frame):
+        """The schema with still-null columns typed from `frame`, where it has values for them."""
+        import pyarrow as pa
+
+        untyped = [field.name for field in self._schema if pa.types.is_null(field.type)]
+        if not untyped:
+            return self._schema
+        inferred = pa.Table.from_pandas(frame[untyped], preserve_index=False).schema
+        schema = self._schema
+        for field in inferred:
+            if not pa.types.is_null(field.type):
+                schema = schema.set(schema.get_field_index(field.name), field)
+        return schema
+
+    def _rewrite(self, schema):
+        """Re-type the rows written so far; each column is widened at most once."""
+        import pyarrow.parquet as pq
+
+        self._writer.close()
+        written = pq.read_table(self.part_path).cast(schema)
+        self._schema = schema
+        self._writer = pq.ParquetWriter(self.part_path, schema)
+        self._writer.write_table(written)
+
+    def _finish(self):
+        if self._writer is not None:
+            self._writer.close()
+            return
+        # No records at all: still leave a valid, column-less file behind
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table({}), self.part_path)
+
+
+SINKS = {
+    "jsonl": JsonlSink,
+    "ndjson": JsonlSink,
+    "csv": CsvSink,
+    "parquet": ParquetSink,
+}
+
+
+def open_sink(path: str, format: Optional[str] = None, **kwargs) -> RecordSink:
+    """Open a sink for `path`, picking the backend from `format` or the file extension."""
+    format = (format or os.path.splitext(path)[1].lstrip(".")).lower()
+    try:
+        sink_class = SINKS[format]
+    except KeyError:
+        raise ValueError(f"Unsupported record format {format!r}; choose from {sorted(SINKS)}")
+    return sink_class(path, **kwargs)
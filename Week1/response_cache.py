@@ -0,0 +1,211 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv("BROCHURE_CACHE_DIR", ".cache")
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: bytes
+    encoding: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    # Where `url` redirected to, if anywhere
+    final_url: Optional[str] = None
+
+
+class ResponseCache:
+    """Persistent HTTP response cache backed by a single SQLite file.
+
+    Entries younger than `ttl` seconds are served as-is; older ones are kept
+    around so their ETag/Last-Modified can be used for a conditional GET.
+    When the stored bodies exceed `max_bytes`, the least recently used
+    entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 3600,
+        max_bytes: int = 200 * 1024 * 1024,
+    ):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "responses.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                encoding TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL,
+                final_url TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "final_url" not in columns:
+            # Cache files written before redirects were recorded
+            self._conn.execute("ALTER TABLE responses ADD COLUMN final_url TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the stored entry for `url` (fresh or stale), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, body, encoding, etag, last_modified, fetched_at, final_url FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        return CachedResponse(*row)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def record_hit(self, revalidated: bool = False):
+        with self._lock:
+            self.hits += 1
+            if revalidated:
+                self.revalidations += 1
+        get_metrics().inc("cache_requests_total", cache="response", result="revalidated" if revalidated else "hit")
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+        get_metrics().inc("cache_requests_total", cache="response", result="miss")
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        encoding: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        final_url: Optional[str] = None,
+    ):
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (url, body, encoding, etag, last_modified, fetched_at, last_access, size, final_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (url, body, encoding, etag, last_modified, now, now, len(body), final_url),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Mark `url` as freshly validated, e.g. after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE responses
+                SET fetched_at = ?, last_access = ?,
+                    etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                WHERE url = ?
+                """,
+                (now, now, etag, last_modified, url),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT url, size FROM responses ORDER BY last_access ASC").fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            logger.debug(f"Evicted {url} from response cache")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def conditional_headers(entry: Optional[CachedResponse]) -> Dict[str, str]:
+    """Validator headers that turn a GET for a stale `entry` into a conditional GET."""
+    headers = {}
+    if entry and entry.etag:
+        headers['If-None-Match'] = entry.etag
+    if entry and entry.last_modified:
+        headers['If-Modified-Since'] = entry.last_modified
+    return headers
+
+
+def store_response(
+    cache: ResponseCache,
+    url: str,
+    body: bytes,
+    encoding: str,
+    headers: Mapping[str, str],
+    final_url: Optional[str] = None,
+    truncated: bool = False,
+):
+    """Store a 200 response unless the server asked us not to.
+
+    A body cut off at the size cap is never stored: serving it as fresh
+    would keep the page truncated for the whole TTL.
+    """
+    if truncated or 'no-store' in headers.get('Cache-Control', '').lower():
+        return
+    cache.put(
+        url, body, encoding,
+        etag=headers.get('ETag'),
+        last_modified=headers.get('Last-Modified'),
+        final_url=final_url if final_url != url else None,
+    )
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, creating it on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
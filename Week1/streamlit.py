@@ -1,7 +1,86 @@
-from day5 import *
+import streamlit as st
+
+from day5 import BrochureGenerator, configure_logging
+from jobs import DONE, ERROR, JobQueue, ScrapeCache
+
+STATUS_ICONS = {
+    "queued": "\u23F3",
+    "scraping": "\U0001F577",
+    "generating": "\u270D",
+    "done": "\u2705",
+    "error": "\u274C",
+}
+
+
+# Keyed by API key, so bound how many clients a long-lived server keeps around
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_generator(api_key: str) -> BrochureGenerator:
+    """One generator (and OpenAI client) per API key, shared across reruns and sessions."""
+    return BrochureGenerator(api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue() -> JobQueue:
+    """The process-wide queue that runs brochures in the background."""
+    return JobQueue(max_workers=4)
+
+
+@st.cache_resource(show_spinner=False)
+def get_scrape_cache() -> ScrapeCache:
+    """Crawled prompt text per URL for an hour, shared by reruns, sessions and job threads."""
+    return ScrapeCache(ttl=3600, max_entries=256)
+
+
+def scrape_contents(url: str, generator: BrochureGenerator, cache: ScrapeCache) -> str:
+    """Crawled prompt text for a URL; a failed landing page raises, so an outage is never cached."""
+    return cache.get_or_scrape(url, lambda target: generator.collect_contents(target, require_landing=True))
+
+
+def session_jobs():
+    return get_job_queue().get_many(st.session_state.get("job_ids", []))
+
+
+def job_panel():
+    """This session's jobs, refreshed every couple of seconds while any is still running.
+
+    `run_every` is fixed when the fragment is created, so the panel is
+    rebuilt on each full run with a timer only if there is work in flight.
+    """
+    refreshing = any(not job.finished for job in session_jobs())
+    st.fragment(run_every=2 if refreshing else None)(render_jobs)(refreshing)
+
+
+def render_jobs(refreshing: bool):
+    jobs = session_jobs()
+    if refreshing and all(job.finished for job in jobs):
+        # Everything has finished: one full rerun recreates the panel without its timer
+        st.rerun()
+    if not jobs:
+        return
+
+    st.markdown("## \U0001F4CB Brochure Queue")
+    for job in reversed(jobs):
+        icon = STATUS_ICONS.get(job.status, "")
+        label = f"{icon} {job.company_name} \u2014 {job.status} ({job.elapsed:.0f}s)"
+        if job.status == DONE:
+            with st.expander(label, expanded=job is jobs[-1]):
+                st.markdown(job.brochure)
+                st.download_button(
+                    label="\U0001F4BE Download Brochure",
+                    data=job.brochure,
+                    file_name=f"{job.company_name}_Brochure.md",
+                    mime="text/markdown",
+                    key=f"download-{job.id}",
+                )
+        elif job.status == ERROR:
+            st.error(f"{label}: {job.error}")
+        else:
+            st.info(label)
+
 
 def main():
     """Streamlit Application"""
+    configure_logging()
 
     # Page Configuration
     st.set_page_config(
@@ -62,6 +141,11 @@ def main():
     # Decorative Separator
     st.markdown("---")
 
+    stream_live = st.toggle(
+        "Stream the brochure live (keeps this tab busy until it finishes)",
+        value=False,
+    )
+
     # Generate Button
     if st.button("\u2728 Generate Magical Brochure \u2728", type="primary"):
         # Validate Inputs
@@ -70,27 +154,41 @@ def main():
             return
 
         try:
-            # Spinner with Creative Message
-            with st.spinner("\u2728 Crafting Your Brochure... (Brewing Innovation)"):
-                generator = BrochureGenerator(user_provided_key)
-                brochure = generator.create_brochure(company_name, url)
-
-            # Brochure Display
-            st.success("\U0001F389 Brochure Generated Successfully!")
-            st.markdown("## \U0001F4C4 Your Sparkling Brochure")
-            st.markdown(brochure)
-
-            # Download Option
-            st.download_button(
-                label="\U0001F4BE Download Brochure",
-                data=brochure,
-                file_name=f"{company_name}_Brochure.md",
-                mime="text/markdown"
-            )
+            generator = get_generator(user_provided_key)
+            # Fetched here, on the script thread; job threads only use the object
+            scrape_cache = get_scrape_cache()
+
+            if stream_live:
+                # Brochure Display, rendered token by token as the model writes it
+                st.markdown("## \U0001F4C4 Your Sparkling Brochure")
+                with st.spinner("\u2728 Crafting Your Brochure... (Brewing Innovation)"):
+                    contents = scrape_contents(url, generator, scrape_cache)
+                    messages = generator.build_messages(company_name, url, contents)
+                    brochure = st.write_stream(generator.stream_complete(messages))
+                st.success("\U0001F389 Brochure Generated Successfully!")
+
+                # Download Option
+                st.download_button(
+                    label="\U0001F4BE Download Brochure",
+                    data=brochure,
+                    file_name=f"{company_name}_Brochure.md",
+                    mime="text/markdown"
+                )
+            else:
+                job = get_job_queue().submit(
+                    generator,
+                    company_name,
+                    url,
+                    scrape=lambda target: scrape_contents(target, generator, scrape_cache),
+                )
+                st.session_state.setdefault("job_ids", []).append(job.id)
+                st.toast(f"\U0001F4E5 {company_name} brochure queued")
 
         except Exception as e:
             st.error(f"\U0001F916 Oops! {e}")
 
+    job_panel()
+
     # Fun Footer
     st.markdown("---")
     st.markdown("\U0001F680 **Powered by AI Magic** | Transform Websites into Stories")
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The Week1 modules import each other as top-level scripts
+WEEK1_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if WEEK1_DIR not in sys.path:
+    sys.path.append(WEEK1_DIR)
+
+FIXTURES_DIR = os.path.join(WEEK1_DIR, "fixtures")
+
+# Read at import time by response_cache; keep default caches out of the working tree
+os.environ.setdefault("BROCHURE_CACHE_DIR", tempfile.mkdtemp(prefix="brochure-tests-"))
+
+
+@pytest.fixture(scope="session")
+def fixture_site():
+    """Base URL of a local server with the recorded catalogue and the corporate page."""
+    from bench_suite import FixtureHandler, LocalServer
+
+    with LocalServer(FixtureHandler) as server:
+        yield server.url
+
+
+@pytest.fixture(scope="session")
+def fake_openai():
+    """Base URL of a local OpenAI-compatible chat completions endpoint."""
+    from bench_suite import FakeOpenAIHandler, LocalServer
+
+    class QuickHandler(FakeOpenAIHandler):
+        latency = 0.0
+        token_delay = 0.0
+
+    with LocalServer(QuickHandler) as server:
+        yield server.url
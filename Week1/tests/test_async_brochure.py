@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from async_brochure import AsyncBrochureGenerator, RateLimitScheduler
+from completion_cache import CompletionCache
+from response_cache import ResponseCache
+
+
+class RecordingCache(ResponseCache):
+    """Response cache that notes which thread each SQLite call ran on."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, url):
+        self.threads.append(threading.get_ident())
+        return super().get(url)
+
+    def put(self, *args, **kwargs):
+        self.threads.append(threading.get_ident())
+        return super().put(*args, **kwargs)
+
+
+class RecordingGenerator(AsyncBrochureGenerator):
+    parse_threads = []
+
+    @staticmethod
+    def _cached_page(url, entry):
+        RecordingGenerator.parse_threads.append(threading.get_ident())
+        return AsyncBrochureGenerator._cached_page(url, entry)
+
+
+def generate(fake_openai, jobs, **kwargs):
+    async def run():
+        generator = RecordingGenerator(api_key="sk-test", base_url=f"{fake_openai}/v1", **kwargs)
+        try:
+            return generator, await generator.create_brochures(jobs), threading.get_ident()
+        finally:
+            await generator.aclose()
+
+    return asyncio.run(run())
+
+
+def test_brochures_end_to_end_against_a_local_api(fake_openai, fixture_site, tmp_path):
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_minute=100_000)
+    generator, brochures, _ = generate(
+        fake_openai,
+        [("Acme", f"{fixture_site}/"), ("Books", f"{fixture_site}/catalogue/page-1.html")],
+        scheduler=scheduler,
+        cache=CompletionCache(path=str(tmp_path / "completions.sqlite")),
+        response_cache=ResponseCache(path=str(tmp_path / "responses.sqlite")),
+    )
+    assert len(brochures) == 2
+    assert all(brochure.startswith("word0 ") for brochure in brochures)
+    assert generator.response_cache.misses > 0
+    # Usage was settled: the bucket holds less than capacity but far more than the estimates
+    assert 0 < scheduler.tokens.tokens < scheduler.tokens.capacity
+
+
+def test_response_cache_and_parsing_stay_off_the_event_loop(fake_openai, fixture_site, tmp_path):
+    response_cache = RecordingCache(path=str(tmp_path / "responses.sqlite"))
+    kwargs = dict(cache=CompletionCache(enabled=False), response_cache=response_cache, max_pages=1)
+    RecordingGenerator.parse_threads.clear()
+
+    _, first, loop_thread = generate(fake_openai, [("Acme", f"{fixture_site}/")], **kwargs)
+    _, second, second_loop_thread = generate(fake_openai, [("Acme", f"{fixture_site}/")], **kwargs)
+
+    assert first[0].startswith("word0 ") and second[0].startswith("word0 ")
+    assert response_cache.hits == 1
+    assert len(response_cache.threads) == 3
+    assert loop_thread not in response_cache.threads
+    assert second_loop_thread not in response_cache.threads
+    assert RecordingGenerator.parse_threads and second_loop_thread not in RecordingGenerator.parse_threads
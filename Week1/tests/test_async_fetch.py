@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+
+from async_brochure import AsyncBrochureGenerator
+from completion_cache import CompletionCache
+from http_client import Deadline
+
+PAGE = b"<html><head><title>Acme</title></head><body><p>Anvils for everyone.</p></body></html>"
+
+
+def fetch(handler, url="https://acme.test/", **kwargs):
+    """Run `fetch_website` against a mock transport and return the page."""
+
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+        generator = AsyncBrochureGenerator(
+            client=object(), http_client=http, cache=CompletionCache(enabled=False), use_response_cache=False
+        )
+        for name, value in kwargs.pop("attrs", {}).items():
+            setattr(generator, name, value)
+        try:
+            return await generator.fetch_website(url, **kwargs)
+        finally:
+            await http.aclose()
+
+    return asyncio.run(run())
+
+
+def html(request):
+    return httpx.Response(200, headers={"Content-Type": "text/html"}, content=PAGE)
+
+
+def test_fetches_and_parses_html():
+    page = fetch(html)
+    assert page.error is None
+    assert page.title == "Acme"
+
+
+def test_follows_redirects():
+    def handler(request):
+        if request.url.path == "/":
+            return httpx.Response(301, headers={"Location": "/home"})
+        return html(request)
+
+    assert fetch(handler).title == "Acme"
+
+
+def test_refuses_declared_non_html():
+    page = fetch(lambda request: httpx.Response(200, headers={"Content-Type": "application/pdf"}, content=b"%PDF"))
+    assert "not HTML" in page.error
+
+
+def test_sniffs_untyped_bodies():
+    binary = fetch(lambda request: httpx.Response(200, headers={"Content-Type": "application/octet-stream"},
+                                                 content=b"\x89PNG\r\n"))
+    assert "does not look like HTML" in binary.error
+    untyped = fetch(lambda request: httpx.Response(200, content=PAGE))
+    assert untyped.error is None
+
+
+def test_body_is_capped_at_max_bytes():
+    big = PAGE + b"<p>" + b"x" * 100_000 + b"</p>"
+    page = fetch(lambda request: httpx.Response(200, headers={"Content-Type": "text/html"}, content=big),
+                 attrs={"max_bytes": 1024})
+    assert page.error is None
+    assert len(page.text) < 1024
+
+
+def test_deadline_bounds_a_slow_server():
+    async def slow(request):
+        await asyncio.sleep(5)
+        return html(request)
+
+    page = fetch(slow, deadline=Deadline(0.05))
+    assert "Deadline passed" in page.error
+
+
+def test_spent_deadline_skips_the_request():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return html(request)
+
+    deadline = Deadline()
+    deadline.cancel()
+    assert "cancelled" in fetch(handler, deadline=deadline).error
+    assert not requests
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from openai import OpenAI
+
+from batch import BatchRunner, completed_job_ids
+from completion_cache import CompletionCache
+from day5 import BrochureGenerator
+
+
+@pytest.fixture
+def runner(fake_openai):
+    client = OpenAI(api_key="test", base_url=f"{fake_openai}/v1", max_retries=0)
+    generator = BrochureGenerator(client=client, cache=CompletionCache(enabled=False), max_pages=2, page_cache=False)
+    return BatchRunner(generator, scrape_workers=2, llm_workers=2)
+
+
+def write_jobs(path, jobs):
+    path.write_text("".join(json.dumps(job) + "\n" for job in jobs), encoding="utf-8")
+    return str(path)
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_skips_finished_jobs(runner, fixture_site, tmp_path):
+    jobs = write_jobs(tmp_path / "jobs.jsonl", [
+        {"id": "a", "company_name": "Acme", "url": f"{fixture_site}/"},
+        {"id": "b", "company_name": "Bolt", "url": f"{fixture_site}/about"},
+    ])
+    output = str(tmp_path / "results.jsonl")
+
+    assert runner.run(jobs, output) == {"ok": 2, "error": 0, "skipped": 0}
+    assert all(record["brochure"] for record in read_results(output))
+    assert runner.run(jobs, output) == {"ok": 0, "error": 0, "skipped": 2}
+    assert len(read_results(output)) == 2
+
+
+def test_duplicate_ids_run_once(runner, fixture_site, tmp_path):
+    jobs = write_jobs(tmp_path / "jobs.jsonl", [
+        {"id": "a", "company_name": "Acme", "url": f"{fixture_site}/"},
+        {"id": "a", "company_name": "Acme again", "url": f"{fixture_site}/about"},
+    ])
+    output = str(tmp_path / "results.jsonl")
+
+    assert runner.run(jobs, output) == {"ok": 1, "error": 0, "skipped": 1}
+    assert [record["company_name"] for record in read_results(output)] == ["Acme"]
+
+
+def test_unreachable_landing_page_is_an_error_and_retried(runner, tmp_path):
+    jobs = write_jobs(tmp_path / "jobs.jsonl", [{"id": "down", "company_name": "Down", "url": "http://127.0.0.1:9/"}])
+    output = str(tmp_path / "results.jsonl")
+
+    assert runner.run(jobs, output)["error"] == 1
+    [record] = read_results(output)
+    assert record["status"] == "error"
+    assert record["brochure"] is None
+    assert completed_job_ids(output) == set()
+    # Not skipped on resume
+    assert runner.run(jobs, output)["error"] == 1
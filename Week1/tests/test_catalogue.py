@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from catalogue import START_URL, CatalogueError, CatalogueScraper, parse_listing
+from conftest import FIXTURES_DIR
+
+CATALOGUE_DIR = os.path.join(FIXTURES_DIR, "books.toscrape.com")
+# The recorded catalogue: pages 1 and 2 hold 20 books each, page 3 the last 5
+TOTAL_BOOKS = 45
+
+
+class FixtureClient:
+    """Serves the recorded books.toscrape.com pages; `failing` paths answer 500."""
+
+    def __init__(self, failing=(), strip_pager=False):
+        self.failing = set(failing)
+        self.strip_pager = strip_pager
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        path = urlsplit(url).path
+        response = requests.Response()
+        response.url = url
+        local = os.path.join(CATALOGUE_DIR, path.lstrip("/"))
+        if os.path.isdir(local):
+            local = os.path.join(local, "index.html")
+        if path in self.failing:
+            response.status_code = 500
+            response._content = b"boom"
+        elif os.path.isfile(local):
+            with open(local, "rb") as f:
+                body = f.read()
+            if self.strip_pager:
+                # No "Page 1 of 3": the scraper has to follow "next" links
+                body = body.replace(b"Page 1 of 3", b"").replace(b"Page 2 of 3", b"").replace(b"Page 3 of 3", b"")
+            response.status_code = 200
+            response._content = body
+            response.headers["Content-Type"] = "text/html; charset=utf-8"
+        else:
+            response.status_code = 404
+            response._content = b"missing"
+        return response
+
+
+def page_html(number):
+    with open(os.path.join(CATALOGUE_DIR, "catalogue", f"page-{number}.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_parse_listing_reads_pager():
+    books, next_url, total = parse_listing(page_html(1), START_URL)
+    assert len(books) == 20
+    assert next_url == "https://books.toscrape.com/catalogue/page-2.html"
+    assert total == 3
+    assert books[0]["price"] and books[0]["currency"] == "GBP"
+    assert 1 <= books[0]["rating"] <= 5
+
+
+def test_last_page_has_no_next():
+    _, next_url, _ = parse_listing(page_html(3), "https://books.toscrape.com/catalogue/page-3.html")
+    assert next_url is None
+
+
+def test_fans_out_over_every_page():
+    client = FixtureClient()
+    books = list(CatalogueScraper(client=client, max_workers=4).iter_books())
+    assert len(books) == TOTAL_BOOKS
+    assert len({book["url"] for book in books}) == TOTAL_BOOKS
+    assert sorted(client.requested) == [f"https://books.toscrape.com/catalogue/page-{n}.html" for n in (1, 2, 3)]
+
+
+def test_follows_next_links_without_a_page_count():
+    client = FixtureClient(strip_pager=True)
+    books = list(CatalogueScraper(client=client).iter_books())
+    assert len(books) == TOTAL_BOOKS
+    assert client.requested == [f"https://books.toscrape.com/catalogue/page-{n}.html" for n in (1, 2, 3)]
+
+
+def test_failed_listing_page_raises_after_the_rest():
+    scraper = CatalogueScraper(client=FixtureClient(failing={"/catalogue/page-2.html"}))
+    seen = []
+    with pytest.raises(CatalogueError):
+        for book in scraper.iter_books():
+            seen.append(book)
+    assert len(seen) == TOTAL_BOOKS - 20
+    assert scraper.failed_pages == ["https://books.toscrape.com/catalogue/page-2.html"]
+
+
+def test_non_strict_scraper_returns_partial_results():
+    scraper = CatalogueScraper(client=FixtureClient(failing={"/catalogue/page-3.html"}), strict=False)
+    assert len(list(scraper.iter_books())) == TOTAL_BOOKS - 5
+    assert scraper.failed_pages == ["https://books.toscrape.com/catalogue/page-3.html"]
+
+
+def test_failed_detail_page_keeps_listing_data():
+    books, _, _ = parse_listing(page_html(1), START_URL)
+    broken = urlsplit(books[0]["url"]).path
+    scraper = CatalogueScraper(client=FixtureClient(failing={broken}), max_workers=4)
+    detailed = list(scraper.iter_books(details=True))
+    assert len(detailed) == TOTAL_BOOKS
+    by_url = {book["url"]: book for book in detailed}
+    assert "upc" not in by_url[books[0]["url"]]
+    assert by_url[books[1]["url"]]["upc"]
+    assert scraper.failures == [books[0]["url"]]
+
+
+def test_main_keeps_previous_output_when_pages_fail(tmp_path, monkeypatch):
+    import web_scraping
+
+    output = tmp_path / "books.jsonl"
+    output.write_text('{"title": "previous run"}\n', encoding="utf-8")
+    client = FixtureClient(failing={"/catalogue/page-2.html"})
+    monkeypatch.setattr(web_scraping, "CatalogueScraper",
+                        lambda url, max_workers: CatalogueScraper(url, client=client, max_workers=max_workers))
+    monkeypatch.setattr(sys, "argv", ["web_scraping.py", str(output)])
+
+    with pytest.raises(SystemExit) as exit_info:
+        web_scraping.main()
+    assert "left unchanged" in str(exit_info.value)
+    assert output.read_text(encoding="utf-8") == '{"title": "previous run"}\n'
+    assert not os.path.exists(f"{output}.part")
+
+
+def test_main_writes_the_full_catalogue(tmp_path, monkeypatch):
+    import web_scraping
+
+    output = tmp_path / "books.jsonl"
+    client = FixtureClient()
+    monkeypatch.setattr(web_scraping, "CatalogueScraper",
+                        lambda url, max_workers: CatalogueScraper(url, client=client, max_workers=max_workers))
+    monkeypatch.setattr(sys, "argv", ["web_scraping.py", str(output)])
+
+    web_scraping.main()
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert len(records) == TOTAL_BOOKS
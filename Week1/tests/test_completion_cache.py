@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+
+from completion_cache import CompletionCache, completion_key
+from day5 import BrochureGenerator
+
+MESSAGES = [
+    {"role": "system", "content": "You write brochures."},
+    {"role": "user", "content": "Acme makes anvils."},
+]
+
+
+class FakeOpenAI:
+    """Just enough of the OpenAI client for `BrochureGenerator.complete`."""
+
+    def __init__(self, reply="A brochure"):
+        self.calls = 0
+        self.reply = reply
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=f"{self.reply} #{self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / "completions.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_key_ignores_dict_order():
+    reordered = [{"content": m["content"], "role": m["role"]} for m in MESSAGES]
+    assert completion_key("gpt-4o-mini", MESSAGES, 1000) == completion_key("gpt-4o-mini", reordered, 1000)
+
+
+@pytest.mark.parametrize("model, messages, max_tokens", [
+    ("gpt-4o", MESSAGES, 1000),
+    ("gpt-4o-mini", MESSAGES[:1], 1000),
+    ("gpt-4o-mini", MESSAGES, 500),
+    ("gpt-4o-mini", MESSAGES, None),
+])
+def test_key_changes_with_any_input(model, messages, max_tokens):
+    assert completion_key(model, messages, max_tokens) != completion_key("gpt-4o-mini", MESSAGES, 1000)
+
+
+def test_miss_then_memory_hit(cache):
+    assert cache.get("k") is None
+    cache.put("k", "text")
+    assert cache.get("k") == "text"
+    assert cache.stats()["misses"] == 1
+    assert cache.memory_hits == 1
+
+
+def test_disk_hit_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "completions.sqlite")
+    first = CompletionCache(path=path)
+    first.put("k", "text")
+    first.close()
+
+    second = CompletionCache(path=path)
+    assert second.get("k") == "text"
+    assert second.disk_hits == 1
+    # Promoted into memory by the disk hit
+    assert second.get("k") == "text"
+    assert second.memory_hits == 1
+    second.close()
+
+
+def test_lru_eviction_falls_back_to_disk(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / "c.sqlite"), max_memory_entries=1)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    assert cache.disk_hits == 1
+    cache.close()
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / "c.sqlite"), ttl=0)
+    cache.put("k", "text")
+    assert cache.get("k") is None
+    assert cache.purge_expired() == 1
+    cache.close()
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / "c.sqlite"), enabled=False)
+    cache.put("k", "text")
+    assert cache.get("k") is None
+    assert cache.stats()["misses"] == 0
+    cache.close()
+
+
+def test_generator_serves_repeats_from_cache(cache):
+    client = FakeOpenAI()
+    generator = BrochureGenerator(client=client, cache=cache)
+
+    first = generator.complete(MESSAGES)
+    assert generator.complete(MESSAGES) == first
+    assert client.calls == 1
+
+    # Bypassing the cache always reaches the API
+    assert generator.complete(MESSAGES, use_cache=False) != first
+    assert client.calls == 2
+
+
+def test_generator_keys_on_max_tokens(cache):
+    client = FakeOpenAI()
+    generator = BrochureGenerator(client=client, cache=cache)
+    generator.complete(MESSAGES)
+    generator.max_tokens = 200
+    generator.complete(MESSAGES)
+    assert client.calls == 2
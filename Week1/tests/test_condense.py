@@ -0,0 +1,78 @@
+import hashlib
+import sys
+from types import ModuleType, SimpleNamespace
+
+from condense import TIKTOKEN_BLOB_URL, condense_pages, count_tokens, get_token_counter, tiktoken_is_cached
+
+
+def page(url, text, title="Acme"):
+    return SimpleNamespace(url=url, title=title, text=text, error=None)
+
+
+def test_overlong_first_line_is_truncated_not_dropped():
+    landing = page("https://acme.test/", "anvils " * 2000 + "\nshort line")
+    condensed = condense_pages([landing], token_budget=300)
+    body = condensed.split("Webpage Contents:\n", 1)[1]
+    assert body.startswith("anvils")
+    assert count_tokens(condensed) <= 300
+
+
+def test_lines_after_a_skipped_one_still_fit():
+    text = "intro\n" + "x " * 400 + "\nclosing remark"
+    condensed = condense_pages([page("https://acme.test/", text)], token_budget=150)
+    assert "intro" in condensed
+    assert "closing remark" in condensed
+    assert "x x x" not in condensed
+
+
+def test_repeated_boilerplate_kept_once():
+    pages = [
+        page("https://acme.test/", "Home\nWe make anvils"),
+        page("https://acme.test/about", "Home\nFounded in 1900"),
+    ]
+    condensed = condense_pages(pages, token_budget=1000)
+    assert condensed.count("Home") == 1
+    assert "Founded in 1900" in condensed
+
+
+def fake_tiktoken(monkeypatch, loaded):
+    """Install a stand-in tiktoken whose get_encoding records what it loads."""
+    encoding = SimpleNamespace(encode=lambda text, disallowed_special=(): text.split())
+    module = ModuleType("tiktoken")
+    module.get_encoding = lambda name: loaded.append(name) or encoding
+    model = ModuleType("tiktoken.model")
+    model.encoding_name_for_model = lambda name: {"gpt-4o-mini": "o200k_base"}[name]
+    module.model = model
+    monkeypatch.setitem(sys.modules, "tiktoken", module)
+    monkeypatch.setitem(sys.modules, "tiktoken.model", model)
+    get_token_counter.cache_clear()
+
+
+def test_uncached_tiktoken_encoding_is_never_downloaded(monkeypatch, tmp_path):
+    loaded = []
+    fake_tiktoken(monkeypatch, loaded)
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    try:
+        get_token_counter("gpt-4o-mini")
+        assert loaded == []
+    finally:
+        get_token_counter.cache_clear()
+
+
+def test_cached_tiktoken_encoding_is_used(monkeypatch, tmp_path):
+    loaded = []
+    fake_tiktoken(monkeypatch, loaded)
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    key = hashlib.sha1(TIKTOKEN_BLOB_URL.format("o200k_base").encode()).hexdigest()
+    (tmp_path / key).write_bytes(b"")
+    try:
+        assert tiktoken_is_cached("o200k_base")
+        assert get_token_counter("gpt-4o-mini")("a b c d e f g h") == 8
+        assert loaded == ["o200k_base"]
+    finally:
+        get_token_counter.cache_clear()
+
+
+def test_empty_cache_dir_means_no_cache(monkeypatch):
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", "")
+    assert not tiktoken_is_cached("o200k_base")
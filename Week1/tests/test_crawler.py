@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from crawler import Crawler
+from links import host
+
+START = "https://a.test/"
+LINKS = {START: [f"https://a.test/{i}" for i in range(6)] + ["https://b.test/1", "https://b.test/2"]}
+
+
+class FakeSite:
+    """Page factory that records fetch order and per-host concurrency."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.started = []
+        self.peak = defaultdict(int)
+        self._active = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _enter(self, url):
+        with self._lock:
+            self.started.append(url)
+            self._active[host(url)] += 1
+            self.peak[host(url)] = max(self.peak[host(url)], self._active[host(url)])
+
+    def _exit(self, url):
+        with self._lock:
+            self._active[host(url)] -= 1
+
+    def page(self, url):
+        return type("Page", (), {"url": url, "links": LINKS.get(url, [])})()
+
+    def __call__(self, url):
+        self._enter(url)
+        time.sleep(self.delay)
+        self._exit(url)
+        return self.page(url)
+
+    async def fetch(self, url):
+        self._enter(url)
+        await asyncio.sleep(self.delay)
+        self._exit(url)
+        return self.page(url)
+
+
+def crawler(site, **kwargs):
+    return Crawler(max_pages=20, max_workers=2, per_host_limit=1, same_host_only=False, page_factory=site, **kwargs)
+
+
+def test_busy_host_does_not_hold_workers_from_other_hosts():
+    site = FakeSite()
+    pages = crawler(site).crawl(START)
+
+    assert [page.url for page in pages] == [START] + LINKS[START]
+    assert site.peak == {"a.test": 1, "b.test": 1}
+    # b.test is fetched alongside a.test instead of after all of its pages
+    assert "https://b.test/1" in site.started[:3]
+
+
+def test_async_busy_host_does_not_hold_workers_from_other_hosts():
+    site = FakeSite()
+    pages = asyncio.run(crawler(site).crawl_async(START, site.fetch))
+
+    assert [page.url for page in pages] == [START] + LINKS[START]
+    assert site.peak == {"a.test": 1, "b.test": 1}
+    assert "https://b.test/1" in site.started[:3]
+
+
+def test_same_host_crawl_respects_max_pages():
+    site = FakeSite(delay=0)
+    pages = Crawler(max_pages=4, page_factory=site).crawl(START)
+    assert [page.url for page in pages] == [START] + LINKS[START][:3]
@@ -0,0 +1,63 @@
+import codecs
+
+import pytest
+
+from encoding_detect import charset_from_content_type, charset_from_meta, detect_incrementally, resolve_encoding
+
+RUSSIAN = "<html><body><p>" + "Привет, мир! Это тестовая страница для определения кодировки. " * 20 + "</p></body></html>"
+META_LATIN1 = b'<html><head><meta charset="iso-8859-1"></head><body>caf\xe9</body></html>'
+
+
+def test_bom_beats_header_and_meta():
+    body = codecs.BOM_UTF8 + META_LATIN1
+    assert resolve_encoding(body, "text/html; charset=windows-1251") == ("utf-8-sig", "bom")
+    assert resolve_encoding(codecs.BOM_UTF16_LE + "<p>hi</p>".encode("utf-16-le")) == ("utf-16", "bom")
+
+
+def test_header_beats_meta():
+    assert resolve_encoding(META_LATIN1, 'text/html; charset="Windows-1251"') == ("cp1251", "http-header")
+
+
+def test_meta_beats_detection():
+    assert resolve_encoding(META_LATIN1, "text/html") == (codecs.lookup("latin-1").name, "meta")
+    assert resolve_encoding(b"<meta http-equiv='Content-Type' content='text/html; charset=euc-jp'>") == (
+        "euc_jp", "meta",
+    )
+
+
+def test_unknown_charsets_fall_through():
+    body = RUSSIAN.encode("cp1251")
+    assert charset_from_content_type("text/html; charset=x-bogus") is None
+    assert resolve_encoding(b'<meta charset="x-bogus">' + body, "text/html; charset=x-bogus") == (
+        "cp1251", "detected",
+    )
+
+
+def test_meta_is_only_read_from_the_start():
+    late = b"<html>" + b" " * 5000 + b'<meta charset="iso-8859-1">'
+    assert charset_from_meta(late) is None
+
+
+@pytest.mark.parametrize("text, encoding", [
+    (RUSSIAN, "cp1251"),
+    (RUSSIAN, "utf-8"),
+    ("<p>" + "これは日本語のテキストです。文字コードの検出を試験します。" * 20 + "</p>", "euc_jp"),
+])
+def test_detection_without_declared_charset(text, encoding):
+    body = text.encode(encoding)
+    detected, strategy = resolve_encoding(body, "text/html")
+    assert strategy == "detected"
+    assert body.decode(detected) == text
+
+
+def test_ascii_prefix_is_read_as_utf8():
+    assert resolve_encoding(b"<html><body>plain</body></html>") == ("utf-8", "detected")
+    # Detection stops at `max_bytes`; an ASCII prefix must not pin the page to ASCII
+    body = b"<p>" + b"a" * 2048 + "naïve café".encode("utf-8")
+    assert detect_incrementally(body, max_bytes=1024)[0] in ("ascii", "utf-8")
+    encoding, _ = resolve_encoding(body)
+    assert body.decode(encoding).endswith("naïve café")
+
+
+def test_empty_body_defaults_to_utf8():
+    assert resolve_encoding(b"")[0] == "utf-8"
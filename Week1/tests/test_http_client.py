@@ -0,0 +1,289 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import requests
+
+import http_client
+from bench_suite import LocalServer
+from http_client import (
+    Deadline, DeadlineExceeded, FetchCancelled, HttpClient, LocalServerAdapter, TimedHTTPSConnection,
+    UnsupportedContentType,
+)
+from metrics import MetricsRegistry
+
+PAGE = b"<html><body><p>ok</p></body></html>"
+
+
+def site(failures=0, status=503):
+    """Keep-alive handler that records each request's client port and path.
+
+    `/flaky` answers `status` for its first `failures` requests.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        requests = []
+        remaining_failures = failures
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            Handler.requests.append((self.client_address[1], self.path))
+            if self.path == "/flaky" and Handler.remaining_failures > 0:
+                Handler.remaining_failures -= 1
+                self.send_response(status)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    return Handler
+
+
+def test_requests_to_one_host_reuse_a_connection():
+    handler = site()
+    client = HttpClient()
+    with LocalServer(handler) as server:
+        for path in ("/a", "/b", "/c"):
+            assert client.fetch(f"{server.url}{path}").content == PAGE
+    client.close()
+    assert [path for _, path in handler.requests] == ["/a", "/b", "/c"]
+    assert len({port for port, _ in handler.requests}) == 1
+
+
+def test_retries_transient_statuses():
+    handler = site(failures=2)
+    client = HttpClient(backoff_factor=0)
+    with LocalServer(handler) as server:
+        response = client.fetch(f"{server.url}/flaky")
+    client.close()
+    assert response.status_code == 200
+    assert len(handler.requests) == 3
+
+
+def test_gives_back_the_last_status_once_retries_run_out():
+    handler = site(failures=5, status=502)
+    client = HttpClient(max_retries=1, backoff_factor=0)
+    with LocalServer(handler) as server:
+        response = client.fetch(f"{server.url}/flaky")
+    client.close()
+    assert response.status_code == 502
+    assert len(handler.requests) == 2
+
+
+def test_does_not_retry_client_errors():
+    handler = site(failures=5, status=404)
+    client = HttpClient(backoff_factor=0)
+    with LocalServer(handler) as server:
+        assert client.fetch(f"{server.url}/flaky").status_code == 404
+    client.close()
+    assert len(handler.requests) == 1
+
+
+def test_host_pool_sizes_get_their_own_adapter():
+    client = HttpClient(host_pool_sizes={"books.toscrape.com": 32})
+    dedicated = client.session.get_adapter("https://books.toscrape.com/catalogue/")
+    assert dedicated is not client.session.get_adapter("https://example.com/")
+    assert dedicated._pool_maxsize == 32
+    client.close()
+
+
+def test_local_server_adapter_redirects_a_host_to_fixtures():
+    handler = site()
+    client = HttpClient()
+    with LocalServer(handler) as server:
+        client.mount("https://books.toscrape.com", LocalServerAdapter(server.url))
+        response = client.fetch("https://books.toscrape.com/catalogue/page-2.html?x=1")
+    client.close()
+    assert response.content == PAGE
+    assert handler.requests[0][1] == "/catalogue/page-2.html?x=1"
+
+
+class RecordingMetrics(MetricsRegistry):
+    """Registry that keeps every finished span."""
+
+    def __init__(self):
+        super().__init__()
+        self.spans = []
+
+    def _finish(self, span, error):
+        super()._finish(span, error)
+        self.spans.append(span)
+
+    def finished(self, name):
+        return [span for span in self.spans if span.name == name]
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    registry = RecordingMetrics()
+    monkeypatch.setattr(http_client, "get_metrics", lambda: registry)
+    return registry
+
+
+@pytest.fixture
+def stalling_server():
+    """Accepts TCP connections, then says nothing for a while and hangs up."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def serve():
+        conn, _ = server.accept()
+        time.sleep(0.3)
+        conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield server.getsockname()[1]
+    thread.join(timeout=2)
+    server.close()
+
+
+def test_tls_span_starts_after_tcp_connect(metrics, stalling_server):
+    connection = TimedHTTPSConnection("127.0.0.1", stalling_server, timeout=2)
+    with pytest.raises(Exception):
+        connection.connect()
+
+    (dns,), (connect,), (tls,) = metrics.finished("dns"), metrics.finished("connect"), metrics.finished("tls")
+    assert connect.error is None and tls.error is not None
+    assert tls._start >= connect._start + connect.duration
+    # The handshake stalled on the server, and only that wait is in the TLS span
+    assert tls.duration >= 0.25
+    assert connect.duration < 0.25
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_deadline_child_honours_the_tighter_budget():
+    clock = FakeClock()
+    parent = Deadline(10, clock=clock)
+    child = parent.child(30)
+    assert child.remaining() == 10
+    assert parent.child(None).remaining() == 10
+    assert Deadline(clock=clock).remaining() is None
+
+    clock.now = 10
+    assert child.expired and child.done
+    with pytest.raises(DeadlineExceeded):
+        child.check("https://a.test/")
+
+
+def test_cancelling_a_parent_cancels_its_children():
+    parent = Deadline()
+    child = parent.child(60)
+    parent.cancel()
+    assert child.cancelled and child.done and not child.expired
+    with pytest.raises(FetchCancelled):
+        child.check("https://a.test/")
+
+
+class GuardSite(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    big = b"<html><body>" + b"x" * 100_000 + b"</body></html>"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type="text/html", status=200, headers=()):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/hop/"):
+            left = int(self.path.rsplit("/", 1)[1])
+            target = "/final" if left == 0 else f"/hop/{left - 1}"
+            self._send(b"", content_type=None, status=302, headers=[("Location", target)])
+        elif self.path == "/slow-hop":
+            time.sleep(0.3)
+            self._send(b"", content_type=None, status=302, headers=[("Location", "/slow-hop")])
+        elif self.path == "/pdf":
+            self._send(b"%PDF-1.4" + b"0" * 50_000, content_type="application/pdf")
+        elif self.path == "/binary":
+            self._send(b"\x89PNG\r\n\x1a\n" + b"0" * 100, content_type="application/octet-stream")
+        elif self.path == "/untyped":
+            self._send(PAGE, content_type=None)
+        elif self.path == "/big":
+            self._send(self.big)
+        else:
+            self._send(PAGE)
+
+
+@pytest.fixture(scope="module")
+def guard_site():
+    with LocalServer(GuardSite) as server:
+        yield server.url
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(max_retries=0)
+    yield client
+    client.close()
+
+
+def test_redirects_are_followed_and_recorded(client, guard_site):
+    response = client.fetch(f"{guard_site}/hop/2")
+    assert response.url == f"{guard_site}/final"
+    assert [r.status_code for r in response.history] == [302, 302, 302]
+    assert response.content == PAGE
+
+
+def test_redirect_chains_are_capped(client, guard_site):
+    with pytest.raises(requests.TooManyRedirects):
+        client.fetch(f"{guard_site}/hop/5", max_redirects=3)
+
+
+def test_one_budget_covers_every_redirect(client, guard_site):
+    started = time.monotonic()
+    with pytest.raises(requests.RequestException):
+        client.fetch(f"{guard_site}/slow-hop", timeout=0.5)
+    # Each hop fits in the timeout on its own; the whole chain does not
+    assert time.monotonic() - started < 1.5
+
+
+def test_declared_non_html_is_refused(client, guard_site):
+    with pytest.raises(UnsupportedContentType, match="application/pdf"):
+        client.fetch(f"{guard_site}/pdf")
+    assert client.fetch(f"{guard_site}/pdf", allowed_types=None).content.startswith(b"%PDF")
+
+
+def test_vague_types_are_sniffed(client, guard_site):
+    with pytest.raises(UnsupportedContentType, match="does not look like HTML"):
+        client.fetch(f"{guard_site}/binary")
+    assert client.fetch(f"{guard_site}/untyped").content == PAGE
+
+
+def test_body_is_cut_at_max_bytes(client, guard_site):
+    response = client.fetch(f"{guard_site}/big", max_bytes=4096)
+    assert len(response.content) == 4096 and response.truncated
+    assert not client.fetch(f"{guard_site}/big").truncated
+
+
+def test_cancelled_deadline_stops_before_the_request(client, guard_site):
+    deadline = Deadline()
+    deadline.cancel()
+    with pytest.raises(FetchCancelled):
+        client.fetch(f"{guard_site}/final", deadline=deadline)
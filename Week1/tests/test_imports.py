@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+from conftest import WEEK1_DIR
+
+
+def fresh_interpreter(code: str):
+    """Run `code` in a new Python, from the Week1 directory, and return what it prints as JSON."""
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=WEEK1_DIR, capture_output=True, text=True, timeout=60, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_scraping_modules_do_not_import_openai_or_asyncio():
+    loaded = fresh_interpreter(
+        "import json, logging, sys\n"
+        "import batch, crawler, day5\n"
+        "print(json.dumps({'openai': 'openai' in sys.modules, 'asyncio': 'asyncio' in sys.modules,\n"
+        "                  'handlers': len(logging.getLogger().handlers)}))"
+    )
+    # Importing day5 must not configure logging either; entry points call configure_logging()
+    assert loaded == {"openai": False, "asyncio": False, "handlers": 0}
+
+
+def test_openai_loads_with_the_first_client_use():
+    loaded = fresh_interpreter(
+        "import json, sys\n"
+        "from day5 import BrochureGenerator\n"
+        "generator = BrochureGenerator(api_key='sk-test')\n"
+        "before = 'openai' in sys.modules\n"
+        "client = generator.client\n"
+        "print(json.dumps([before, 'openai' in sys.modules, generator.client is client]))"
+    )
+    assert loaded == [False, True, True]
+
+
+def test_star_import_exposes_only_the_public_api():
+    namespace = {}
+    exec("from day5 import *", namespace)
+    assert sorted(name for name in namespace if name != "__builtins__") == [
+        "BrochureGenerator", "Website", "WebsiteScraperError", "configure_logging",
+    ]
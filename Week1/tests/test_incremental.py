@@ -0,0 +1,103 @@
+import hashlib
+import json
+
+from incremental import diff_records, incremental_scrape, load_snapshot, record_hash
+from test_catalogue import TOTAL_BOOKS, FixtureClient
+
+BOOK_A = {"url": "https://books.toscrape.com/catalogue/a_1/index.html", "title": "A", "price": 10.0}
+BOOK_B = {"url": "https://books.toscrape.com/catalogue/b_2/index.html", "title": "B", "price": 5.0}
+BOOK_C = {"url": "https://books.toscrape.com/catalogue/c_3/index.html", "title": "C", "price": 1.0}
+
+
+def test_diff_records_reports_inserts_updates_and_unchanged():
+    # Hashed and unhashed (legacy) previous records both compare by content
+    previous = {BOOK_A["url"]: {**BOOK_A, "content_hash": record_hash(BOOK_A)}, BOOK_B["url"]: dict(BOOK_B)}
+    current = [dict(BOOK_A), {**BOOK_B, "price": 6.0}, dict(BOOK_C)]
+
+    ops = [(op, record["title"]) for op, record in diff_records(previous, iter(current))]
+    assert ops == [("unchanged", "A"), ("update", "B"), ("insert", "C")]
+    assert all(record["content_hash"] == record_hash(record) for record in current)
+
+
+def test_record_hash_ignores_key_order_and_stored_hash():
+    reordered = {"price": 10.0, "title": "A", "url": BOOK_A["url"], "content_hash": "stale"}
+    assert record_hash(BOOK_A) == record_hash(reordered)
+    assert record_hash(BOOK_A) != record_hash({**BOOK_A, "price": 10.5})
+
+
+def test_load_snapshot_upgrades_the_legacy_json(tmp_path):
+    path = tmp_path / "books.json"
+    path.write_text(json.dumps([
+        {"url": "https://books.toscrape.com/a-light-in-the-attic_1000/index.html", "title": "A", "price": "Â£51.77"},
+    ]), encoding="utf-8")
+    (record,) = load_snapshot(str(path)).values()
+    assert record["url"] == "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html"
+    assert (record["price"], record["currency"]) == (51.77, "GBP")
+    assert load_snapshot(str(tmp_path / "missing.jsonl")) == {}
+
+
+class ValidatingClient(FixtureClient):
+    """Fixture client with ETags, 304s and in-place edits to page bodies."""
+
+    def __init__(self, edits=None, **kwargs):
+        super().__init__(**kwargs)
+        self.edits = edits or {}
+        self.not_modified = 0
+
+    def get(self, url, headers=None, **kwargs):
+        response = super().get(url, **kwargs)
+        if response.status_code != 200:
+            return response
+        for old, new in self.edits.items():
+            response._content = response._content.replace(old, new)
+        etag = '"%s"' % hashlib.sha1(response._content).hexdigest()
+        response.headers["ETag"] = etag
+        if (headers or {}).get("If-None-Match") == etag:
+            self.not_modified += 1
+            response.status_code = 304
+            response._content = b""
+        return response
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def scrape(tmp_path, client):
+    return incremental_scrape(str(tmp_path / "books.jsonl"), str(tmp_path / "delta.jsonl"), client=client)
+
+
+def test_rescrape_only_reports_what_changed(tmp_path):
+    first = scrape(tmp_path, ValidatingClient())
+    assert first == {"insert": TOTAL_BOOKS, "update": 0, "delete": 0, "unchanged": 0}
+
+    client = ValidatingClient()
+    assert scrape(tmp_path, client)["unchanged"] == TOTAL_BOOKS
+    # Every listing page came back 304 and was not parsed again
+    assert client.not_modified == 3
+    assert read_jsonl(tmp_path / "delta.jsonl") == []
+
+    # One price changes on page 2
+    changed = scrape(tmp_path, ValidatingClient(edits={"£26.19".encode(): "£27.00".encode()}))
+    assert changed == {"insert": 0, "update": 1, "delete": 0, "unchanged": TOTAL_BOOKS - 1}
+    (delta,) = read_jsonl(tmp_path / "delta.jsonl")
+    assert delta["op"] == "update" and delta["record"]["price"] == 27.0
+    assert len(read_jsonl(tmp_path / "books.jsonl")) == TOTAL_BOOKS
+
+
+def test_books_gone_from_the_catalogue_are_deleted(tmp_path):
+    gone = {"url": "https://books.toscrape.com/catalogue/gone_1/index.html", "title": "Gone"}
+    (tmp_path / "books.jsonl").write_text(json.dumps(gone) + "\n", encoding="utf-8")
+
+    counts = scrape(tmp_path, ValidatingClient())
+    assert counts["delete"] == 1 and counts["insert"] == TOTAL_BOOKS
+    assert {"op": "delete", "url": gone["url"], "record": None} in read_jsonl(tmp_path / "delta.jsonl")
+
+
+def test_failed_pages_carry_unseen_books_over(tmp_path):
+    scrape(tmp_path, ValidatingClient())
+    counts = scrape(tmp_path, ValidatingClient(failing={"/catalogue/page-3.html"}))
+    assert counts["delete"] == 0
+    assert counts["unchanged"] == TOTAL_BOOKS - 5
+    assert len(read_jsonl(tmp_path / "books.jsonl")) == TOTAL_BOOKS
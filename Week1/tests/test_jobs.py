@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from jobs import DONE, ERROR, JobQueue, ScrapeCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_scrape_cache_reuses_until_ttl():
+    clock = Clock()
+    cache = ScrapeCache(ttl=60, clock=clock)
+    calls = []
+
+    def scrape(url):
+        calls.append(url)
+        return f"contents of {url} #{len(calls)}"
+
+    assert cache.get_or_scrape("a", scrape) == "contents of a #1"
+    clock.now = 59
+    assert cache.get_or_scrape("a", scrape) == "contents of a #1"
+    clock.now = 61
+    assert cache.get_or_scrape("a", scrape) == "contents of a #2"
+
+
+def test_scrape_cache_keeps_no_failures():
+    cache = ScrapeCache()
+    outcomes = [RuntimeError("site down"), "back up"]
+
+    def scrape(url):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_scrape("a", scrape)
+    assert cache.get_or_scrape("a", scrape) == "back up"
+
+
+def test_scrape_cache_evicts_least_recent():
+    cache = ScrapeCache(max_entries=2)
+    for url in ("a", "b"):
+        cache.get_or_scrape(url, str.upper)
+    cache.get_or_scrape("a", str.upper)
+    cache.get_or_scrape("c", str.upper)
+    assert list(cache._entries) == ["a", "c"]
+
+
+class FakeGenerator:
+    def build_messages(self, company_name, url, contents):
+        return [{"role": "user", "content": contents}]
+
+    def complete(self, messages, use_cache=True):
+        return f"brochure from {messages[0]['content']}"
+
+
+def wait_finished(queue, job):
+    deadline = time.monotonic() + 5
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_job_queue_uses_the_shared_cache_from_worker_threads():
+    queue = JobQueue(max_workers=2)
+    cache = ScrapeCache()
+
+    def failing(url):
+        raise RuntimeError("landing page failed")
+
+    bad = queue.submit(FakeGenerator(), "Acme", "a", scrape=lambda url: cache.get_or_scrape(url, failing))
+    wait_finished(queue, bad)
+    assert bad.status == ERROR and "landing page failed" in bad.error
+
+    good = queue.submit(FakeGenerator(), "Acme", "a", scrape=lambda url: cache.get_or_scrape(url, str.upper))
+    wait_finished(queue, good)
+    assert good.status == DONE and good.brochure == "brochure from A"
+    queue.shutdown()
@@ -0,0 +1,134 @@
+import sqlite3
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from bench_suite import LocalServer
+from day5 import Website
+from links import UrlIndex, canonicalize, extract_links, host, url_key
+from parsers import PARSERS, parse_html
+from response_cache import ResponseCache
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://Example.COM:80/a/./b/../c?b=2&a=1#top", "http://example.com/a/c?a=1&b=2"),
+    ("https://example.com:443", "https://example.com/"),
+    ("https://example.com:8443/x", "https://example.com:8443/x"),
+    ("https://example.com/?utm_source=mail&id=3&fbclid=x", "https://example.com/?id=3"),
+    ("https://example.com./a/..", "https://example.com/"),
+    ("http://[::1]:8080/a", "http://[::1]:8080/a"),
+    ("http://[2001:DB8::1]/", "http://[2001:db8::1]/"),
+    ("https://user:pw@Example.com/", "https://user:pw@example.com/"),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+def test_canonical_ipv6_url_round_trips():
+    canonical = canonicalize("http://[::1]:8080/a")
+    assert canonicalize(canonical) == canonical
+    assert host(canonical) == "[::1]:8080"
+
+
+def test_url_key_ignores_trailing_slash():
+    assert url_key("https://example.com/about/") == url_key("https://EXAMPLE.com/about")
+
+
+def test_url_index_dedupes_spellings():
+    index = UrlIndex(["https://example.com/about"])
+    assert not index.add("https://example.com/about/#team")
+    assert index.add("https://example.com/careers")
+    assert "https://example.com/careers/" in index
+    assert len(index) == 2
+
+
+def test_extract_links_resolves_filters_and_dedupes():
+    hrefs = [
+        "../products", "/products/", "#top", "mailto:hi@example.com", "javascript:void(0)",
+        "/privacy", "https://other.com/page?utm_campaign=x", "  team  ",
+    ]
+    links = extract_links(hrefs, "https://example.com/company/about")
+    assert links == [
+        "https://example.com/products",
+        "https://other.com/page",
+        "https://example.com/company/team",
+    ]
+
+
+def test_extract_links_shares_an_index_across_pages():
+    index = UrlIndex()
+    assert extract_links(["/a", "/b"], "https://example.com/", index=index) == [
+        "https://example.com/a", "https://example.com/b",
+    ]
+    assert extract_links(["/b", "/c"], "https://example.com/x", index=index) == ["https://example.com/c"]
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_parsers_read_base_href(backend):
+    html = '<html><head><base href="/docs/"><base href="/ignored/"></head><body><a href="x">x</a></body></html>'
+    assert parse_html(html, backend).base_href == "/docs/"
+    assert parse_html("<html><body><a href='x'>x</a></body></html>", backend).base_href is None
+
+
+class RedirectingSite(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/old":
+            self.send_response(302)
+            self.send_header("Location", "/new/section/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/based":
+            body = b'<html><head><base href="/assets/"></head><body><a href="guide">g</a></body></html>'
+        else:
+            body = b'<html><body><a href="page">p</a><a href="../up">u</a></body></html>'
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_links_resolve_against_the_redirect_target():
+    with LocalServer(RedirectingSite) as server:
+        page = Website(f"{server.url}/old", use_cache=False)
+    assert page.url == f"{server.url}/old"
+    assert page.final_url == f"{server.url}/new/section/"
+    assert page.links == [f"{server.url}/new/section/page", f"{server.url}/new/up"]
+
+
+def test_links_resolve_against_base_href():
+    with LocalServer(RedirectingSite) as server:
+        page = Website(f"{server.url}/based", use_cache=False)
+    assert page.links == [f"{server.url}/assets/guide"]
+
+
+def test_cached_page_keeps_its_redirect_target(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite"))
+    with LocalServer(RedirectingSite) as server:
+        Website(f"{server.url}/old", cache=cache)
+        page = Website(f"{server.url}/old", cache=cache)
+    assert page.from_cache
+    assert page.links == [f"{server.url}/new/section/page", f"{server.url}/new/up"]
+    cache.close()
+
+
+def test_response_cache_adds_final_url_to_old_files(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE responses (url TEXT PRIMARY KEY, body BLOB NOT NULL, encoding TEXT NOT NULL, etag TEXT, "
+        "last_modified TEXT, fetched_at REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT INTO responses VALUES ('https://a.test/', x'3c703e', 'utf-8', NULL, NULL, 0, 0, 3)")
+    conn.commit()
+    conn.close()
+
+    cache = ResponseCache(path=path)
+    assert cache.get("https://a.test/").final_url is None
+    cache.put("https://b.test/", b"<p>", "utf-8", final_url="https://b.test/home")
+    assert cache.get("https://b.test/").final_url == "https://b.test/home"
+    cache.close()
@@ -0,0 +1,99 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import Histogram, MetricsRegistry, record_token_usage
+
+
+def test_histogram_buckets_are_upper_bound_inclusive():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 1, 3):
+        histogram.observe(value)
+    assert histogram.counts == [2, 2, 1]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(4.65)
+
+
+def test_nested_spans_share_a_trace(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    registry = MetricsRegistry(trace_path=path)
+    with registry.span("brochure", company="Acme") as outer:
+        with registry.span("fetch", url="https://acme.test") as inner:
+            inner.set(status=200)
+        with pytest.raises(ValueError):
+            with registry.span("llm"):
+                raise ValueError("boom")
+    registry.close()
+
+    with open(path, encoding="utf-8") as f:
+        events = {event["name"]: event for event in map(json.loads, f)}
+    assert set(events) == {"brochure", "fetch", "llm"}
+    assert events["fetch"]["trace_id"] == events["brochure"]["trace_id"] == outer.trace_id
+    assert events["fetch"]["parent_id"] == events["brochure"]["span_id"]
+    assert events["brochure"]["parent_id"] is None
+    assert events["fetch"]["attrs"] == {"url": "https://acme.test", "status": 200}
+    assert events["llm"]["error"] == "ValueError: boom"
+    assert registry.counter_value("errors_total", stage="llm", type="ValueError") == 1
+
+
+def test_span_end_is_idempotent():
+    registry = MetricsRegistry()
+    span = registry.span("parse")
+    span.end()
+    span.end()
+    assert registry.snapshot()["histograms"]["stage_seconds"][0]["count"] == 1
+
+
+def test_prometheus_exposition():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    registry.describe("bytes_total", "Bytes fetched over HTTP")
+    registry.inc("bytes_total", 2048)
+    registry.inc("cache_requests_total", cache="pages", result="hit")
+    registry.inc("cache_requests_total", 3, cache="pages", result="miss")
+    registry.inc("errors_total", stage="fetch", type='Say "hi"\n')
+    registry.observe("stage_seconds", 0.05, stage="fetch")
+    registry.observe("stage_seconds", 0.5, stage="fetch")
+
+    assert registry.to_prometheus().splitlines() == [
+        "# HELP brochure_bytes_total Bytes fetched over HTTP",
+        "# TYPE brochure_bytes_total counter",
+        "brochure_bytes_total 2048",
+        "# TYPE brochure_cache_requests_total counter",
+        'brochure_cache_requests_total{cache="pages",result="hit"} 1',
+        'brochure_cache_requests_total{cache="pages",result="miss"} 3',
+        "# TYPE brochure_errors_total counter",
+        'brochure_errors_total{stage="fetch",type="Say \\"hi\\"\\n"} 1',
+        "# TYPE brochure_stage_seconds histogram",
+        'brochure_stage_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'brochure_stage_seconds_bucket{stage="fetch",le="1"} 2',
+        'brochure_stage_seconds_bucket{stage="fetch",le="+Inf"} 2',
+        'brochure_stage_seconds_sum{stage="fetch"} 0.550000',
+        'brochure_stage_seconds_count{stage="fetch"} 2',
+        "# TYPE brochure_cache_hit_ratio gauge",
+        'brochure_cache_hit_ratio{cache="pages"} 0.2500',
+    ]
+
+
+def test_write_prometheus_replaces_the_file_atomically(tmp_path):
+    path = str(tmp_path / "brochure.prom")
+    registry = MetricsRegistry()
+    registry.inc("bytes_total", 1)
+    registry.write_prometheus(path)
+    registry.inc("bytes_total", 1)
+    registry.write_prometheus(path)
+    with open(path, encoding="utf-8") as f:
+        assert "brochure_bytes_total 2" in f.read()
+    assert os.listdir(tmp_path) == ["brochure.prom"]
+
+
+def test_record_token_usage_counts_and_tags_the_span():
+    registry = MetricsRegistry()
+    span = registry.span("llm")
+    record_token_usage(SimpleNamespace(prompt_tokens=120, completion_tokens=30), span)
+    record_token_usage(None, span)
+    span.end()
+    assert registry.counter_value("tokens_total", kind="prompt") == 120
+    assert registry.counter_value("tokens_total", kind="completion") == 30
+    assert span.attrs == {"prompt_tokens": 120, "completion_tokens": 30}
@@ -0,0 +1,62 @@
+import glob
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from parsers import PARSERS, parse_html, parse_with_lxml, parse_with_soup
+
+FIXTURE_PAGES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "**", "*.html"), recursive=True))
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("path", FIXTURE_PAGES[:6], ids=os.path.basename)
+def test_lxml_target_matches_the_soup_backend(path):
+    html = read(path)
+    fast, reference = parse_with_lxml(html), parse_with_soup(html)
+    assert fast.text == reference.text
+    assert fast.hrefs == reference.hrefs
+    assert fast.title == reference.title.strip()
+    assert fast.has_body and reference.has_body
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_skipped_tags_stay_out_of_the_text(backend):
+    html = (
+        "<html><head><title>Acme</title><style>p {}</style></head><body>"
+        "<div>one<span>two</span><svg><text>hidden</text><style>x</style></svg>"
+        "<script>bad()</script><noscript>enable js</noscript>three</div>"
+        "<!-- note --><p>four <a href='/a'>link</a></p></body></html>"
+    )
+    page = parse_html(html, backend)
+    assert page.title == "Acme"
+    assert page.text == "one\ntwo\nthree\nfour\nlink"
+    assert page.hrefs == ["/a"]
+
+
+def test_lxml_keeps_the_first_title_only():
+    page = parse_with_lxml("<html><head><title> First </title></head><body><svg><title>Icon</title></svg></body></html>")
+    assert page.title == "First"
+    assert page.text == ""
+
+
+def test_lxml_recovers_from_broken_markup():
+    page = parse_with_lxml("<html><body><p>open <b>bold <a href=x>link</p><div>after")
+    assert page.text == "open\nbold\nlink\nafter"
+    assert page.hrefs == ["x"]
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_page_without_body(backend):
+    page = parse_html("<html><head><title>Only a head</title></head></html>", backend)
+    assert not page.has_body
+    assert page.text == ""
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown parser backend"):
+        parse_html("<p>", "html5lib")
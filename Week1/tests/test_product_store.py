@@ -0,0 +1,55 @@
+import pandas as pd
+
+from product_store import ProductStore
+
+SCHEMA = {"title": "str", "price": "float64", "stock": "int32", "category": "str"}
+RECORDS = [
+    {"title": "A", "price": 5.0, "stock": 3, "category": "Poetry"},
+    {"title": "B", "price": None, "stock": None, "category": None},
+    {"title": "C", "price": 9.0, "stock": 3, "category": "Art"},
+    {"title": "D", "price": 5.0, "stock": 7, "category": "Poetry"},
+    {"title": "E", "price": None, "stock": 1, "category": "Art"},
+]
+
+
+def store() -> ProductStore:
+    return ProductStore.from_records(RECORDS, schema=SCHEMA)
+
+
+def titles(result: ProductStore):
+    return [record["title"] for record in result.iter_records()]
+
+
+def test_sort_ascending_puts_missing_last():
+    assert titles(store().sort("price")) == ["A", "D", "C", "B", "E"]
+    assert titles(store().sort("stock")) == ["E", "A", "C", "D", "B"]
+
+
+def test_sort_descending_is_stable_with_missing_last():
+    assert titles(store().sort("price", descending=True)) == ["C", "A", "D", "B", "E"]
+    assert titles(store().sort("stock", descending=True)) == ["D", "A", "C", "E", "B"]
+    assert titles(store().sort("category", descending=True)) == ["A", "D", "C", "E", "B"]
+
+
+def test_sort_by_several_columns():
+    assert titles(store().sort(["category", "price"])) == ["C", "E", "A", "D", "B"]
+
+
+def test_to_frame_uses_nullable_ints():
+    frame = store().to_frame()
+    assert str(frame["stock"].dtype) == "Int64"
+    assert pd.isna(frame["stock"][1])
+    assert frame["stock"].sum() == 14
+    assert pd.isna(frame["category"][1])
+
+
+def test_top_skips_missing_ints():
+    assert titles(store().top(1, "stock", descending=False)) == ["E"]
+    assert set(titles(store().top(4, "stock", descending=False))) == {"A", "C", "D", "E"}
+    assert set(titles(store().top(4, "stock"))) == {"A", "C", "D", "E"}
+    # Missing values only fill in once the real ones run out
+    assert titles(store().top(5, "stock", descending=False))[-1] == "B"
+
+
+def test_top_skips_missing_floats():
+    assert titles(store().top(3, "price")) == ["C", "A", "D"]
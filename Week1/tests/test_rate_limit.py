@@ -0,0 +1,126 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from async_brochure import RateLimitScheduler, TokenBucket
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the scheduler sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def rate_limit_error(retry_after: str = "0") -> RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after": retry_after})
+    return RateLimitError("slow down", response=response, body=None)
+
+
+def scheduler(clock: FakeClock, **kwargs) -> RateLimitScheduler:
+    kwargs.setdefault("requests_per_minute", 60)
+    kwargs.setdefault("tokens_per_minute", 6000)
+    return RateLimitScheduler(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_bucket_refills_at_rate_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=100, rate=10, clock=clock)
+    bucket.take(100)
+    assert bucket.wait_time(50) == pytest.approx(5)
+    clock.now = 3
+    assert bucket.wait_time(50) == pytest.approx(2)
+    clock.now = 1000
+    assert bucket.wait_time(100) == 0
+    bucket.take(0)
+    assert bucket.tokens == 100
+
+
+def test_acquire_waits_for_the_token_bucket():
+    clock = FakeClock()
+    limiter = scheduler(clock)
+    asyncio.run(limiter.acquire(6000))
+    # Bucket is empty; 3000 tokens at 100/s takes 30s
+    asyncio.run(limiter.acquire(3000))
+    assert clock.now == pytest.approx(30)
+
+
+def test_oversized_request_is_capped_to_capacity():
+    clock = FakeClock()
+    limiter = scheduler(clock)
+    asyncio.run(limiter.acquire(10 ** 9))
+    assert clock.now == 0
+
+
+def test_settle_refunds_unused_tokens():
+    clock = FakeClock()
+    limiter = scheduler(clock)
+    asyncio.run(limiter.acquire(4000))
+    limiter.settle(4000, 1000)
+    assert limiter.tokens.tokens == pytest.approx(5000)
+
+
+def test_settle_counts_only_the_capped_reservation():
+    clock = FakeClock()
+    limiter = scheduler(clock)
+    asyncio.run(limiter.acquire(10 ** 9))
+    # Only the 6000-token capacity was reserved, so 7000 real tokens overdraw it
+    limiter.settle(10 ** 9, 7000)
+    assert limiter.tokens.tokens == pytest.approx(-1000)
+
+
+def test_retries_reuse_one_reservation():
+    clock = FakeClock()
+    limiter = scheduler(clock, base_delay=1, max_retries=5)
+    failures = [rate_limit_error(), rate_limit_error()]
+
+    async def request():
+        if failures:
+            raise failures.pop()
+        return "ok"
+
+    assert asyncio.run(limiter.call(request, 1000)) == "ok"
+    assert limiter.throttled == 2
+    # Only the backoff sleeps: the budget was not acquired again per retry
+    assert len(clock.sleeps) == 2
+    limiter.tokens._refill()
+    limiter.requests._refill()
+    assert limiter.tokens.tokens == pytest.approx(min(6000, 5000 + clock.now * 100))
+    assert limiter.requests.tokens == pytest.approx(min(60, 59 + clock.now))
+
+
+def test_retry_after_header_is_honoured():
+    clock = FakeClock()
+    limiter = scheduler(clock, base_delay=0.01)
+    failures = [rate_limit_error(retry_after="7")]
+
+    async def request():
+        if failures:
+            raise failures.pop()
+        return "ok"
+
+    asyncio.run(limiter.call(request, 10))
+    assert clock.sleeps == [7.0]
+
+
+def test_gives_up_after_max_retries():
+    clock = FakeClock()
+    limiter = scheduler(clock, max_retries=2, base_delay=0.01)
+
+    async def request():
+        raise rate_limit_error()
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(limiter.call(request, 10))
+    assert limiter.throttled == 3
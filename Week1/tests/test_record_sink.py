@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+
+import pytest
+
+from record_sink import CsvSink, JsonlSink, ParquetSink, open_sink
+
+
+def test_jsonl_is_published_on_close(tmp_path):
+    path = str(tmp_path / "books.jsonl")
+    with open_sink(path, batch_size=2) as sink:
+        sink.write_many({"n": n} for n in range(5))
+        assert not os.path.exists(path)
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["n"] for line in f] == list(range(5))
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_failure_inside_with_keeps_previous_file(tmp_path):
+    path = tmp_path / "books.jsonl"
+    path.write_text("previous\n", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with JsonlSink(str(path)) as sink:
+            sink.write({"n": 1})
+            raise RuntimeError("crawl died")
+    assert path.read_text(encoding="utf-8") == "previous\n"
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_failed_final_flush_closes_and_removes_part_file(tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_text("previous\n", encoding="utf-8")
+    sink = CsvSink(str(path), fields=["n"])
+    sink.write({"n": 1, "extra": 2})
+    with pytest.raises(ValueError):
+        sink.close()
+    assert sink._file.closed
+    assert path.read_text(encoding="utf-8") == "previous\n"
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_csv_rejects_keys_missing_from_the_header(tmp_path):
+    sink = CsvSink(str(tmp_path / "books.csv"), batch_size=1)
+    sink.write({"title": "A"})
+    with pytest.raises(ValueError, match="upc"):
+        sink.write({"title": "B", "upc": "123"})
+    sink.abort()
+
+
+def test_csv_declared_fields_allow_sparse_records(tmp_path):
+    path = str(tmp_path / "books.csv")
+    with open_sink(path, batch_size=1, fields=["title", "upc"]) as sink:
+        sink.write({"title": "A"})
+        sink.write({"title": "B", "upc": "123"})
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [{"title": "A", "upc": ""}, {"title": "B", "upc": "123"}]
+
+
+def test_parquet_widens_columns_that_start_out_empty(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "books.parquet")
+    with ParquetSink(path, batch_size=2, fields=["title", "price", "upc"]) as sink:
+        sink.write({"title": "A", "price": 1.5, "upc": None})
+        sink.write({"title": "B", "price": 2.0})
+        sink.write({"title": "C", "price": 3.0, "upc": "abc"})
+        sink.write({"title": "D", "price": None, "upc": "def"})
+    table = pq.read_table(path)
+    assert table.column_names == ["title", "price", "upc"]
+    assert str(table.schema.field("upc").type) in ("string", "large_string")
+    assert table.column("upc").to_pylist() == [None, None, "abc", "def"]
+    assert table.column("price").to_pylist() == [1.5, 2.0, 3.0, None]
+
+
+def test_parquet_types_late_columns_from_their_first_values(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "books.parquet")
+    with ParquetSink(path, batch_size=2, fields=["title", "stock", "rating", "note"]) as sink:
+        sink.write({"title": "A"})
+        sink.write({"title": "B", "stock": None})
+        sink.write({"title": "C", "stock": 4})
+        sink.write({"title": "D", "stock": 7, "rating": None})
+        sink.write({"title": "E", "stock": None, "rating": 4.5})
+    table = pq.read_table(path)
+    assert str(table.schema.field("stock").type) == "int64"
+    assert table.column("stock").to_pylist() == [None, None, 4, 7, None]
+    assert str(table.schema.field("rating").type) == "double"
+    assert table.column("rating").to_pylist() == [None, None, None, None, 4.5]
+    # Never filled in: stays untyped rather than guessing
+    assert str(table.schema.field("note").type) == "null"
+    assert table.num_rows == 5
+
+
+def test_parquet_rejects_new_columns_in_later_batches(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "books.parquet"
+    sink = ParquetSink(str(path), batch_size=1)
+    sink.write({"title": "A"})
+    with pytest.raises(ValueError, match="upc"):
+        sink.write({"title": "B", "upc": "123"})
+    sink.abort()
+    assert not os.path.exists(f"{path}.part")
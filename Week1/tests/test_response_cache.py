@@ -0,0 +1,52 @@
+import asyncio
+
+import httpx
+
+from async_brochure import AsyncBrochureGenerator
+from completion_cache import CompletionCache
+from day5 import Website
+from response_cache import ResponseCache, store_response
+
+
+def test_store_response_skips_truncated_and_no_store(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite"))
+    store_response(cache, "https://a.test/", b"<p>cut", "utf-8", {}, truncated=True)
+    store_response(cache, "https://b.test/", b"<p>", "utf-8", {"Cache-Control": "private, no-store"})
+    store_response(cache, "https://c.test/", b"<p>", "utf-8", {"ETag": '"v1"'})
+    assert cache.get("https://a.test/") is None
+    assert cache.get("https://b.test/") is None
+    assert cache.get("https://c.test/").etag == '"v1"'
+    cache.close()
+
+
+def test_truncated_page_is_refetched(fixture_site, tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite"))
+    first = Website(f"{fixture_site}/", cache=cache, max_bytes=1024)
+    second = Website(f"{fixture_site}/", cache=cache, max_bytes=1024)
+    assert first.error is None and not second.from_cache
+    assert cache.misses == 2
+
+    full = Website(f"{fixture_site}/", cache=cache)
+    assert not full.from_cache
+    assert Website(f"{fixture_site}/", cache=cache).from_cache
+    cache.close()
+
+
+def test_async_fetch_does_not_cache_truncated_pages(fixture_site, tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite"))
+
+    async def run():
+        generator = AsyncBrochureGenerator(
+            client=object(), http_client=httpx.AsyncClient(), cache=CompletionCache(enabled=False),
+            response_cache=cache,
+        )
+        generator.max_bytes = 1024
+        try:
+            return [await generator.fetch_website(f"{fixture_site}/") for _ in range(2)]
+        finally:
+            await generator.http.aclose()
+
+    pages = asyncio.run(run())
+    assert all(page.error is None and not page.from_cache for page in pages)
+    assert cache.get(f"{fixture_site}/") is None
+    cache.close()
@@ -0,0 +1,54 @@
+import pytest
+from openai import OpenAI
+
+from completion_cache import CompletionCache
+from day5 import BrochureGenerator
+from metrics import get_metrics
+
+EXPECTED = "".join(f"word{i} " for i in range(60))
+
+
+@pytest.fixture
+def generator(fake_openai, tmp_path):
+    client = OpenAI(api_key="test", base_url=f"{fake_openai}/v1", max_retries=0)
+    cache = CompletionCache(path=str(tmp_path / "completions.sqlite"))
+    return BrochureGenerator(client=client, cache=cache, max_pages=1, page_cache=False)
+
+
+def test_stream_yields_deltas_and_caches_the_whole_text(generator, fixture_site):
+    metrics = get_metrics()
+    completion_tokens = metrics.counter_value("tokens_total", kind="completion")
+
+    deltas = list(generator.stream_brochure("Acme", f"{fixture_site}/"))
+    assert len(deltas) == 60
+    assert "".join(deltas) == EXPECTED
+    assert metrics.counter_value("tokens_total", kind="completion") == completion_tokens + 60
+
+    # Served whole from the completion cache the second time
+    assert list(generator.stream_brochure("Acme", f"{fixture_site}/")) == [EXPECTED]
+
+
+def test_abandoned_stream_is_not_cached(generator, fixture_site):
+    stream = generator.stream_brochure("Acme", f"{fixture_site}/")
+    assert [next(stream) for _ in range(3)] == ["word0 ", "word1 ", "word2 "]
+    stream.close()
+
+    assert len(list(generator.stream_brochure("Acme", f"{fixture_site}/"))) == 60
+
+
+def test_stream_matches_the_blocking_completion(generator, fixture_site):
+    messages = generator.build_messages("Acme", fixture_site, "Anvils for everyone.")
+    assert "".join(generator.stream_complete(messages, use_cache=False)) == generator.complete(
+        messages, use_cache=False
+    )
+
+
+def test_stream_reports_failures_as_markdown(fixture_site):
+    client = OpenAI(api_key="test", base_url="http://127.0.0.1:9/v1", max_retries=0, timeout=2)
+    generator = BrochureGenerator(client=client, cache=CompletionCache(enabled=False), max_pages=1)
+    messages = generator.build_messages("Acme", fixture_site, "Anvils.")
+    with pytest.raises(Exception):
+        list(generator.stream_complete(messages))
+
+    (chunk,) = generator.stream_brochure("Acme", f"{fixture_site}/")
+    assert chunk.startswith("## 🤖 Brochure Generation Error")
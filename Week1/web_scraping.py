@@ -1,6 +1,9 @@
-from bs4 import BeautifulSoup
-import requests
-import json
+import argparse
+import sys
+
+from catalogue import DETAIL_FIELDS, LISTING_FIELDS, CatalogueError, CatalogueScraper
+from incremental import incremental_scrape
+from record_sink import open_sink
 
 ############## 
 '''
@@ -114,22 +117,44 @@ response = requests.get(url, headers=headers)
 
 
 ENDPOINT = "https://books.toscrape.com/catalogue/page-1.html"
-html_response = requests.get(ENDPOINT).text
-
-html_soup = BeautifulSoup(html_response, 'html.parser')
-print(html_soup.title.string)
-products = html_soup.find_all('article', class_='product_pod')
-
-products_data = []
-for product in products:
-    book_data = {
-        'url' : "https://books.toscrape.com/" + product.h3.a['href'],
-        'title': product.h3.a['title'],
-        'price': product.find('p', class_='price_color').text
-    }
-    products_data.append(book_data)
-    
-# print(products[0])
 
-with open('books.json', 'w') as f:
-    json.dump(products_data, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the books.toscrape.com catalogue.")
+    parser.add_argument("output", nargs="?", default="books.jsonl",
+                        help="output file; .jsonl, .csv or .parquet")
+    parser.add_argument("--details", action="store_true", help="also fetch each book's detail page")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-parse pages that changed since the last run and write a delta file")
+    parser.add_argument("--previous", help="snapshot to diff against (default: the output file)")
+    parser.add_argument("--delta", default="books.delta.jsonl", help="where --incremental writes changes")
+    args = parser.parse_args()
+
+    if args.incremental:
+        counts = incremental_scrape(
+            args.output,
+            args.delta,
+            details=args.details,
+            previous_path=args.previous,
+            start_url=ENDPOINT,
+            max_workers=args.workers,
+        )
+        print(f"Delta written to {args.delta}: {counts}")
+        return
+
+    # Every catalogue page (not just page 1), fetched concurrently and
+    # written out as each record is parsed
+    scraper = CatalogueScraper(ENDPOINT, max_workers=args.workers)
+    fields = LISTING_FIELDS + (DETAIL_FIELDS if args.details else [])
+    try:
+        with open_sink(args.output, fields=fields) as sink:
+            sink.write_many(scraper.iter_books(details=args.details))
+    except CatalogueError as e:
+        # The sink discarded its part file, so the previous output is untouched
+        sys.exit(f"Scrape incomplete ({e}); {args.output} left unchanged")
+    print(f"Scraped {sink.count} books into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
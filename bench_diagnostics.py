@@ -0,0 +1,228 @@
+"""Wall-time benchmarks for diagnostics.py in large environments.
+
+    python bench_diagnostics.py --distributions 3000 --path-entries 200 --repeat 5
+    python bench_diagnostics.py --suites env-scan --files 100000
+    python bench_diagnostics.py --output bench-diagnostics.json
+
+Builds a synthetic environment (a site-packages directory with thousands
+of ``*.dist-info`` entries plus many extra sys.path directories) and
+times, each in a fresh interpreter so import costs count:
+
+- ``legacy_packages``: the old package check, ``pkg_resources.working_set``
+  plus the commonpath/isfile scan of every sys.path entry
+- ``inventory``: the same lookups through ``diagnostics.PackageInventory``
+- ``diagnostics``: a full ``Diagnostics().run()``, parallel and sequential
+
+The ``env-scan`` suite builds a synthetic project with ~100k files (source
+tree, node_modules, a virtualenv, gitignored data) and times the old
+unbounded ``os.walk`` .env search against ``diagnostics.EnvFileScanner``,
+scanning the tree and asking ``git ls-files``.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REQUIRED = ['openai', 'python-dotenv', 'requests', 'gradio', 'transformers']
+CONFLICTS = [('openai', 'openai-python'), ('python-dotenv', 'dotenv')]
+
+LEGACY_PACKAGES = f"""
+import os, site, sys
+import pkg_resources
+installed = {{pkg.key: pkg.version for pkg in pkg_resources.working_set}}
+found = {{name: installed.get(name) for name in {REQUIRED!r}}}
+conflicts = [(a, b) for a, b in {CONFLICTS!r} if a in installed and b in installed]
+site_packages_paths = site.getsitepackages() + [site.getusersitepackages()]
+def is_in_site_packages(path):
+    return any(os.path.commonpath([path, sp]) == sp for sp in site_packages_paths)
+hits = []
+for path in sys.path:
+    if not path or is_in_site_packages(path):
+        continue
+    for name in ['openai.py', 'dotenv.py']:
+        if os.path.isfile(os.path.join(path, name)):
+            hits.append(os.path.join(path, name))
+print(len(installed))
+"""
+
+INVENTORY = f"""
+import os, site, sys
+sys.path.append({ROOT!r})
+from diagnostics import PackageInventory
+inventory = PackageInventory()
+found = inventory.versions({REQUIRED!r})
+conflicts = inventory.conflicts({CONFLICTS!r})
+site_packages_paths = site.getsitepackages() + [site.getusersitepackages()]
+hits = inventory.shadowing(['openai', 'dotenv'], [os.getcwd()] + [p for p in sys.path if p], exclude=site_packages_paths)
+print(len(inventory.distributions))
+"""
+
+FULL_RUN = f"""
+import sys
+sys.path.append({ROOT!r})
+from diagnostics import Diagnostics
+Diagnostics(parallel={{parallel}}).run()
+"""
+
+
+def build_environment(root: str, distributions: int, path_entries: int) -> str:
+    """Create the synthetic tree under `root`; returns the PYTHONPATH to use."""
+    site_dir = os.path.join(root, 'site-packages')
+    os.makedirs(site_dir)
+    for i in range(distributions):
+        name = f"synthetic_pkg_{i}"
+        info = os.path.join(site_dir, f"{name}-1.{i % 10}.0.dist-info")
+        os.makedirs(info)
+        with open(os.path.join(info, 'METADATA'), 'w') as f:
+            f.write(f"Metadata-Version: 2.1\nName: synthetic-pkg-{i}\nVersion: 1.{i % 10}.0\n")
+        with open(os.path.join(info, 'top_level.txt'), 'w') as f:
+            f.write(f"{name}\n")
+        os.makedirs(os.path.join(site_dir, name))
+        open(os.path.join(site_dir, name, '__init__.py'), 'w').close()
+
+    paths = [site_dir]
+    for i in range(path_entries):
+        directory = os.path.join(root, 'paths', f"entry{i}")
+        os.makedirs(directory)
+        for j in range(20):
+            open(os.path.join(directory, f"module{j}.py"), 'w').close()
+        paths.append(directory)
+    return os.pathsep.join(paths)
+
+
+def build_project(root: str, files: int) -> List[str]:
+    """Synthetic repository with about `files` files; returns the .env paths a scan should report."""
+    def fill(directory: str, count: int, per_dir: int = 50, fanout: int = 8):
+        # Spread `count` files over a tree `fanout` wide, `per_dir` files per directory
+        queue, made = [directory], 0
+        while made < count:
+            current = queue.pop(0)
+            os.makedirs(current, exist_ok=True)
+            for i in range(min(per_dir, count - made)):
+                open(os.path.join(current, f"f{i}.txt"), 'w').close()
+            made += per_dir
+            queue.extend(os.path.join(current, f"d{i}") for i in range(fanout))
+
+    share = files // 10
+    fill(os.path.join(root, 'src'), share * 2)
+    fill(os.path.join(root, 'node_modules'), share * 4)
+    fill(os.path.join(root, '.venv', 'lib', 'python3', 'site-packages'), share * 2)
+    fill(os.path.join(root, 'data'), share * 2)
+    open(os.path.join(root, '.venv', 'pyvenv.cfg'), 'w').close()
+    with open(os.path.join(root, '.gitignore'), 'w') as f:
+        f.write(".env\ndata/\n*.log\n")
+
+    expected = [os.path.join(root, '.env'), os.path.join(root, 'src', 'd1', '.env'), os.path.join(root, 'src', 'd2', 'd3', '.env')]
+    hidden = [os.path.join(root, 'node_modules', 'd1', '.env'), os.path.join(root, 'data', 'd0', '.env')]
+    for path in expected + hidden:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write("OPENAI_API_KEY=sk-proj-test\n")
+    subprocess.run(['git', 'init', '-q', root], check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return sorted(expected)
+
+
+def legacy_env_scan(root: str) -> List[str]:
+    """The original _step4_check_env_file search: every directory under the root."""
+    return sorted(os.path.join(directory, '.env') for directory, _, files in os.walk(root) if '.env' in files)
+
+
+def time_call(function: Callable[[], List[str]], repeat: int) -> dict:
+    timings, found = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found = function()
+        timings.append(time.perf_counter() - started)
+    return {'median_s': round(statistics.median(timings), 4), 'min_s': round(min(timings), 4),
+            'runs': len(timings), 'found': len(found)}
+
+
+def run_env_scan(files: int, repeat: int) -> dict:
+    sys.path.append(ROOT)
+    from diagnostics import EnvFileScanner
+
+    root = tempfile.mkdtemp(prefix='bench-envscan-')
+    try:
+        expected = build_project(root, files)
+        total = sum(len(names) for _, _, names in os.walk(root))
+        print(f"env-scan tree: {total} files, {len(expected)} reachable .env files")
+        cases = [
+            ('legacy_os_walk', lambda: legacy_env_scan(root)),
+            ('scandir_scanner', lambda: EnvFileScanner(root).scan()),
+            ('git_ls_files', lambda: EnvFileScanner(root, use_git=True).scan()),
+        ]
+        results = {'files': total}
+        for name, function in cases:
+            timing = time_call(function, repeat)
+            results[name] = timing
+            print(f"{name:<24} median {timing['median_s'] * 1000:>9.1f} ms   min {timing['min_s'] * 1000:>9.1f} ms   found {timing['found']}")
+        if EnvFileScanner(root).scan() != expected:
+            print("WARNING: scanner results differ from the expected .env files")
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def time_script(code: str, env: dict, cwd: str, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return {'median_s': round(statistics.median(timings), 4), 'min_s': round(min(timings), 4), 'runs': len(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--distributions', type=int, default=3000, help='fake installed distributions')
+    parser.add_argument('--path-entries', type=int, default=200, help='extra sys.path directories')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--suites', nargs='+', choices=('inventory', 'env-scan'), default=['inventory', 'env-scan'])
+    parser.add_argument('--files', type=int, default=100000, help='files in the env-scan synthetic tree')
+    parser.add_argument('--skip-full', action='store_true', help='skip the full Diagnostics().run() timings')
+    parser.add_argument('--output', default=None, help='write results as JSON')
+    args = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'distributions': args.distributions,
+        'path_entries': args.path_entries,
+        'timings': {},
+    }
+    if 'env-scan' in args.suites:
+        results['env_scan'] = run_env_scan(args.files, args.repeat)
+    if 'inventory' not in args.suites:
+        args.skip_full = True
+    root = tempfile.mkdtemp(prefix='bench-diagnostics-')
+    try:
+        env = dict(os.environ, PYTHONPATH=build_environment(root, args.distributions, args.path_entries))
+        cases = [('legacy_packages', LEGACY_PACKAGES), ('inventory', INVENTORY)] if 'inventory' in args.suites else []
+        if not args.skip_full:
+            cases += [
+                ('diagnostics_parallel', FULL_RUN.format(parallel=True)),
+                ('diagnostics_sequential', FULL_RUN.format(parallel=False)),
+            ]
+        for name, code in cases:
+            timing = time_script(code, env, root, args.repeat)
+            results['timings'][name] = timing
+            print(f"{name:<24} median {timing['median_s'] * 1000:>9.1f} ms   min {timing['min_s'] * 1000:>9.1f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,753 @@
 import os
 import sys
+import json
+import atexit
+import re
+import fnmatch
 import platform
 import subprocess
 import shutil
 import time
+import socket
 import ssl
 import tempfile
+import threading
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlsplit
+
+class Step:
+    """One diagnostics step running on its own thread, with its output held back.
+
+    Lines, warnings and errors are buffered until the step is reported, so
+    concurrent steps still appear in the report in their usual order.
+    """
+
+    def __init__(self, title, method, timeout):
+        self.title = title
+        self.method = method
+        self.timeout = timeout
+        self.lines = []
+        self.warnings = []
+        self.errors = []
+        self.started = None
+        self.duration = None
+        self.status = 'pending'
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def deadline(self):
+        return self.started + self.timeout if self.started is not None else None
+
+    def remaining(self):
+        if self.started is None:
+            return self.timeout
+        return max(0.0, self.deadline - time.monotonic())
+
+
+def normalize_name(name):
+    """PEP 503 project name: lowercase, runs of -_. collapsed to '-'."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class SitePackagesIndex:
+    """What one sys.path directory provides, read with a single scandir.
+
+    `distributions` maps normalized project names to versions, taken from
+    ``name-version.dist-info`` directory names where possible and from
+    importlib.metadata otherwise; `modules` maps top-level names to the
+    file or directory that may provide them (.py files, extension modules,
+    package directories).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.distributions = {}
+        self.modules = {}
+        try:
+            entries = list(os.scandir(path or os.curdir))
+        except OSError:
+            return
+        for entry in entries:
+            name = entry.name
+            if name.endswith(('.dist-info', '.egg-info')):
+                self._add_distribution(entry)
+            elif name.endswith('.py'):
+                self.modules[name[:-3]] = name
+            elif name.endswith(('.so', '.pyd')):
+                self.modules.setdefault(name.split('.', 1)[0], name)
+            elif '.' not in name and not name.startswith('__') and entry.is_dir():
+                self.modules.setdefault(name, name)
+
+    def module_path(self, module):
+        """Path of the file or regular package providing `module` here, if any."""
+        name = self.modules.get(module)
+        if name is None:
+            return None
+        path = os.path.join(self.path or os.curdir, name)
+        if name == module and not os.path.isfile(os.path.join(path, '__init__.py')):
+            # A plain directory is at most a namespace portion; it shadows nothing
+            return None
+        return path
+
+    def _add_distribution(self, entry):
+        stem = entry.name.rsplit('.', 1)[0]
+        project, _, version = stem.partition('-')
+        # Egg names carry more fields after the version (name-1.0-py3.11[-platform]);
+        # escaped names and versions never contain '-' themselves
+        version = version.split('-', 1)[0]
+        if not version or not entry.is_dir():
+            # Legacy egg-info (often a bare file) without a version in its name
+            from importlib.metadata import PathDistribution
+            dist = PathDistribution(Path(entry.path))
+            project, version = dist.metadata['Name'] or project, dist.version
+        if project and version:
+            self.distributions.setdefault(normalize_name(project), version)
+
+
+class PackageInventory:
+    """Installed distributions and top-level modules along `sys.path`.
+
+    Each directory is indexed once (and cached by path and mtime, so
+    repeated inventories in one process are free); lookups then resolve
+    the way imports do, with the earliest sys.path entry winning.
+    """
+
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, paths=None):
+        self.paths = list(sys.path if paths is None else paths)
+        self.indexes = [self._index(path) for path in self.paths]
+        self.distributions = {}
+        for index in reversed(self.indexes):
+            self.distributions.update(index.distributions)
+
+    @classmethod
+    def _index(cls, path):
+        try:
+            mtime = os.stat(path or os.curdir).st_mtime_ns
+        except OSError:
+            mtime = None
+        key = (os.path.abspath(path or os.curdir), mtime)
+        with cls._cache_lock:
+            index = cls._cache.get(key)
+        if index is None:
+            index = SitePackagesIndex(path)
+            with cls._cache_lock:
+                cls._cache[key] = index
+        return index
+
+    def version(self, project):
+        return self.distributions.get(normalize_name(project))
+
+    def versions(self, projects):
+        """{project: version or None} for every name in `projects`."""
+        return {project: self.version(project) for project in projects}
+
+    def conflicts(self, pairs):
+        """Pairs from `pairs` where both projects are installed."""
+        return [(a, b) for a, b in pairs if self.version(a) and self.version(b)]
+
+    def shadowing(self, modules, paths=None, exclude=()):
+        """(module, path) for each of `modules` provided by `paths` (default: sys.path) outside `exclude`."""
+        excluded = tuple(os.path.normcase(os.path.abspath(p)) for p in exclude)
+        found = []
+        for path in self.paths if paths is None else paths:
+            directory = os.path.normcase(os.path.abspath(path or os.curdir))
+            if any(directory == ex or directory.startswith(ex + os.sep) for ex in excluded):
+                continue
+            index = self._index(path)
+            for module in modules:
+                module_path = index.module_path(module)
+                if module_path:
+                    found.append((module, os.path.abspath(module_path)))
+        return found
+
+
+class ProbeResult:
+    """Timings for one probe, in seconds; a phase that never happened stays None."""
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+        self.address = None
+        self.dns = None
+        self.connect = None
+        self.tls = None
+        self.ttfb = None
+        self.total = None
+        self.status = None
+        self.throughput_mbps = None
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def phases(self):
+        parts = [f"{label} {value * 1000:.0f} ms" for label, value in
+                 (('DNS', self.dns), ('connect', self.connect), ('TLS', self.tls), ('TTFB', self.ttfb))
+                 if value is not None]
+        return ", ".join(parts)
+
+    def to_dict(self):
+        return {key: round(value, 6) if isinstance(value, float) else value for key, value in vars(self).items()}
+
+
+def _getaddrinfo(host, port, timeout):
+    """socket.getaddrinfo, which has no timeout of its own, bounded by `timeout`.
+
+    The lookup runs on a daemon thread that is abandoned if it overruns.
+    """
+    outcome = {}
+
+    def lookup():
+        try:
+            outcome['addresses'] = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=lookup, name='diag-dns', daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise socket.timeout(f"DNS lookup of {host} timed out after {timeout:g}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['addresses']
+
+
+def probe_http(url, timeout=10.0, name=None):
+    """GET `url` over a raw socket, timing DNS, TCP connect, TLS handshake and first byte separately.
+
+    Proxies are deliberately not used: the point is to see the direct
+    path's latency, phase by phase.
+    """
+    result = ProbeResult(name or url, url)
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    host = parts.hostname
+    port = parts.port or (443 if secure else 80)
+    path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+    started = time.perf_counter()
+    sock = None
+    try:
+        mark = time.perf_counter()
+        addresses = _getaddrinfo(host, port, timeout)
+        result.dns = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        error = None
+        for family, socktype, proto, _, address in addresses:
+            try:
+                sock = socket.socket(family, socktype, proto)
+                sock.settimeout(timeout)
+                sock.connect(address)
+                result.address = address[0]
+                break
+            except OSError as e:
+                error = e
+                sock.close()
+                sock = None
+        if sock is None:
+            raise error or OSError(f"No addresses for {host}")
+        result.connect = time.perf_counter() - mark
+
+        if secure:
+            mark = time.perf_counter()
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            result.tls = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        sock.sendall(
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: llm-engineering-diagnostics\r\n"
+            f"Accept: */*\r\nConnection: close\r\n\r\n".encode('ascii')
+        )
+        first = sock.recv(4096)
+        result.ttfb = time.perf_counter() - mark
+        if not first:
+            raise ConnectionError("Connection closed before any response")
+        status_line = first.split(b"\r\n", 1)[0].decode('latin-1')
+        fields = status_line.split()
+        if len(fields) < 2 or not fields[1].isdigit():
+            raise ConnectionError(f"Unexpected response: {status_line[:80]!r}")
+        result.status = int(fields[1])
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        if sock is not None:
+            sock.close()
+        result.total = time.perf_counter() - started
+    return result
+
+
+class _LoopbackServer:
+    """Tiny local HTTP server: answers every request with `size` bytes, then closes."""
+
+    def __init__(self, size):
+        self.size = size
+        self._listener = socket.create_server(('127.0.0.1', 0))
+        self._listener.settimeout(30)
+        self.port = self._listener.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, name='diag-loopback', daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/"
+
+    def _serve(self):
+        chunk = b"x" * 65536
+        while True:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.recv(4096)
+                    conn.sendall(f"HTTP/1.1 200 OK\r\nContent-Length: {self.size}\r\nConnection: close\r\n\r\n".encode('ascii'))
+                    remaining = self.size
+                    while remaining > 0:
+                        conn.sendall(chunk[:remaining])
+                        remaining -= len(chunk)
+                except OSError:
+                    pass
+
+    def close(self):
+        self._listener.close()
+
+
+def probe_loopback(size_mb=32, timeout=10.0):
+    """Probe a local server: exercises the probe code offline and measures loopback throughput."""
+    server = _LoopbackServer(int(size_mb * 1024 * 1024))
+    try:
+        result = probe_http(server.url, timeout=timeout, name='loopback')
+        if not result.ok:
+            return result
+        # Second request: stream the whole body to measure raw socket throughput
+        started = time.perf_counter()
+        received = 0
+        with socket.create_connection(('127.0.0.1', server.port), timeout=timeout) as sock:
+            sock.sendall(b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n")
+            while True:
+                data = sock.recv(1 << 20)
+                if not data:
+                    break
+                received += len(data)
+        elapsed = time.perf_counter() - started
+        result.throughput_mbps = received * 8 / elapsed / 1e6 if elapsed else None
+        return result
+    finally:
+        server.close()
+
+
+class NetworkProbe:
+    """Runs connectivity probes concurrently and returns results in probe order.
+
+    Endpoints come from $DIAGNOSTICS_PROBE_URLS (comma separated) or
+    default to two public sites plus the OpenAI API base
+    ($OPENAI_BASE_URL). Set $DIAGNOSTICS_OFFLINE=1 to run only the
+    loopback probe, e.g. on air-gapped machines. More probes can be
+    registered with `add(name, function)`; each must return a ProbeResult.
+    """
+
+    URLS_ENV = 'DIAGNOSTICS_PROBE_URLS'
+    OFFLINE_ENV = 'DIAGNOSTICS_OFFLINE'
+    DEFAULT_URLS = ['https://www.google.com', 'https://www.cloudflare.com']
+
+    def __init__(self, urls=None, timeout=10.0, loopback=True, offline=None):
+        if offline is None:
+            offline = os.environ.get(self.OFFLINE_ENV, '').lower() in ('1', 'true', 'yes')
+        self.timeout = timeout
+        self.offline = offline
+        self.probes = []
+        if not offline:
+            for url in (urls if urls is not None else self.default_urls()):
+                self.add(url, lambda url=url: probe_http(url, timeout=self.timeout))
+        if loopback:
+            self.add('loopback', lambda: probe_loopback(timeout=self.timeout))
+
+    @classmethod
+    def default_urls(cls):
+        configured = os.environ.get(cls.URLS_ENV)
+        if configured:
+            return [url.strip() for url in configured.split(',') if url.strip()]
+        api_base = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1').rstrip('/')
+        return cls.DEFAULT_URLS + [f"{api_base}/models"]
+
+    def add(self, name, function):
+        self.probes.append((name, function))
+
+    def run(self, timeout=None):
+        """Run every probe, waiting at most `timeout` seconds (default: the probe timeout) for all of them.
+
+        Probes run on daemon threads, so one stuck past the wait neither
+        blocks the caller nor keeps the process alive; it is reported as
+        timed out.
+        """
+        results = [None] * len(self.probes)
+
+        def run_probe(index, name, function):
+            try:
+                results[index] = function()
+            except Exception as e:
+                results[index] = ProbeResult(name, name)
+                results[index].error = f"{type(e).__name__}: {e}"
+
+        threads = []
+        for index, (name, function) in enumerate(self.probes):
+            thread = threading.Thread(target=run_probe, args=(index, name, function),
+                                      name=f'diag-probe-{index}', daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        for index, (name, _) in enumerate(self.probes):
+            if results[index] is None:
+                results[index] = ProbeResult(name, name)
+                results[index].error = "Timed out"
+        return results
+
+
+def _gitignore_regex(pattern):
+    """Regex for one .gitignore glob, matched against a '/'-separated relative path."""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex += re.escape('[')
+                i += 1
+            else:
+                # Character classes are the same in fnmatch; reuse its translation
+                regex += fnmatch.translate(pattern[i:end + 1])[4:-3]
+                i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return re.compile(regex + r'\Z')
+
+
+class GitIgnore:
+    """The subset of .gitignore rules the .env scan needs: which directories to skip.
+
+    Supports comments, negation, directory-only (trailing /) and anchored
+    patterns, and ``**``. Rules from nested .gitignore files apply below
+    the directory that holds them; the last matching rule wins.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = tuple(rules)
+
+    def extended(self, path, base):
+        """A copy with the rules from the .gitignore at `path` added, relative to `base`."""
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return self
+        rules = list(self.rules)
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            anchored = '/' in line
+            line = line.lstrip('/')
+            if line:
+                rules.append((base, _gitignore_regex(line), negate, dir_only, anchored))
+        return GitIgnore(rules)
+
+    def ignores_dir(self, rel_path):
+        ignored = False
+        for base, regex, negate, _, anchored in self.rules:
+            if base:
+                if not rel_path.startswith(base + '/'):
+                    continue
+                relative = rel_path[len(base) + 1:]
+            else:
+                relative = rel_path
+            target = relative if anchored else relative.rsplit('/', 1)[-1]
+            if regex.match(target):
+                ignored = not negate
+        return ignored
+
+
+class EnvFileScanner:
+    """Finds .env files under a project root without walking the whole disk.
+
+    Uses `os.scandir` and never descends into directories in `prune`,
+    virtualenvs (anything holding a pyvenv.cfg), directories ignored by
+    .gitignore, or anything deeper than `max_depth`. .gitignore only
+    prunes directories: .env files are usually ignored themselves, and
+    finding them is the point. With `use_git`, candidates come from
+    ``git ls-files`` (tracked and untracked, ignored included) instead.
+    """
+
+    FILENAME = '.env'
+    PRUNE = frozenset({
+        '.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv',
+        '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.ruff_cache', '.ipynb_checkpoints',
+        'site-packages', '.cache', '.idea', '.vscode',
+    })
+
+    def __init__(self, root, max_depth=6, prune=PRUNE, use_gitignore=True, use_git=False, git_timeout=None):
+        self.root = root
+        self.max_depth = max_depth
+        self.prune = frozenset(prune)
+        self.use_gitignore = use_gitignore
+        self.use_git = use_git
+        self.git_timeout = git_timeout
+        self.directories = 0
+        self.pruned = 0
+        self.depth_limited = 0
+
+    def scan(self):
+        """Sorted absolute paths of every .env file found."""
+        if self.use_git:
+            found = self._scan_git()
+            if found is not None:
+                return found
+        return self._scan_tree()
+
+    def _scan_tree(self):
+        found = []
+        stack = [('', 0, GitIgnore())]
+        while stack:
+            rel_dir, depth, ignore = stack.pop()
+            directory = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            self.directories += 1
+            names = {entry.name for entry in entries}
+            if rel_dir and 'pyvenv.cfg' in names:
+                self.pruned += 1
+                continue
+            if self.FILENAME in names:
+                found.append(os.path.join(directory, self.FILENAME))
+            if self.use_gitignore and '.gitignore' in names:
+                ignore = ignore.extended(os.path.join(directory, '.gitignore'), rel_dir)
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                if entry.name in self.prune:
+                    self.pruned += 1
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if ignore.rules and ignore.ignores_dir(rel_path):
+                    self.pruned += 1
+                    continue
+                if depth + 1 > self.max_depth:
+                    self.depth_limited += 1
+                    continue
+                stack.append((rel_path, depth + 1, ignore))
+        return sorted(found)
+
+    def _scan_git(self):
+        """.env files git knows about (tracked, untracked or ignored), or None if git is unavailable."""
+        try:
+            result = subprocess.run(
+                ['git', '-C', self.root, 'ls-files', '-z', '--cached', '--others', '--', f':(glob)**/{self.FILENAME}'],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=self.git_timeout,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+        found = set()
+        ignores = {}
+        venvs = {}
+        for rel_path in result.stdout.decode('utf-8', errors='replace').split('\0'):
+            parts = rel_path.split('/')
+            if not rel_path or len(parts) - 1 > self.max_depth or self.prune.intersection(parts[:-1]):
+                continue
+            if self._in_virtualenv(parts[:-1], venvs):
+                continue
+            if self.use_gitignore and self._git_ignored(parts[:-1], ignores):
+                continue
+            found.add(os.path.join(self.root, *parts))
+        return sorted(found)
+
+    def _in_virtualenv(self, dirs, venvs):
+        """Whether a directory on the way to a git candidate holds a pyvenv.cfg, as the walk checks."""
+        for depth in range(1, len(dirs) + 1):
+            rel_dir = '/'.join(dirs[:depth])
+            if rel_dir not in venvs:
+                venvs[rel_dir] = os.path.isfile(os.path.join(self.root, *dirs[:depth], 'pyvenv.cfg'))
+            if venvs[rel_dir]:
+                return True
+        return False
+
+    def _git_ignored(self, dirs, ignores):
+        """Whether any directory on the way to a git candidate would have been pruned by .gitignore."""
+        rel_dir = ''
+        for name in dirs:
+            ignore = ignores.get(rel_dir)
+            if ignore is None:
+                # Parents are always cached first: dirs is walked from the root down
+                inherited = ignores[rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else ''] if rel_dir else GitIgnore()
+                ignore = inherited.extended(os.path.join(self.root, rel_dir, '.gitignore'), rel_dir)
+                ignores[rel_dir] = ignore
+            rel_dir = f"{rel_dir}/{name}" if rel_dir else name
+            if ignore.rules and ignore.ignores_dir(rel_dir):
+                return True
+        return False
+
+
+class ReportWriter:
+    """Report sink: one buffered text handle plus a typed JSON report.
+
+    The text file gets exactly what is printed, flushed at step
+    boundaries; the JSON file is written once, on close, with every
+    step's status, duration, output, warnings and errors.
+    """
+
+    def __init__(self, path, json_path=None):
+        self.path = path
+        self.json_path = json_path
+        self._file = open(path, 'w', encoding='utf-8')
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self.steps = []
+        self.warnings = []
+        self.errors = []
+        # Structured results a step wants in the JSON report, e.g. network probe timings
+        self.data = {}
+        self.closed = False
+
+    def write(self, message):
+        self._file.write(message + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def add_warning(self, message, step=None):
+        self.warnings.append({'step': step, 'message': message})
+
+    def add_error(self, message, step=None):
+        self.errors.append({'step': step, 'message': message})
+
+    def add_step(self, step, lines, warnings, errors):
+        """Record a finished (or timed-out) step and flush the text report."""
+        self.steps.append({
+            'title': step.title,
+            'method': step.method,
+            'status': step.status,
+            'timeout': step.timeout,
+            'duration': round(step.duration, 4) if step.duration is not None else None,
+            'output': [line.strip('\n') for line in lines if line.strip()],
+            'warnings': warnings,
+            'errors': errors,
+        })
+        for message in warnings:
+            self.add_warning(message, step.title)
+        for message in errors:
+            self.add_error(message, step.title)
+        self.flush()
+
+    def to_dict(self):
+        finished_at = datetime.now()
+        return {
+            'version': 1,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': finished_at.isoformat(timespec='seconds'),
+            'duration': round(time.monotonic() - self._started, 4),
+            'host': platform.node(),
+            'platform': platform.platform(),
+            'python': sys.version.split()[0],
+            'passed': not self.errors and not self.warnings,
+            'steps': self.steps,
+            'warnings': self.warnings,
+            'errors': self.errors,
+            'timings': {step['title']: step['duration'] for step in self.steps},
+            'data': self.data,
+        }
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._file.close()
+        if self.json_path:
+            part = f"{self.json_path}.part"
+            with open(part, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            os.replace(part, self.json_path)
+
 
 class Diagnostics:
 
     FILENAME = 'report.txt'
+    JSON_FILENAME = 'report.json'
+    # Ask `git ls-files` for .env candidates instead of scanning the tree
+    ENV_SCAN_USE_GIT = False
+
+    # (title, method, timeout in seconds); steps are independent and run concurrently
+    STEPS = [
+        ('System Information', '_step1_system_info', 30),
+        ('File System Information', '_step2_check_files', 30),
+        ('Git Repository Information', '_step3_git_repo', 30),
+        ('Environment File Check', '_step4_check_env_file', 60),
+        ('Anaconda Environment Check', '_step5_anaconda_check', 60),
+        ('Virtualenv Check', '_step6_virtualenv_check', 60),
+        ('Network Connectivity Check', '_step7_network_connectivity', 60),
+        ('Environment Variables Check', '_step8_environment_variables', 30),
+        ('Additional Diagnostics', '_step9_additional_diagnostics', 30),
+    ]
     
-    def __init__(self):
+    def __init__(self, parallel=True, timeout_scale=1.0):
         self.errors = []
         self.warnings = []
-        if os.path.exists(self.FILENAME):
-            os.remove(self.FILENAME)
+        self.parallel = parallel
+        self.timeout_scale = timeout_scale
+        self.steps = []
+        self._local = threading.local()
+        self._package_inventory = None
+        self._inventory_lock = threading.Lock()
+        self.dotenv_error = None
+        self.report = ReportWriter(self.FILENAME, self.JSON_FILENAME)
+        # Flush whatever was gathered even if the run dies part way
+        atexit.register(self.report.close)
 
     def log(self, message):
+        step = getattr(self._local, 'step', None)
+        if step is not None:
+            with step.lock:
+                # A step that overran its timeout no longer gets to add output
+                if step.status == 'running':
+                    step.lines.append(message)
+            return
+        self._write(message)
+
+    def _write(self, message):
         print(message)
-        with open(self.FILENAME, 'a', encoding='utf-8') as f:
-            f.write(message + "\n")
+        self.report.write(message)
 
     def start(self):
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -31,29 +756,143 @@ class Diagnostics:
     def end(self):
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.log(f"\n\nCompleted diagnostics at {now}\n")
+        self.report.close()
         print("\nPlease send these diagnostics to me at ed@edwarddonner.com")
         print(f"Either copy & paste the above output into an email, or attach the file {self.FILENAME} that has been created in this directory.")
+        print(f"A machine-readable copy is in {self.JSON_FILENAME}.")
     
 
     def _log_error(self, message):
         self.log(f"ERROR: {message}")
-        self.errors.append(message)
+        step = getattr(self._local, 'step', None)
+        if step is not None:
+            step.errors.append(message)
+        else:
+            self.errors.append(message)
+            self.report.add_error(message)
 
     def _log_warning(self, message):
         self.log(f"WARNING: {message}")
-        self.warnings.append(message)
+        step = getattr(self._local, 'step', None)
+        if step is not None:
+            step.warnings.append(message)
+        else:
+            self.warnings.append(message)
+            self.report.add_warning(message)
+
+    def _cancelled(self):
+        """True once the current step has timed out or the run was interrupted."""
+        step = getattr(self._local, 'step', None)
+        return step is not None and step.cancelled.is_set()
+
+    def _remaining(self):
+        """Seconds left before the current step times out, or None outside a step."""
+        step = getattr(self._local, 'step', None)
+        return step.remaining() if step is not None else None
+
+    def _run_command(self, args):
+        """subprocess.run bounded by whatever is left of the current step's timeout."""
+        return subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=self._remaining())
+
+    def _run_step(self, step):
+        self._local.step = step
+        step.started = time.monotonic()
+        step.status = 'running'
+        try:
+            getattr(self, step.method)()
+        except subprocess.TimeoutExpired as e:
+            self._log_error(f"{step.title} timed out running {e.cmd[0]}")
+            with step.lock:
+                if step.status == 'running':
+                    step.status = 'error'
+                    step.duration = time.monotonic() - step.started
+        except Exception as e:
+            # One broken check must not hide the rest of the report
+            self._log_error(f"{step.title} failed: {type(e).__name__}: {e}")
+            with step.lock:
+                if step.status == 'running':
+                    step.status = 'error'
+                    step.duration = time.monotonic() - step.started
+        finally:
+            with step.lock:
+                if step.status == 'running':
+                    step.status = 'ok'
+                    step.duration = time.monotonic() - step.started
+            step.done.set()
+
+    def _start_step(self, step):
+        # Daemon threads: a step stuck past its timeout must not keep the process alive
+        thread = threading.Thread(target=self._run_step, args=(step,), name=f"diag-{step.method}", daemon=True)
+        thread.start()
+
+    def _wait_step(self, step):
+        """Wait for `step` to finish or overrun its timeout."""
+        while not step.done.wait(timeout=0.1 if step.started is None else step.remaining() + 0.05):
+            if step.started is not None and step.remaining() <= 0:
+                with step.lock:
+                    if step.status != 'running':
+                        break
+                    step.status = 'timeout'
+                    step.duration = time.monotonic() - step.started
+                    step.lines.append(f"ERROR: {step.title} timed out after {step.timeout:g}s")
+                    step.errors.append(f"{step.title} timed out after {step.timeout:g}s")
+                step.cancelled.set()
+                break
+
+    def _report_step(self, step):
+        with step.lock:
+            lines, warnings, errors = list(step.lines), list(step.warnings), list(step.errors)
+        for line in lines:
+            self._write(line)
+        self.warnings.extend(warnings)
+        self.errors.extend(errors)
+        self.report.add_step(step, lines, warnings, errors)
+
+    def _load_dotenv(self):
+        """Load .env once, before any step runs: step 7 reads $OPENAI_BASE_URL, which it may set."""
+        self.dotenv_error = None
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except Exception as e:
+            self.dotenv_error = e
+
+    def _run_steps(self):
+        """Run every step, concurrently unless `parallel` is off, reporting in step order."""
+        self.steps = [Step(title, method, timeout * self.timeout_scale) for title, method, timeout in self.STEPS]
+        self._load_dotenv()
+        if self.parallel:
+            for step in self.steps:
+                self._start_step(step)
+        try:
+            for step in self.steps:
+                if not self.parallel:
+                    self._start_step(step)
+                self._wait_step(step)
+                self._report_step(step)
+        except KeyboardInterrupt:
+            for step in self.steps:
+                step.cancelled.set()
+            self._log_error("Diagnostics interrupted")
+
+    def _log_timings(self):
+        self.log("\n===== Step Timings =====")
+        for step in self.steps:
+            if step.status == 'timeout':
+                self.log(f"{step.title}: timed out after {step.timeout:g}s")
+            elif step.status == 'error':
+                self.log(f"{step.title}: failed after {step.duration:.2f}s")
+            elif step.duration is not None:
+                self.log(f"{step.title}: {step.duration:.2f}s")
+            else:
+                self.log(f"{step.title}: not run")
 
     def run(self):
         self.start()
-        self._step1_system_info()
-        self._step2_check_files()
-        self._step3_git_repo()
-        self._step4_check_env_file()
-        self._step5_anaconda_check()
-        self._step6_virtualenv_check()
-        self._step7_network_connectivity()
-        self._step8_environment_variables()
-        self._step9_additional_diagnostics()
+        started = time.monotonic()
+        self._run_steps()
+        self._log_timings()
+        self.log(f"Total: {time.monotonic() - started:.2f}s")
 
         if self.warnings:
             self.log("\n===== Warnings Found =====")
@@ -143,21 +982,18 @@ class Diagnostics:
     def _step3_git_repo(self):
         self.log("\n===== Git Repository Information =====")
         try:
-            result = subprocess.run(['git', 'rev-parse', '--show-toplevel'],
-                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            result = self._run_command(['git', 'rev-parse', '--show-toplevel'])
             if result.returncode == 0:
                 git_root = result.stdout.strip()
                 self.log(f"Git Repository Root: {git_root}")
 
-                result = subprocess.run(['git', 'rev-parse', 'HEAD'],
-                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                result = self._run_command(['git', 'rev-parse', 'HEAD'])
                 if result.returncode == 0:
                     self.log(f"Current Commit: {result.stdout.strip()}")
                 else:
                     self._log_warning(f"Could not get current commit: {result.stderr.strip()}")
 
-                result = subprocess.run(['git', 'remote', 'get-url', 'origin'],
-                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                result = self._run_command(['git', 'remote', 'get-url', 'origin'])
                 if result.returncode == 0:
                     self.log(f"Remote Origin: {result.stdout.strip()}")
                 else:
@@ -172,8 +1008,7 @@ class Diagnostics:
     def _step4_check_env_file(self):
         self.log("\n===== Environment File Check =====")
         try:
-            result = subprocess.run(['git', 'rev-parse', '--show-toplevel'],
-                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            result = self._run_command(['git', 'rev-parse', '--show-toplevel'])
             if result.returncode == 0:
                 git_root = result.stdout.strip()
                 env_path = os.path.join(git_root, '.env')
@@ -192,10 +1027,13 @@ class Diagnostics:
                 else:
                     self._log_warning(".env file not found in project root")
 
-                # Check for additional .env files
-                for root, _, files in os.walk(git_root):
-                    if '.env' in files and os.path.join(root, '.env') != env_path:
-                        self._log_warning(f"Additional .env file found at: {os.path.join(root, '.env')}")
+                # Check for additional .env files, skipping virtualenvs, node_modules and ignored directories
+                scanner = EnvFileScanner(git_root, use_git=self.ENV_SCAN_USE_GIT, git_timeout=self._remaining())
+                for path in scanner.scan():
+                    if os.path.normcase(path) != os.path.normcase(env_path):
+                        self._log_warning(f"Additional .env file found at: {path}")
+                if scanner.depth_limited:
+                    self.log(f"Searched for .env files up to {scanner.max_depth} levels below the project root")
             else:
                 self._log_warning("Git root directory not found. Cannot perform .env file check.")
         except FileNotFoundError:
@@ -213,8 +1051,7 @@ class Diagnostics:
                 self.log(f"Environment Name: {os.path.basename(conda_prefix)}")
 
                 conda_exe = os.environ.get('CONDA_EXE', 'conda')
-                result = subprocess.run([conda_exe, '--version'],
-                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                result = self._run_command([conda_exe, '--version'])
                 if result.returncode == 0:
                     self.log(f"Conda Version: {result.stdout.strip()}")
                 else:
@@ -252,13 +1089,12 @@ class Diagnostics:
         required_packages = ['openai', 'python-dotenv', 'requests', 'gradio', 'transformers']
 
         try:
-            import pkg_resources
-            installed = {pkg.key: pkg.version for pkg in pkg_resources.working_set}
+            inventory = self._inventory()
 
             self.log("\nRequired Package Versions:")
-            for package in required_packages:
-                if package in installed:
-                    self.log(f"{package}: {installed[package]}")
+            for package, version in inventory.versions(required_packages).items():
+                if version:
+                    self.log(f"{package}: {version}")
                 else:
                     self._log_error(f"Required package '{package}' is not installed")
 
@@ -268,76 +1104,55 @@ class Diagnostics:
                 ('python-dotenv', 'dotenv')
             ]
 
-            for pkg1, pkg2 in problem_pairs:
-                if pkg1 in installed and pkg2 in installed:
-                    self._log_warning(f"Potentially conflicting packages: {pkg1} and {pkg2}")
-        except ImportError:
-            self._log_error("Could not import 'pkg_resources' to check installed packages")
+            for pkg1, pkg2 in inventory.conflicts(problem_pairs):
+                self._log_warning(f"Potentially conflicting packages: {pkg1} and {pkg2}")
         except Exception as e:
             self._log_error(f"Package check failed: {e}")
 
+    def _inventory(self):
+        """The PackageInventory for this run, built once and shared by every step."""
+        with self._inventory_lock:
+            if self._package_inventory is None:
+                self._package_inventory = PackageInventory()
+            return self._package_inventory
+
     def _step7_network_connectivity(self):
         self.log("\n===== Network Connectivity Check =====")
         try:
             self.log(f"SSL Version: {ssl.OPENSSL_VERSION}")
-    
-            import requests
-            import speedtest  # Importing the speedtest-cli library
-    
-            # Basic connectivity check
-            urls = [
-                'https://www.google.com',
-                'https://www.cloudflare.com'
-            ]
-    
-            connected = False
-            for url in urls:
-                try:
-                    start_time = time.time()
-                    response = requests.get(url, timeout=10)
-                    elapsed_time = time.time() - start_time
-                    response.raise_for_status()
-                    self.log(f"✓ Connected to {url}")
-                    self.log(f"  Response time: {elapsed_time:.2f}s")
-    
-                    if elapsed_time > 2:
-                        self._log_warning(f"Slow response from {url}: {elapsed_time:.2f}s")
-                    connected = True
-                    break
-                except requests.exceptions.RequestException as e:
-                    self._log_warning(f"Failed to connect to {url}: {e}")
-                else:
-                    self.log("Basic connectivity OK")
-    
-            if not connected:
+            if os.environ.get('HTTPS_PROXY') or os.environ.get('https_proxy'):
+                self.log("HTTPS proxy is set; probes below connect directly and do not use it")
+
+            # Every phase of every probe, DNS included, ends with the step
+            remaining = self._remaining()
+            probe = NetworkProbe(timeout=10.0 if remaining is None else min(10.0, remaining))
+            results = probe.run(timeout=remaining)
+            self.report.data['network'] = [result.to_dict() for result in results]
+
+            external = [result for result in results if result.name != 'loopback']
+            for result in external:
+                if not result.ok:
+                    self._log_warning(f"Failed to connect to {result.url}: {result.error}")
+                    continue
+                self.log(f"✓ Connected to {result.url} (HTTP {result.status})")
+                self.log(f"  Response time: {result.total:.2f}s ({result.phases()})")
+                if result.total > 2:
+                    self._log_warning(f"Slow response from {result.url}: {result.total:.2f}s")
+                if result.status >= 500:
+                    self._log_warning(f"Server error from {result.url}: HTTP {result.status}")
+
+            if probe.offline:
+                self.log("Offline mode: external connectivity probes skipped")
+            elif not any(result.ok for result in external):
                 self._log_error("Failed to connect to any test URLs")
-                return
-    
-            # Bandwidth test using speedtest-cli
-            self.log("\nPerforming bandwidth test using speedtest-cli...")
-            try:
-                st = speedtest.Speedtest()
-                st.get_best_server()
-                download_speed = st.download()  # Bits per second
-                upload_speed = st.upload()      # Bits per second
-    
-                download_mbps = download_speed / 1e6  # Convert to Mbps
-                upload_mbps = upload_speed / 1e6
-    
-                self.log(f"Download speed: {download_mbps:.2f} Mbps")
-                self.log(f"Upload speed: {upload_mbps:.2f} Mbps")
-    
-                if download_mbps < 1:
-                    self._log_warning("Download speed is low")
-                if upload_mbps < 0.5:
-                    self._log_warning("Upload speed is low")
-            except speedtest.ConfigRetrievalError:
-                self._log_error("Failed to retrieve speedtest configuration")
-            except Exception as e:
-                self._log_warning(f"Bandwidth test failed: {e}")
-    
-        except ImportError:
-            self._log_error("Required packages are not installed. Please install them using 'pip install requests speedtest-cli'")
+
+            for result in results:
+                if result.name != 'loopback':
+                    continue
+                if result.ok:
+                    self.log(f"Loopback: {result.phases()}, throughput {result.throughput_mbps:.0f} Mbps")
+                else:
+                    self._log_warning(f"Loopback probe failed: {result.error}")
         except Exception as e:
             self._log_error(f"Network connectivity check failed: {e}")
 
@@ -358,9 +1173,9 @@ class Diagnostics:
             for path in sys.path:
                 self.log(f" - {path}")
 
-            # Check OPENAI_API_KEY
-            from dotenv import load_dotenv
-            load_dotenv()
+            # Check OPENAI_API_KEY (.env was loaded before the steps started)
+            if self.dotenv_error is not None:
+                self._log_error(f"Could not load .env: {self.dotenv_error}")
             api_key = os.environ.get('OPENAI_API_KEY')
             if api_key:
                 self.log("OPENAI_API_KEY is set after calling load_dotenv()")
@@ -380,28 +1195,21 @@ class Diagnostics:
             if hasattr(site, 'getusersitepackages'):
                 site_packages_paths.append(site.getusersitepackages())
     
-            # Function to check if a path is within site-packages
-            def is_in_site_packages(path):
-                return any(os.path.commonpath([path, sp]) == sp for sp in site_packages_paths)
-    
             # Check for potential name conflicts in the current directory and sys.path
-            conflict_names = ['openai.py', 'dotenv.py']
-    
-            # Check current directory
+            # (site-packages is skipped: that is where these modules belong)
+            conflict_modules = ['openai', 'dotenv']
+            inventory = self._inventory()
             current_dir = os.getcwd()
-            for name in conflict_names:
-                conflict_path = os.path.join(current_dir, name)
-                if os.path.isfile(conflict_path):
-                    self._log_warning(f"Found '{name}' in the current directory, which may cause import conflicts: {conflict_path}")
-    
-            # Check sys.path directories
-            for path in sys.path:
-                if not path or is_in_site_packages(path):
-                    continue  # Skip site-packages and empty paths
-                for name in conflict_names:
-                    conflict_file = os.path.join(path, name)
-                    if os.path.isfile(conflict_file):
-                        self._log_warning(f"Potential naming conflict: {conflict_file}")
+            seen = set()
+            search_paths = [current_dir] + [path for path in sys.path if path]
+            for name, conflict_file in inventory.shadowing(conflict_modules, search_paths, exclude=site_packages_paths):
+                if conflict_file in seen:
+                    continue
+                seen.add(conflict_file)
+                if os.path.normcase(os.path.dirname(conflict_file)) == os.path.normcase(current_dir):
+                    self._log_warning(f"Found '{os.path.basename(conflict_file)}' in the current directory, which may cause import conflicts: {conflict_file}")
+                else:
+                    self._log_warning(f"Potential naming conflict: {conflict_file}")
     
             # Check temp directory
             try:
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# diagnostics.py is a standalone script at the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
@@ -0,0 +1,345 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import diagnostics
+
+
+@pytest.fixture
+def make_diagnostics(tmp_path, monkeypatch):
+    """Build Diagnostics that write their reports under tmp_path.
+
+    Reports use relative paths and close at exit, so close them here while
+    the working directory is still tmp_path.
+    """
+    monkeypatch.chdir(tmp_path)
+    made = []
+
+    def make(cls=diagnostics.Diagnostics, **kwargs):
+        made.append(cls(**kwargs))
+        return made[-1]
+
+    yield make
+    for diag in made:
+        diag.report.close()
+
+
+class SlowCommand(diagnostics.Diagnostics):
+    STEPS = [('Slow Command', '_slow_step', 30)]
+
+    def _slow_step(self):
+        self.log("starting")
+        raise subprocess.TimeoutExpired([sys.executable, "-c", "pass"], 1)
+
+
+def test_subprocess_timeout_marks_the_step_failed(make_diagnostics):
+    diag = make_diagnostics(SlowCommand, parallel=False)
+    diag._run_steps()
+    step = diag.steps[0]
+    assert step.status == 'error'
+    assert step.duration is not None
+    assert any("timed out running" in error for error in diag.errors)
+
+
+def test_report_writer_json_schema(tmp_path):
+    writer = diagnostics.ReportWriter(str(tmp_path / "report.txt"), str(tmp_path / "report.json"))
+    writer.write("Starting diagnostics")
+    step = diagnostics.Step("Network Connectivity Check", "_step7_network_connectivity", 60)
+    step.status, step.duration = 'ok', 1.234567
+    writer.add_step(step, ["===== Network =====\n", "\n", "Google: ok"], ["slow DNS"], [])
+    writer.add_error("No .env file found")
+    writer.data['network'] = [{'name': 'loopback', 'status': 200}]
+    writer.close()
+    writer.close()
+
+    assert (tmp_path / "report.txt").read_text(encoding="utf-8") == "Starting diagnostics\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["report.json", "report.txt"]
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert set(report) == {
+        'version', 'started_at', 'finished_at', 'duration', 'host', 'platform', 'python',
+        'passed', 'steps', 'warnings', 'errors', 'timings', 'data',
+    }
+    assert report['version'] == 1 and report['python'] == sys.version.split()[0]
+    assert report['passed'] is False
+    assert report['steps'] == [{
+        'title': "Network Connectivity Check",
+        'method': "_step7_network_connectivity",
+        'status': 'ok',
+        'timeout': 60,
+        'duration': 1.2346,
+        'output': ["===== Network =====", "Google: ok"],
+        'warnings': ["slow DNS"],
+        'errors': [],
+    }]
+    assert report['warnings'] == [{'step': "Network Connectivity Check", 'message': "slow DNS"}]
+    assert report['errors'] == [{'step': None, 'message': "No .env file found"}]
+    assert report['timings'] == {"Network Connectivity Check": 1.2346}
+    assert report['data'] == {'network': [{'name': 'loopback', 'status': 200}]}
+
+
+class TwoSteps(diagnostics.Diagnostics):
+    STEPS = [('First', '_first', 30), ('Second', '_second', 30)]
+
+    def _first(self):
+        time.sleep(0.05)
+        self.log("first line")
+
+    def _second(self):
+        self.log("second line")
+        self._log_warning("something odd")
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_run_reports_steps_in_order(make_diagnostics, tmp_path, parallel):
+    diag = make_diagnostics(TwoSteps, parallel=parallel)
+    diag.run()
+
+    text = (tmp_path / "report.txt").read_text(encoding="utf-8")
+    # The second step finishes first when parallel, but is still reported second
+    assert text.index("first line") < text.index("second line") < text.index("- something odd")
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert [(step['title'], step['status']) for step in report['steps']] == [('First', 'ok'), ('Second', 'ok')]
+    assert report['steps'][1]['warnings'] == ["something odd"]
+    assert report['warnings'] == [{'step': 'Second', 'message': "something odd"}]
+    assert report['passed'] is False
+
+
+def make_site(root, dist_infos=(), files=(), packages=(), dirs=()):
+    """A fake sys.path directory."""
+    root.mkdir(parents=True, exist_ok=True)
+    for name in dist_infos:
+        (root / name).mkdir()
+    for name in files:
+        (root / name).write_text("", encoding="utf-8")
+    for name in packages:
+        (root / name).mkdir()
+        (root / name / "__init__.py").write_text("", encoding="utf-8")
+    for name in dirs:
+        (root / name).mkdir()
+    return str(root)
+
+
+def test_site_packages_index_reads_versions_from_names(tmp_path):
+    site = make_site(
+        tmp_path / "site",
+        dist_infos=["openai-1.54.0.dist-info", "Jupyter_Lab-4.2.5.dist-info", "six-1.16.0-py3.11.egg-info"],
+        files=["typing_extensions.py", "_cffi_backend.cpython-311-x86_64-linux-gnu.so"],
+        packages=["openai"],
+        dirs=["google", "__pycache__"],
+    )
+    legacy = tmp_path / "site" / "legacy.egg-info"
+    legacy.mkdir()
+    (legacy / "PKG-INFO").write_text("Metadata-Version: 2.1\nName: Legacy-Tool\nVersion: 0.9\n", encoding="utf-8")
+
+    index = diagnostics.SitePackagesIndex(site)
+    assert index.distributions == {
+        "openai": "1.54.0", "jupyter-lab": "4.2.5", "six": "1.16.0", "legacy-tool": "0.9",
+    }
+    assert set(index.modules) == {"typing_extensions", "_cffi_backend", "openai", "google"}
+    assert index.module_path("openai").endswith("openai")
+    assert index.module_path("typing_extensions").endswith("typing_extensions.py")
+    # A directory without __init__.py is a namespace portion and shadows nothing
+    assert index.module_path("google") is None
+
+
+def test_inventory_resolves_like_imports(tmp_path):
+    first = make_site(tmp_path / "first", dist_infos=["numpy-2.1.0.dist-info"])
+    second = make_site(tmp_path / "second", dist_infos=["numpy-1.26.4.dist-info", "pandas-2.2.3.dist-info"])
+    inventory = diagnostics.PackageInventory([first, second, str(tmp_path / "missing")])
+
+    assert inventory.version("NumPy") == "2.1.0"
+    assert inventory.versions(["pandas", "torch"]) == {"pandas": "2.2.3", "torch": None}
+    assert inventory.conflicts([("numpy", "pandas"), ("numpy", "torch")]) == [("numpy", "pandas")]
+
+
+def test_inventory_finds_shadowing_modules(tmp_path):
+    project = make_site(tmp_path / "project", files=["openai.py", "notes.txt"], packages=["requests"])
+    site = make_site(tmp_path / "site", packages=["openai", "requests"])
+    inventory = diagnostics.PackageInventory([project, site])
+
+    found = inventory.shadowing(["openai", "requests", "streamlit"], exclude=[site])
+    assert found == [
+        ("openai", os.path.join(project, "openai.py")),
+        ("requests", os.path.join(project, "requests")),
+    ]
+
+
+def test_inventory_reindexes_a_changed_directory(tmp_path):
+    site = make_site(tmp_path / "site", dist_infos=["rich-13.0.0.dist-info"])
+    assert diagnostics.PackageInventory([site]).version("rich") == "13.0.0"
+    shutil.rmtree(os.path.join(site, "rich-13.0.0.dist-info"))
+    os.mkdir(os.path.join(site, "rich-13.9.4.dist-info"))
+    # Force a new mtime even on filesystems with coarse timestamps
+    stat = os.stat(site)
+    os.utime(site, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert diagnostics.PackageInventory([site]).version("rich") == "13.9.4"
+
+
+def test_probe_loopback_times_each_phase():
+    result = diagnostics.probe_loopback(size_mb=1, timeout=5)
+    assert result.ok, result.error
+    assert (result.name, result.status, result.address) == ('loopback', 200, '127.0.0.1')
+    assert result.dns >= 0 and result.connect >= 0 and result.ttfb >= 0
+    # Plain HTTP: there is no TLS phase to time
+    assert result.tls is None
+    assert result.total >= result.dns + result.connect + result.ttfb
+    assert result.throughput_mbps > 0
+    assert result.phases().startswith("DNS ") and "TLS" not in result.phases()
+    assert set(result.to_dict()) >= {'name', 'url', 'dns', 'connect', 'tls', 'ttfb', 'total', 'status', 'error'}
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_probe_http_reports_the_failing_phase():
+    refused = diagnostics.probe_http(f"http://127.0.0.1:{unused_port()}/", timeout=2)
+    assert not refused.ok and "ConnectionRefused" in refused.error
+    assert refused.dns is not None and refused.connect is None
+
+    # TLS against a plain HTTP server fails in the handshake, after the connect
+    server = diagnostics._LoopbackServer(16)
+    try:
+        tls = diagnostics.probe_http(f"https://127.0.0.1:{server.port}/", timeout=2)
+    finally:
+        server.close()
+    assert not tls.ok
+    assert tls.connect is not None and tls.tls is None and tls.ttfb is None
+
+
+def test_network_probe_offline_runs_only_loopback():
+    probe = diagnostics.NetworkProbe(urls=["https://example.com"], offline=True, timeout=5)
+    assert [name for name, _ in probe.probes] == ['loopback']
+    (result,) = probe.run()
+    assert result.ok
+
+
+def test_network_probe_keeps_order_and_bounds_stuck_probes():
+    probe = diagnostics.NetworkProbe(urls=[], loopback=False, timeout=0.2)
+    release = threading.Event()
+
+    def stuck():
+        release.wait(10)
+
+    def broken():
+        raise RuntimeError("no route")
+
+    probe.add('stuck', stuck)
+    probe.add('broken', broken)
+    probe.add('fine', lambda: diagnostics.ProbeResult('fine', 'http://fine'))
+    started = time.monotonic()
+    results = probe.run()
+    release.set()
+
+    assert time.monotonic() - started < 2
+    assert [(r.name, r.error) for r in results] == [
+        ('stuck', "Timed out"), ('broken', "RuntimeError: no route"), ('fine', None),
+    ]
+
+
+def test_network_probe_default_urls(monkeypatch):
+    monkeypatch.delenv(diagnostics.NetworkProbe.URLS_ENV, raising=False)
+    monkeypatch.setenv('OPENAI_BASE_URL', 'http://127.0.0.1:8766/v1/')
+    assert diagnostics.NetworkProbe.default_urls() == diagnostics.NetworkProbe.DEFAULT_URLS + [
+        'http://127.0.0.1:8766/v1/models',
+    ]
+    monkeypatch.setenv(diagnostics.NetworkProbe.URLS_ENV, ' http://a.test , ,http://b.test')
+    assert diagnostics.NetworkProbe.default_urls() == ['http://a.test', 'http://b.test']
+    monkeypatch.setenv(diagnostics.NetworkProbe.OFFLINE_ENV, 'yes')
+    assert diagnostics.NetworkProbe(loopback=False).probes == []
+
+
+def gitignore(tmp_path, text, base=''):
+    path = tmp_path / ".gitignore"
+    path.write_text(text, encoding="utf-8")
+    return diagnostics.GitIgnore().extended(str(path), base)
+
+
+def test_gitignore_anchoring(tmp_path):
+    ignore = gitignore(tmp_path, "# build output\n/dist\nbuild/\ndocs/_build\n\n")
+    assert ignore.ignores_dir("dist")
+    assert not ignore.ignores_dir("src/dist")
+    assert ignore.ignores_dir("build") and ignore.ignores_dir("src/build")
+    assert ignore.ignores_dir("docs/_build")
+    assert not ignore.ignores_dir("api/docs/_build")
+
+
+def test_gitignore_negation_and_last_match_wins(tmp_path):
+    ignore = gitignore(tmp_path, "out*/\n!output/\n")
+    assert ignore.ignores_dir("out1") and ignore.ignores_dir("src/outdir")
+    assert not ignore.ignores_dir("output")
+    assert gitignore(tmp_path, "!output/\nout*/\n").ignores_dir("output")
+
+
+def test_gitignore_globs(tmp_path):
+    ignore = gitignore(tmp_path, "**/cache\nlogs/**\ntmp?\n[ab]ackup\n")
+    assert ignore.ignores_dir("cache") and ignore.ignores_dir("a/b/cache")
+    assert ignore.ignores_dir("logs/2024/01") and not ignore.ignores_dir("logs")
+    assert ignore.ignores_dir("tmp1") and not ignore.ignores_dir("tmp12")
+    assert ignore.ignores_dir("backup") and not ignore.ignores_dir("cackup")
+
+
+def test_nested_gitignore_applies_below_its_directory(tmp_path):
+    ignore = gitignore(tmp_path, "/generated\n", base="app")
+    assert ignore.ignores_dir("app/generated")
+    assert not ignore.ignores_dir("generated")
+    assert not ignore.ignores_dir("lib/app/generated")
+
+
+def make_tree(root, paths):
+    for path in paths:
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not path.endswith("/"):
+            target.write_text("", encoding="utf-8")
+
+
+ENV_TREE = [
+    ".env",
+    ".gitignore",
+    "week1/.env",
+    "week1/notes/deep/a/b/c/d/.env",
+    "node_modules/pkg/.env",
+    ".git/.env",
+    "myenv/pyvenv.cfg",
+    "myenv/lib/.env",
+    "build/.env",
+    "output/.env",
+    "out1/.env",
+]
+
+
+def test_env_scanner_prunes_the_tree(tmp_path):
+    make_tree(tmp_path, ENV_TREE)
+    (tmp_path / ".gitignore").write_text("build/\nout*/\n!output/\n.env\n", encoding="utf-8")
+
+    scanner = diagnostics.EnvFileScanner(str(tmp_path), max_depth=4)
+    found = [os.path.relpath(path, tmp_path) for path in scanner.scan()]
+    # .env being ignored itself does not hide it: finding it is the point
+    assert found == [".env", os.path.join("output", ".env"), os.path.join("week1", ".env")]
+    # node_modules, .git, build, out1 and the virtualenv
+    assert scanner.pruned == 5
+    assert scanner.depth_limited == 1
+
+    unbounded = diagnostics.EnvFileScanner(str(tmp_path), max_depth=10, use_gitignore=False)
+    assert len(unbounded.scan()) == 6
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_env_scanner_git_mode_matches_the_walk(tmp_path):
+    make_tree(tmp_path, ENV_TREE)
+    (tmp_path / ".gitignore").write_text("build/\nout*/\n!output/\n.env\n", encoding="utf-8")
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+
+    walked = diagnostics.EnvFileScanner(str(tmp_path), max_depth=4).scan()
+    listed = diagnostics.EnvFileScanner(str(tmp_path), max_depth=4, use_git=True, git_timeout=10).scan()
+    assert listed == walked